@@ -6,6 +6,8 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import config_validation as cv
 
+from . import websocket_api
+from .api import QilowattMetricsView
 from .const import DATA_CLIENT, DOMAIN
 from .mqtt_client import MQTTClient
 
@@ -16,6 +18,8 @@ CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the Qilowatt integration."""
+    hass.http.register_view(QilowattMetricsView)
+    websocket_api.async_setup(hass)
     return True
 
 
@@ -33,13 +37,22 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         entry, ["sensor", "binary_sensor"]
     )
 
+    # Reload the entry when its options change
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Reload a Qilowatt config entry after an options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a Qilowatt config entry."""
     client = hass.data[DOMAIN][entry.entry_id][DATA_CLIENT]
-    await hass.async_add_executor_job(client.stop)
+    # Cancels the data loop and every other supervised task of the entry
+    await client.async_stop()
     hass.data[DOMAIN].pop(entry.entry_id)
 
     await hass.config_entries.async_forward_entry_unload(entry, "sensor")
@@ -0,0 +1,113 @@
+"""HTTP API for Qilowatt integration."""
+
+from aiohttp import web
+# Re-exported by the http component on every supported HA version
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+
+from .const import DATA_CLIENT, DOMAIN
+from .metrics import MetricFamily, render
+
+
+class QilowattMetricsView(HomeAssistantView):
+    """Serve the pipeline metrics of every entry in Prometheus text format."""
+
+    url = "/api/qilowatt/metrics"
+    name = "api:qilowatt:metrics"
+    requires_auth = True
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the metrics of every loaded entry."""
+        hass = request.app[KEY_HASS]
+        clients = [data[DATA_CLIENT] for data in hass.data.get(DOMAIN, {}).values()]
+        return web.Response(text=render(collect(clients)), content_type="text/plain")
+
+
+def collect(clients):
+    """Return the metric families of the given MQTT client wrappers."""
+
+    def family(name, kind, help_text):
+        families[name] = MetricFamily(f"qilowatt_{name}", kind, help_text)
+        return families[name]
+
+    families = {}
+    cycles = family("cycles_total", "counter", "Collection cycles run.")
+    skipped = family(
+        "cycles_skipped_total", "counter", "Collection cycles skipped, by reason."
+    )
+    duration = family(
+        "cycle_duration_seconds", "histogram", "Duration of a collection cycle."
+    )
+    suppressed = family(
+        "publishes_suppressed_total",
+        "counter",
+        "Collected payload groups not published because the change trigger found no change.",
+    )
+    deduplicated = family(
+        "publishes_deduplicated_total",
+        "counter",
+        "Pending payloads replaced by a newer one for the same topic.",
+    )
+    dropped = family(
+        "publishes_dropped_total", "counter", "Pending payloads dropped, by reason."
+    )
+    publishes = family("publishes_total", "counter", "Messages published, by topic.")
+    publish_bytes = family(
+        "publish_bytes_total", "counter", "Payload bytes published, by topic."
+    )
+    failures = family(
+        "publish_failures_total", "counter", "Publishes refused by the MQTT client."
+    )
+    queue_depth = family(
+        "publish_queue_depth", "gauge", "Topics waiting to be published."
+    )
+    connected = family("connected", "gauge", "Whether the broker is connected.")
+    reconnects = family("reconnects_total", "counter", "Reconnects to the broker.")
+    read_failures = family(
+        "read_failures_total", "counter", "Failed reads of the inverter data."
+    )
+    latency = family(
+        "command_latency_seconds",
+        "histogram",
+        "Time from receiving a WORKMODE command to its handlers having run.",
+    )
+    loop_lag = family(
+        "event_loop_lag_seconds", "gauge", "Smoothed lag of the Home Assistant event loop."
+    )
+    load_shedding = family(
+        "load_shedding_level", "gauge", "Telemetry load shedding level, 0 is full service."
+    )
+    missing = family(
+        "missing_fields_total",
+        "counter",
+        "Reads of a source field that was missing or unavailable, by field.",
+    )
+
+    # Counters are copied before iterating, writers may add keys meanwhile
+    for client in clients:
+        labels = {"inverter_id": client.inverter_id}
+        metrics = client.metrics
+        queue = client.publish_queue
+        cycles.add(labels, metrics.cycles)
+        for reason, count in list(metrics.cycles_skipped.items()):
+            skipped.add({**labels, "reason": reason}, count)
+        duration.add_histogram(labels, metrics.cycle_duration)
+        suppressed.add(labels, metrics.suppressed)
+        deduplicated.add(labels, queue.coalesced)
+        dropped.add({**labels, "reason": "overflow"}, queue.dropped_overflow)
+        dropped.add({**labels, "reason": "stale"}, queue.dropped_stale)
+        for topic, count in list(metrics.publishes.items()):
+            publishes.add({**labels, "topic": topic}, count)
+            publish_bytes.add({**labels, "topic": topic}, metrics.publish_bytes[topic])
+        failures.add(labels, metrics.publish_failures)
+        queue_depth.add(labels, queue.depth)
+        is_connected = bool(client.qilowatt_client and client.qilowatt_client.connected)
+        connected.add(labels, is_connected)
+        reconnects.add(labels, client.reconnects)
+        read_failures.add(labels, client.breaker.total_failures)
+        latency.add_histogram(labels, metrics.command_latency)
+        loop_lag.add(labels, client.load_shedder.lag)
+        load_shedding.add(labels, client.load_shedder.level)
+        for field, count in list(client.inverter.get_missing_fields().items()):
+            missing.add({**labels, "field": field}, count)
+
+    return families.values()
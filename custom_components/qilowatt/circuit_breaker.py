@@ -0,0 +1,137 @@
+"""Circuit breaker for inverter reads in Qilowatt integration."""
+
+import logging
+import time
+from collections import Counter, deque
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+STATES = [STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN]
+
+
+class CircuitBreaker:
+    """Error budget for the reads from one config entry's inverter backend.
+
+    The breaker opens after `failure_threshold` consecutive failures, or after
+    `window_threshold` failures within `window` seconds for a backend that
+    fails intermittently. While open, reads are skipped for a delay that
+    doubles on every trip up to `max_delay`. After the delay one probe read is
+    let through (half open): success closes the breaker, failure reopens it.
+
+    Failures are only logged at debug level; one aggregated report, with the
+    failures grouped by exception type, is logged per state transition.
+    """
+
+    def __init__(
+        self,
+        name,
+        failure_threshold=3,
+        window=600.0,
+        window_threshold=10,
+        base_delay=10.0,
+        max_delay=600.0,
+        clock=time.monotonic,
+    ) -> None:
+        """Initialize the breaker."""
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._window = window
+        self._window_threshold = window_threshold
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._clock = clock
+
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0  # Trips since the breaker last closed
+        self.total_failures = 0
+        self._failure_times = deque()
+        self._errors = Counter()  # Failures by exception type since the last transition
+        self._last_error = None
+        self._tripped_at = None
+        self._open_until = 0.0
+
+    @property
+    def windowed_failures(self) -> int:
+        """Return the number of failures within the window."""
+        self._prune(self._clock())
+        return len(self._failure_times)
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds until the next read is allowed."""
+        if self.state != STATE_OPEN:
+            return 0.0
+        return max(self._open_until - self._clock(), 0.0)
+
+    def allow_request(self) -> bool:
+        """Return True if a read may be attempted now."""
+        if self.state == STATE_OPEN and self._clock() >= self._open_until:
+            self._transition(STATE_HALF_OPEN)
+        return self.state != STATE_OPEN
+
+    def record_success(self):
+        """Record a successful read."""
+        self.consecutive_failures = 0
+        if self.state != STATE_CLOSED:
+            self._transition(STATE_CLOSED)
+            self.trips = 0
+            self._failure_times.clear()
+
+    def record_failure(self, error: Exception):
+        """Record a failed read and trip the breaker if the budget is spent."""
+        now = self._clock()
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        self._failure_times.append(now)
+        self._prune(now)
+        self._errors[type(error).__name__] += 1
+        self._last_error = error
+        _LOGGER.debug("%s: inverter read failed: %r", self._name, error)
+
+        if self.state == STATE_HALF_OPEN or (
+            self.state == STATE_CLOSED
+            and (
+                self.consecutive_failures >= self._failure_threshold
+                or len(self._failure_times) >= self._window_threshold
+            )
+        ):
+            self.trips += 1
+            if self.trips == 1:
+                self._tripped_at = now
+            delay = min(self._base_delay * 2 ** (self.trips - 1), self._max_delay)
+            self._open_until = now + delay
+            self._transition(STATE_OPEN)
+
+    def _prune(self, now):
+        while self._failure_times and now - self._failure_times[0] > self._window:
+            self._failure_times.popleft()
+
+    def _transition(self, state):
+        """Change state and log one report covering the previous state."""
+        now = self._clock()
+        errors = ", ".join(f"{name} x{count}" for name, count in self._errors.items())
+        if state == STATE_OPEN:
+            _LOGGER.warning(
+                "%s: inverter reads failing (%s; last: %r), pausing reads for %.0f s",
+                self._name,
+                errors,
+                self._last_error,
+                self._open_until - now,
+            )
+        elif state == STATE_CLOSED:
+            _LOGGER.info(
+                "%s: inverter reads recovered after %.0f s and %s trips",
+                self._name,
+                now - self._tripped_at,
+                self.trips,
+            )
+        else:
+            _LOGGER.debug("%s: probing inverter read", self._name)
+        if state != STATE_HALF_OPEN:
+            self._errors.clear()
+        self.state = state
@@ -0,0 +1,75 @@
+"""WORKMODE command history for Qilowatt integration."""
+
+import logging
+from collections import deque
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import COMMAND_HISTORY_SAVE_DELAY, COMMAND_HISTORY_SIZE, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Outcomes of a command, by what acted on it
+OUTCOME_APPLIED = "applied"  # The backend actuated it, e.g. the simulator
+OUTCOME_PEAK_SHAVING = "peak_shaving"  # The local controller holds its threshold
+OUTCOME_DISPATCHED = "dispatched"  # Sensors updated, actuation left to automations
+
+
+class CommandHistory:
+    """Fixed-size history of the WORKMODE commands received by an entry.
+
+    Every command is recorded with its receive time (epoch seconds), the
+    seconds from receipt until it was handled on the event loop and its
+    outcome. The newest COMMAND_HISTORY_SIZE records are kept in memory and
+    written to storage at most every COMMAND_HISTORY_SAVE_DELAY seconds, so
+    queries never touch the recorder.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id, size=COMMAND_HISTORY_SIZE) -> None:
+        """Initialize an empty history."""
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.commands.{entry_id}")
+        self.records = deque(maxlen=size)
+
+    async def async_load(self):
+        """Restore the history from storage."""
+        data = await self._store.async_load()
+        if data:
+            self.records.extend(data["records"])
+
+    async def async_save(self):
+        """Write the history to storage now."""
+        await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self):
+        return {"records": list(self.records)}
+
+    @callback
+    def async_add(self, command, received, latency, outcome):
+        """Record a handled command."""
+        self.records.append(
+            {
+                "received": received,
+                "command": command.to_dict(),
+                "latency": latency,
+                "outcome": outcome,
+            }
+        )
+        self._store.async_delay_save(self._data_to_save, COMMAND_HISTORY_SAVE_DELAY)
+
+    def recent(self, limit=None):
+        """Return the newest records, newest first."""
+        records = list(reversed(self.records))
+        return records if limit is None else records[:limit]
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """Return the nearest-rank latency percentiles of the history."""
+        latencies = sorted(record["latency"] for record in self.records)
+        if not latencies:
+            return {f"p{p}": None for p in percentiles}
+        return {
+            f"p{p}": latencies[max(-(-len(latencies) * p // 100) - 1, 0)]
+            for p in percentiles
+        }
@@ -2,16 +2,61 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import selector
 
 from .const import (
     CONF_DEVICE_ID,
+    CONF_DEVICE_IDS,
+    CONF_ENERGY_INTERVAL,
+    CONF_ENERGY_TRIGGER,
+    CONF_ENTITY_MAP,
+    CONF_ESPHOME_HOST,
+    CONF_ESPHOME_NOISE_PSK,
+    CONF_ESPHOME_PORT,
+    CONF_FILTER_ENABLED,
+    CONF_FILTER_WINDOW,
+    CONF_FLOAT_PRECISION,
     CONF_INVERTER_ID,
     CONF_INVERTER_MODEL,
+    CONF_METRICS_INTERVAL,
+    CONF_METRICS_TRIGGER,
+    CONF_MODBUS_HOST,
+    CONF_MODBUS_PORT,
+    CONF_MODBUS_UNIT,
     CONF_MQTT_PASSWORD,
     CONF_MQTT_USERNAME,
+    CONF_PEAK_SHAVING_ENTITY,
+    CONF_PEAK_SHAVING_FALLBACK,
+    CONF_PEAK_SHAVING_GAIN,
+    CONF_PEAK_SHAVING_RATE,
+    CONF_PEAK_SHAVING_STALE_AFTER,
+    CONF_REDISCOVER,
+    CONF_REGISTER_MAP,
+    CONF_SHADOW_MODE,
+    CONF_SIMULATOR_INTERVAL,
+    CONF_SIMULATOR_PHASES,
+    CONF_SIMULATOR_SEED,
+    CONF_SIMULATOR_STRINGS,
     DOMAIN,
+    ESPHOME_API_DEFAULT_PORT,
+    ESPHOME_API_DEVICE_ID,
+    FILTER_DEFAULT_WINDOW,
+    MODBUS_DEVICE_ID,
+    MQTT_SOLAR_ASSISTANT_DEVICE_ID,
+    MQTT_VENUS_DEVICE_ID,
+    PEAK_SHAVING_DEFAULT_GAIN,
+    PEAK_SHAVING_DEFAULT_RATE,
+    PEAK_SHAVING_DEFAULT_STALE_AFTER,
+    SIMULATOR_DEFAULT_INTERVAL,
+    SIMULATOR_DEVICE_ID,
+    TRIGGER_TIMER,
+    TRIGGERS,
+    UPDATE_INTERVAL,
 )
+from .inverter import get_entity_maps, get_inverter_class, resolve_entity_maps
+from .modbus import REGISTER_MAPS
 
 
 class QilowattConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -19,6 +64,16 @@ class QilowattConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    def __init__(self):
+        """Initialize the config flow."""
+        self._user_input = None
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow."""
+        return QilowattOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
         errors = {}
@@ -27,13 +82,47 @@ class QilowattConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             # Validate the input here if needed
             if user_input is not None:
                 selected_device_id = user_input["device_id"]
-                user_input[CONF_INVERTER_MODEL] = available_inverters[
-                    selected_device_id
-                ]["inverter_integration"]
-                return self.async_create_entry(
-                    title=f"{available_inverters[selected_device_id]['name']}",
-                    data=user_input,
-                )
+                inverter_model = available_inverters[selected_device_id][
+                    "inverter_integration"
+                ]
+                # The selected inverter is the primary unit of a parallel stack
+                device_ids = [selected_device_id] + [
+                    device_id
+                    for device_id in user_input.get(CONF_DEVICE_IDS, [])
+                    if device_id != selected_device_id
+                ]
+                if any(
+                    available_inverters[device_id]["inverter_integration"]
+                    != inverter_model
+                    for device_id in device_ids
+                ):
+                    errors["base"] = "mixed_stack"
+                elif (
+                    len(device_ids) > 1
+                    and not get_inverter_class(inverter_model).PER_DEVICE_ENTITIES
+                ):
+                    errors["base"] = "unstackable"
+                else:
+                    user_input[CONF_INVERTER_MODEL] = inverter_model
+                    user_input[CONF_DEVICE_IDS] = device_ids
+                    if selected_device_id == MODBUS_DEVICE_ID:
+                        # Ask for the connection details of the inverter
+                        self._user_input = user_input
+                        return await self.async_step_modbus()
+                    if selected_device_id == ESPHOME_API_DEVICE_ID:
+                        self._user_input = user_input
+                        return await self.async_step_esphome_api()
+                    if selected_device_id == SIMULATOR_DEVICE_ID:
+                        self._user_input = user_input
+                        return await self.async_step_simulator()
+                    # Pin the entity of every field, reviewable in the options
+                    entity_maps = resolve_entity_maps(self.hass, user_input)
+                    if entity_maps is not None:
+                        user_input[CONF_ENTITY_MAP] = entity_maps
+                    return self.async_create_entry(
+                        title=f"{available_inverters[selected_device_id]['name']}",
+                        data=user_input,
+                    )
 
         inverter_options = {
             device_id: inverter["name"]
@@ -46,6 +135,9 @@ class QilowattConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 vol.Required(CONF_MQTT_PASSWORD): str,
                 vol.Required(CONF_INVERTER_ID): str,
                 vol.Required(CONF_DEVICE_ID): vol.In(inverter_options),
+                vol.Optional(CONF_DEVICE_IDS, default=[]): cv.multi_select(
+                    inverter_options
+                ),
             }
         )
 
@@ -53,6 +145,68 @@ class QilowattConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="user", data_schema=data_schema, errors=errors
         )
 
+    async def async_step_modbus(self, user_input=None):
+        """Handle the Modbus TCP connection step."""
+        if user_input is not None:
+            return self.async_create_entry(
+                title=f"Modbus {user_input[CONF_MODBUS_HOST]}",
+                data={**self._user_input, **user_input},
+            )
+
+        data_schema = vol.Schema(
+            {
+                vol.Required(CONF_MODBUS_HOST): str,
+                vol.Required(CONF_MODBUS_PORT, default=502): cv.port,
+                vol.Required(CONF_MODBUS_UNIT, default=1): vol.All(
+                    vol.Coerce(int), vol.Range(min=0, max=247)
+                ),
+                vol.Required(CONF_REGISTER_MAP): vol.In(list(REGISTER_MAPS)),
+            }
+        )
+
+        return self.async_show_form(step_id="modbus", data_schema=data_schema)
+
+    async def async_step_esphome_api(self, user_input=None):
+        """Handle the ESPHome native API connection step."""
+        if user_input is not None:
+            return self.async_create_entry(
+                title=f"ESPHome {user_input[CONF_ESPHOME_HOST]}",
+                data={**self._user_input, **user_input},
+            )
+
+        data_schema = vol.Schema(
+            {
+                vol.Required(CONF_ESPHOME_HOST): str,
+                vol.Required(CONF_ESPHOME_PORT, default=ESPHOME_API_DEFAULT_PORT): cv.port,
+                vol.Optional(CONF_ESPHOME_NOISE_PSK, default=""): str,
+            }
+        )
+
+        return self.async_show_form(step_id="esphome_api", data_schema=data_schema)
+
+    async def async_step_simulator(self, user_input=None):
+        """Handle the simulated inverter step."""
+        if user_input is not None:
+            return self.async_create_entry(
+                title=f"Simulator {user_input[CONF_SIMULATOR_SEED]}",
+                data={**self._user_input, **user_input},
+            )
+
+        data_schema = vol.Schema(
+            {
+                vol.Required(CONF_SIMULATOR_SEED, default=0): vol.Coerce(int),
+                vol.Required(
+                    CONF_SIMULATOR_INTERVAL, default=SIMULATOR_DEFAULT_INTERVAL
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.01, max=60)),
+                vol.Required(CONF_SIMULATOR_PHASES, default=3): vol.In([1, 3]),
+                vol.Required(CONF_SIMULATOR_STRINGS, default=2): vol.All(
+                    vol.Coerce(int), vol.Range(min=1, max=8)
+                ),
+            }
+        )
+
+        return self.async_show_form(step_id="simulator", data_schema=data_schema)
+
     async def _discover_inverters(self):
         """Discover inverters in Home Assistant."""
         device_registry = dr.async_get(self.hass)
@@ -97,4 +251,158 @@ class QilowattConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     "name": device.name,
                     "inverter_integration": "EspHome",
                 }
+        # Backends that read the inverter directly, without a device in HA
+        inverters[MODBUS_DEVICE_ID] = {
+            "name": "Direct Modbus TCP",
+            "inverter_integration": "Modbus",
+        }
+        inverters[ESPHOME_API_DEVICE_ID] = {
+            "name": "Deye ESP32 (ESPHome native API)",
+            "inverter_integration": "EspHomeApi",
+        }
+        inverters[MQTT_SOLAR_ASSISTANT_DEVICE_ID] = {
+            "name": "SolarAssistant (MQTT topics)",
+            "inverter_integration": "SolarAssistantMqtt",
+        }
+        inverters[MQTT_VENUS_DEVICE_ID] = {
+            "name": "Victron Venus OS (MQTT topics)",
+            "inverter_integration": "VenusMqtt",
+        }
+        inverters[SIMULATOR_DEVICE_ID] = {
+            "name": "Simulator (testing without hardware)",
+            "inverter_integration": "Simulator",
+        }
         return inverters
+
+
+class QilowattOptionsFlow(config_entries.OptionsFlow):
+    """Handle the options of a Qilowatt entry. Saving reloads the entry."""
+
+    def __init__(self, config_entry):
+        """Initialize the options flow."""
+        # Kept here, as OptionsFlow provides config_entry only on HA 2024.11+,
+        # where assigning it is deprecated
+        self._entry = config_entry
+        self._options = None
+        self._entity_maps = None
+        self._fields = {}  # Form key -> (device_id, entity suffix)
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        if user_input is not None:
+            self._options = user_input
+            data = self._entry.data
+            if get_inverter_class(data[CONF_INVERTER_MODEL]).ENTITY_BASED:
+                # Entries created before pinning are resolved here first
+                self._entity_maps = get_entity_maps(
+                    self._entry
+                ) or resolve_entity_maps(self.hass, data)
+                if self._entity_maps:
+                    return await self.async_step_entities()
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_ENERGY_INTERVAL,
+                    default=options.get(CONF_ENERGY_INTERVAL, UPDATE_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=300)),
+                vol.Required(
+                    CONF_ENERGY_TRIGGER,
+                    default=options.get(CONF_ENERGY_TRIGGER, TRIGGER_TIMER),
+                ): vol.In(TRIGGERS),
+                vol.Required(
+                    CONF_METRICS_INTERVAL,
+                    default=options.get(CONF_METRICS_INTERVAL, UPDATE_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+                vol.Required(
+                    CONF_METRICS_TRIGGER,
+                    default=options.get(CONF_METRICS_TRIGGER, TRIGGER_TIMER),
+                ): vol.In(TRIGGERS),
+                vol.Required(
+                    CONF_FILTER_ENABLED,
+                    default=options.get(CONF_FILTER_ENABLED, True),
+                ): bool,
+                vol.Required(
+                    CONF_FILTER_WINDOW,
+                    default=options.get(CONF_FILTER_WINDOW, FILTER_DEFAULT_WINDOW),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=9)),
+                vol.Optional(
+                    CONF_FLOAT_PRECISION,
+                    description={"suggested_value": options.get(CONF_FLOAT_PRECISION)},
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=6)),
+                vol.Optional(
+                    CONF_PEAK_SHAVING_ENTITY,
+                    description={
+                        "suggested_value": options.get(CONF_PEAK_SHAVING_ENTITY)
+                    },
+                ): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="number")
+                ),
+                vol.Required(
+                    CONF_PEAK_SHAVING_GAIN,
+                    default=options.get(
+                        CONF_PEAK_SHAVING_GAIN, PEAK_SHAVING_DEFAULT_GAIN
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.01, max=2)),
+                vol.Required(
+                    CONF_PEAK_SHAVING_RATE,
+                    default=options.get(
+                        CONF_PEAK_SHAVING_RATE, PEAK_SHAVING_DEFAULT_RATE
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=10, max=100000)),
+                vol.Required(
+                    CONF_PEAK_SHAVING_STALE_AFTER,
+                    default=options.get(
+                        CONF_PEAK_SHAVING_STALE_AFTER, PEAK_SHAVING_DEFAULT_STALE_AFTER
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Optional(
+                    CONF_PEAK_SHAVING_FALLBACK,
+                    description={
+                        "suggested_value": options.get(CONF_PEAK_SHAVING_FALLBACK)
+                    },
+                ): vol.Coerce(float),
+                vol.Required(
+                    CONF_SHADOW_MODE,
+                    default=options.get(CONF_SHADOW_MODE, False),
+                ): bool,
+            }
+        )
+
+        return self.async_show_form(step_id="init", data_schema=data_schema)
+
+    async def async_step_entities(self, user_input=None):
+        """Review and override the entity every field is read from."""
+        if user_input is not None:
+            if user_input.pop(CONF_REDISCOVER, False):
+                self._entity_maps = (
+                    resolve_entity_maps(self.hass, self._entry.data)
+                    or self._entity_maps
+                )
+            else:
+                entity_maps = {device_id: {} for device_id in self._entity_maps}
+                for key, (device_id, suffix) in self._fields.items():
+                    entity_maps[device_id][suffix] = user_input.get(key)
+                return self.async_create_entry(
+                    title="", data={**self._options, CONF_ENTITY_MAP: entity_maps}
+                )
+
+        device_registry = dr.async_get(self.hass)
+        schema = {}
+        self._fields = {}
+        for device_id, entity_map in self._entity_maps.items():
+            device = device_registry.async_get(device_id)
+            for suffix, entity_id in sorted(entity_map.items()):
+                key = suffix
+                if len(self._entity_maps) > 1:
+                    # Fields of a stack are listed per unit
+                    key = f"{(device and device.name) or device_id}: {suffix}"
+                self._fields[key] = (device_id, suffix)
+                schema[
+                    vol.Optional(key, description={"suggested_value": entity_id})
+                ] = selector.EntitySelector()
+        schema[vol.Optional(CONF_REDISCOVER, default=False)] = bool
+
+        return self.async_show_form(step_id="entities", data_schema=vol.Schema(schema))
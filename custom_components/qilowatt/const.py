@@ -1,7 +1,75 @@
 DOMAIN = "qilowatt"
 DATA_CLIENT = "client"
+DATA_BROKER = f"{DOMAIN}_broker"  # MQTT broker of a headless collector site
 CONF_INVERTER_MODEL = "inverter_model"
 CONF_INVERTER_ID = "inverter_id"
 CONF_MQTT_USERNAME = "mqtt_username"
 CONF_MQTT_PASSWORD = "mqtt_password"
 CONF_DEVICE_ID = "device_id"
+CONF_DEVICE_IDS = "device_ids"
+UPDATE_INTERVAL = 10
+CONF_FLOAT_PRECISION = "float_precision"
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+STARTUP_TIMEOUT = 60
+READINESS_POLL_INTERVAL = 0.5
+CONF_MODBUS_HOST = "modbus_host"
+CONF_MODBUS_PORT = "modbus_port"
+CONF_MODBUS_UNIT = "modbus_unit"
+CONF_REGISTER_MAP = "register_map"
+MODBUS_DEVICE_ID = "modbus_tcp"
+MODBUS_POLL_INTERVAL = 1
+MODBUS_STALE_AFTER = 30
+MQTT_SOLAR_ASSISTANT_DEVICE_ID = "mqtt_solar_assistant"
+MQTT_VENUS_DEVICE_ID = "mqtt_venus"
+MQTT_TOPICS_STALE_AFTER = 60
+SOLAR_ASSISTANT_TOPIC_PREFIX = "solar_assistant"
+VENUS_KEEPALIVE_INTERVAL = 30
+CONF_PEAK_SHAVING_ENTITY = "peak_shaving_entity"
+CONF_PEAK_SHAVING_GAIN = "peak_shaving_gain"
+CONF_PEAK_SHAVING_RATE = "peak_shaving_rate"
+CONF_PEAK_SHAVING_FALLBACK = "peak_shaving_fallback"
+PEAK_SHAVING_DEFAULT_GAIN = 0.5
+PEAK_SHAVING_DEFAULT_RATE = 1000  # W per second
+PEAK_SHAVING_DEADBAND = 50  # W
+CONF_PEAK_SHAVING_STALE_AFTER = "peak_shaving_stale_after"
+PEAK_SHAVING_DEFAULT_STALE_AFTER = 120  # Above the 30-60 s update period of most sources
+CONF_ENERGY_INTERVAL = "energy_interval"
+CONF_METRICS_INTERVAL = "metrics_interval"
+CONF_ENERGY_TRIGGER = "energy_trigger"
+CONF_METRICS_TRIGGER = "metrics_trigger"
+TRIGGER_TIMER = "timer"  # Published by the SENSOR timer only
+TRIGGER_INTERVAL = "interval"  # Published after every collection
+TRIGGER_CHANGE = "change"  # Published after a collection that changed it
+TRIGGERS = [TRIGGER_TIMER, TRIGGER_INTERVAL, TRIGGER_CHANGE]
+CONF_FILTER_ENABLED = "filter_enabled"
+CONF_FILTER_WINDOW = "filter_window"
+FILTER_DEFAULT_WINDOW = 3
+FILTER_MAX_HOLD = 6  # Samples a rejected value is held for before it passes
+CONF_SHADOW_MODE = "shadow_mode"
+SHADOW_ABS_TOLERANCE = 0.01
+SHADOW_REL_TOLERANCE = 0.001
+SIMULATOR_DEVICE_ID = "simulator"
+CONF_SIMULATOR_SEED = "simulator_seed"
+CONF_SIMULATOR_INTERVAL = "simulator_interval"
+CONF_SIMULATOR_PHASES = "simulator_phases"
+CONF_SIMULATOR_STRINGS = "simulator_strings"
+SIMULATOR_DEFAULT_INTERVAL = 1
+SIMULATOR_STRING_PEAK = 3000  # W
+SIMULATOR_BATTERY_CAPACITY = 10000  # Wh
+SIMULATOR_BATTERY_POWER = 5000  # W
+SIMULATOR_MIN_SOC = 10
+COMMAND_HISTORY_SIZE = 500
+COMMAND_HISTORY_SAVE_DELAY = 60
+LOAD_SHED_METRICS_FACTOR = 6  # METRICS interval multiplier while shedding
+LOAD_SHED_SAMPLE_INTERVAL = 10  # Seconds between energy integrator samples
+CONF_ENTITY_MAP = "entity_map"
+CONF_REDISCOVER = "rediscover"
+ESPHOME_API_DEVICE_ID = "esphome_api"
+CONF_ESPHOME_HOST = "esphome_host"
+CONF_ESPHOME_PORT = "esphome_port"
+CONF_ESPHOME_NOISE_PSK = "esphome_encryption_key"
+ESPHOME_API_DEFAULT_PORT = 6053
+ESPHOME_API_RECONNECT_DELAY = 10
+HEADLESS_RECONNECT_DELAY = 10
+HEADLESS_FORWARD_EVENT = f"{DOMAIN}_workmode"
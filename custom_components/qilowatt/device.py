@@ -0,0 +1,25 @@
+"""Qilowatt device used by the integration."""
+
+import threading
+
+from qilowatt import EnergyData, InverterDevice, MetricsData
+
+
+class QilowattInverterDevice(InverterDevice):
+    """Inverter device that swaps ENERGY and METRICS as one batch."""
+
+    def __init__(self, device_id: str) -> None:
+        """Initialize the device."""
+        super().__init__(device_id)
+        self._data_lock = threading.Lock()
+
+    def set_sensor_data(self, energy_data: EnergyData, metrics_data: MetricsData):
+        """Set ENERGY and METRICS together so a publish never mixes cycles."""
+        with self._data_lock:
+            self.set_energy_data(energy_data)
+            self.set_metrics_data(metrics_data)
+
+    def get_sensor_data(self):
+        """Get current sensor data."""
+        with self._data_lock:
+            return super().get_sensor_data()
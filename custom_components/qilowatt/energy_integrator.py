@@ -0,0 +1,97 @@
+"""Grid import energy integrator for Qilowatt integration."""
+
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Seconds between writes of the counters to storage
+SAVE_DELAY = 300
+
+# Intervals without samples longer than this are not integrated
+MAX_GAP = 300
+
+
+class EnergyIntegrator:
+    """Today and Total grid import energy from the grid power stream.
+
+    Every grid power sample adds the trapezoid between it and the previous
+    sample, counting import only, in kWh. Today restarts at local midnight,
+    keeping the part of an interval that falls after midnight. The counters
+    are written to storage at most every SAVE_DELAY seconds, so restarts
+    keep them without any recorder queries.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id) -> None:
+        """Initialize the integrator."""
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.energy.{entry_id}")
+        self.today = 0.0
+        self.total = 0.0
+        self._last_time = None
+        self._last_power = None
+        self._next_midnight = self._midnight_after(time.time())
+
+    @staticmethod
+    def _midnight_after(timestamp):
+        day = dt_util.as_local(dt_util.utc_from_timestamp(timestamp))
+        return dt_util.start_of_local_day(day.date() + timedelta(days=1)).timestamp()
+
+    async def async_load(self):
+        """Restore the counters from storage."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        self.total = data["total"]
+        self._last_time = data["time"]
+        self._last_power = data["power"]
+        if time.time() < data["next_midnight"]:
+            self.today = data["today"]
+
+    async def async_save(self):
+        """Write the counters to storage now."""
+        await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self):
+        return {
+            "today": self.today,
+            "total": self.total,
+            "next_midnight": self._next_midnight,
+            "time": self._last_time,
+            "power": self._last_power,
+        }
+
+    @callback
+    def async_add_sample(self, power, now=None):
+        """Add a grid power sample in W, positive when importing."""
+        if power is None:
+            return
+        now = time.time() if now is None else now
+        energy = 0.0
+        share = 1.0
+        rollover = now >= self._next_midnight
+        if self._last_time is not None:
+            elapsed = now - self._last_time
+            if 0 < elapsed <= MAX_GAP:
+                energy = (max(self._last_power, 0) + max(power, 0)) / 2 * elapsed / 3600000
+                if rollover:
+                    share = min((now - self._next_midnight) / elapsed, 1.0)
+
+        self.total += energy
+        if rollover:
+            self.today = energy * share
+            self._next_midnight = self._midnight_after(now)
+        else:
+            self.today += energy
+        self._last_time = now
+        self._last_power = power
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
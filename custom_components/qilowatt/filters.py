@@ -0,0 +1,162 @@
+"""Outlier and glitch filter for Qilowatt integration payloads."""
+
+import logging
+from collections import Counter, deque
+from dataclasses import replace
+
+from .const import FILTER_MAX_HOLD
+
+_LOGGER = logging.getLogger(__name__)
+
+# Plausible (min, max) of each field, per element for per phase/string fields.
+# Fields are filtered in this order, so sources come before derived fields.
+ENERGY_RANGES = {
+    "Power": (-50000, 50000),
+    "Today": (0, 10000),
+    "Total": (0, 100000000),
+    "Voltage": (100, 300),
+    "Current": (-200, 200),
+    "Frequency": (45, 65),
+}
+
+METRICS_RANGES = {
+    "PvPower": (0, 50000),
+    "PvVoltage": (0, 1500),
+    "PvCurrent": (-1, 100),
+    "LoadPower": (-5000, 50000),
+    "BatterySOC": (0, 100),
+    "LoadCurrent": (-200, 200),
+    "BatteryPower": (-50000, 50000),
+    "BatteryCurrent": (-1000, 1000),
+    "BatteryVoltage": (0, 1000),
+    "BatteryTemperature": (-40, 100),
+    "InverterTemperature": (-40, 150),
+}
+
+# Fields computed from another field of the same payload; an element is
+# rejected together with the element it was derived from
+ENERGY_DERIVED = {"Current": "Voltage"}
+
+# Counters that only rise, and reset e.g. at midnight. A median would lag
+# them by a sample and hold the old value over a reset, so they are only
+# range checked.
+ENERGY_COUNTERS = {"Today", "Total"}
+
+
+class _Element:
+    """Filter state of one scalar, or one element of a list field."""
+
+    __slots__ = ("window", "last_good", "held")
+
+    def __init__(self, size) -> None:
+        self.window = deque(maxlen=size)
+        self.last_good = None
+        self.held = 0  # Consecutive samples the last good value was held for
+
+    def median(self):
+        # Lower middle element, so ints stay ints and no new values appear
+        ordered = sorted(self.window)
+        return ordered[(len(ordered) - 1) // 2]
+
+
+class SampleFilter:
+    """Plausibility range, rolling median and hold-last-good per field.
+
+    A value outside its plausible range is replaced by the last good value
+    of that field (or element) and counted; until a field has had a good
+    value, its values pass through unchanged. Plausible values go through a
+    rolling median over the last `window` samples, which removes one-sample
+    spikes that are still in range. Each sample costs O(window) per element,
+    with a small fixed window. Fields without a range pass through unchanged,
+    and `counters` skip the median.
+
+    A value is held for at most `max_hold` samples in a row. After that the
+    raw values pass until one is plausible again, so a real outage (e.g. 0 V
+    and 0 Hz) shows after a short delay; every raw value passed this way is
+    counted in `expired`.
+    """
+
+    def __init__(
+        self, ranges, window=3, derived=None, counters=(), max_hold=FILTER_MAX_HOLD
+    ) -> None:
+        """Initialize the filter."""
+        self._ranges = ranges
+        self._window = max(window, 1)
+        self._derived = derived or {}
+        self._counters = counters
+        self._max_hold = max_hold
+        self._state = {}  # field -> list of _Element
+        self.rejected = 0
+        self.rejected_fields = Counter()
+        self.expired = 0
+        self.expired_fields = Counter()
+
+    def apply(self, data):
+        """Return a copy of a payload dataclass with every ranged field filtered."""
+        changes = {}
+        rejected = {}
+        for name, (low, high) in self._ranges.items():
+            value = getattr(data, name, None)
+            if value is None:
+                continue
+            source = rejected.get(self._derived.get(name), ())
+            if isinstance(value, list):
+                elements = self._elements(name, len(value))
+                changes[name], rejected[name] = self._filter_list(
+                    name, value, elements, low, high, source
+                )
+            else:
+                element = self._elements(name, 1)[0]
+                filtered, bad = self._filter(name, value, element, low, high, 0 in source)
+                changes[name] = filtered
+                rejected[name] = (0,) if bad else ()
+        return replace(data, **changes)
+
+    def _filter_list(self, name, values, elements, low, high, source):
+        filtered = []
+        bad_indices = []
+        for index, (value, element) in enumerate(zip(values, elements)):
+            result, bad = self._filter(name, value, element, low, high, index in source)
+            filtered.append(result)
+            if bad:
+                bad_indices.append(index)
+        return filtered, bad_indices
+
+    def _filter(self, name, value, element, low, high, source_bad):
+        """Return the filtered value and whether the raw value was rejected."""
+        if value is None:
+            return None, False
+        if source_bad or not low <= value <= high:
+            if element.last_good is None:
+                # Nothing to hold yet, e.g. a phase that is always 0 on a
+                # single phase system; pass through until one is plausible
+                return value, False
+            if element.held >= self._max_hold:
+                if not self.expired_fields[name]:
+                    _LOGGER.warning(
+                        "%s implausible for %s samples, passing %s through",
+                        name,
+                        element.held,
+                        value,
+                    )
+                self.expired += 1
+                self.expired_fields[name] += 1
+                return value, False
+            element.held += 1
+            self.rejected += 1
+            self.rejected_fields[name] += 1
+            _LOGGER.debug("Rejected %s=%s, holding %s", name, value, element.last_good)
+            return element.last_good, True
+        element.held = 0
+        if name in self._counters:
+            element.last_good = value
+        else:
+            element.window.append(value)
+            element.last_good = element.median()
+        return element.last_good, False
+
+    def _elements(self, name, count):
+        elements = self._state.setdefault(name, [])
+        while len(elements) < count:
+            elements.append(_Element(self._window))
+        return elements
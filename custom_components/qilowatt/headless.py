@@ -0,0 +1,420 @@
+"""Headless collector for Qilowatt integration."""
+
+import asyncio
+import itertools
+import json
+import logging
+from collections import namedtuple
+from pathlib import Path
+from types import SimpleNamespace
+
+import aiohttp
+import paho.mqtt.client as mqtt
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_PEAK_SHAVING_ENTITY,
+    DATA_BROKER,
+    DOMAIN,
+    HEADLESS_FORWARD_EVENT,
+    HEADLESS_RECONNECT_DELAY,
+)
+from .inverter import get_entity_maps, get_inverter_class
+from .inverter.mqtt_topics import MqttTopicMixin
+from .mqtt_client import MQTTClient
+from .supervisor import TaskSupervisor
+
+_LOGGER = logging.getLogger(__name__)
+
+# State sources of a site, by what the backend reads
+SOURCE_HOME_ASSISTANT = "home_assistant"  # Entities of a remote HA, over its websocket API
+SOURCE_MQTT = "mqtt"  # Topics of an MQTT broker
+SOURCE_DIRECT = "direct"  # The backend connects to the inverter itself
+
+# Stand-in for a HA MQTT ReceiveMessage, with the payload decoded likewise
+Message = namedtuple("Message", ["topic", "payload"])
+
+
+class HeadlessEntry:
+    """The parts of a config entry that the pipeline reads."""
+
+    def __init__(self, site_id, config) -> None:
+        """Initialize from the data and options of a site."""
+        self.entry_id = site_id
+        self.title = config.get("title", site_id)
+        self.data = config["data"]
+        self.options = config.get("options", {})
+
+
+def source_type(data):
+    """Return the state source the backend of a config entry needs."""
+    inverter_class = get_inverter_class(data["inverter_model"])
+    if inverter_class.ENTITY_BASED:
+        return SOURCE_HOME_ASSISTANT
+    if issubclass(inverter_class, MqttTopicMixin):
+        return SOURCE_MQTT
+    return SOURCE_DIRECT
+
+
+class HomeAssistantSource:
+    """Mirror the source entities of a site from a remote Home Assistant.
+
+    Subscribes to the pinned entities of the entry (and the peak shaving
+    entity) over the websocket API and writes them into the site's local
+    state machine, where the entity based backends read them as usual.
+    `number.set_value` calls of the peak shaving controller are forwarded,
+    and every WORKMODE command is fired on the remote bus as a
+    `qilowatt_workmode` event, so automations there can act on it. A
+    Qilowatt entry still loaded there is reported, as it would publish and
+    handle commands too.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry, config) -> None:
+        """Initialize a disconnected source."""
+        self.hass = hass
+        self.url = config["url"]
+        self.token = config["token"]
+        self.inverter_id = entry.data["inverter_id"]
+        entity_ids = {
+            entity_id
+            for entity_map in get_entity_maps(entry).values()
+            for entity_id in entity_map.values()
+            if entity_id is not None
+        }
+        if entity_ids and entry.options.get(CONF_PEAK_SHAVING_ENTITY):
+            entity_ids.add(entry.options[CONF_PEAK_SHAVING_ENTITY])
+        self.entity_ids = sorted(entity_ids)
+        self._ws = None
+        self._ids = itertools.count(1)
+        self._entries_request = None
+        self._supervisor = None
+
+    async def async_start(self, supervisor):
+        """Start mirroring the entities."""
+        if not self.entity_ids:
+            _LOGGER.error(
+                "%s: no pinned entities, set the entry up in Home Assistant first",
+                self.url,
+            )
+            return
+        self._supervisor = supervisor
+        self.hass.services.async_register("number", "set_value", self._forward_service)
+        supervisor.async_on_shutdown(
+            async_dispatcher_connect(
+                self.hass,
+                f"{DOMAIN}_workmode_update_{self.inverter_id}",
+                self._forward_command,
+            )
+        )
+        supervisor.create_task(self._run(), "home assistant source")
+
+    async def async_stop(self):
+        """Close the websocket connection."""
+        if self._ws is not None:
+            await self._ws.close()
+
+    async def _run(self):
+        failing = False
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=30) as ws:
+                        await self._async_auth(ws)
+                        self._entries_request = next(self._ids)
+                        await ws.send_json(
+                            {
+                                "id": self._entries_request,
+                                "type": "config_entries/get",
+                                "domain": DOMAIN,
+                            }
+                        )
+                        subscription = next(self._ids)
+                        await ws.send_json(
+                            {
+                                "id": subscription,
+                                "type": "subscribe_entities",
+                                "entity_ids": self.entity_ids,
+                            }
+                        )
+                        if failing:
+                            _LOGGER.info("Connection to %s recovered", self.url)
+                        failing = False
+                        self._ws = ws
+                        async for message in ws:
+                            if message.type != aiohttp.WSMsgType.TEXT:
+                                break
+                            self._handle(subscription, message.json())
+                except (aiohttp.ClientError, ConnectionError, TimeoutError) as e:
+                    if not failing:
+                        _LOGGER.warning("Connection to %s failed: %s", self.url, e)
+                    failing = True
+                finally:
+                    self._ws = None
+                # Do not publish values that are no longer updated
+                for entity_id in self.entity_ids:
+                    self.hass.states.async_set(entity_id, "unavailable")
+                await asyncio.sleep(HEADLESS_RECONNECT_DELAY)
+
+    async def _async_auth(self, ws):
+        message = await ws.receive_json()
+        if message["type"] == "auth_required":
+            await ws.send_json({"type": "auth", "access_token": self.token})
+            message = await ws.receive_json()
+        if message["type"] != "auth_ok":
+            raise ConnectionError(f"Authentication failed: {message.get('message')}")
+
+    @callback
+    def _handle(self, subscription, message):
+        if message.get("id") == self._entries_request and message.get("success"):
+            loaded = [entry["title"] for entry in message["result"] if entry["state"] == "loaded"]
+            if loaded:
+                _LOGGER.error(
+                    "%s: Qilowatt entry %s is still loaded there, disable it so the "
+                    "site is not published and commanded twice",
+                    self.url,
+                    ", ".join(loaded),
+                )
+            return
+        if message.get("id") != subscription:
+            return
+        if message["type"] == "result" and not message["success"]:
+            _LOGGER.error("%s: could not subscribe: %s", self.url, message["error"])
+            return
+        event = message.get("event", {})
+        for entity_id, state in event.get("a", {}).items():
+            self.hass.states.async_set(entity_id, state["s"], state.get("a", {}))
+        for entity_id, diff in event.get("c", {}).items():
+            current = self.hass.states.get(entity_id)
+            attributes = dict(current.attributes) if current else {}
+            for name in diff.get("-", {}).get("a", ()):
+                attributes.pop(name, None)
+            added = diff.get("+", {})
+            attributes.update(added.get("a", {}))
+            value = added.get("s", current.state if current else "unknown")
+            self.hass.states.async_set(entity_id, value, attributes)
+        for entity_id in event.get("r", ()):
+            self.hass.states.async_set(entity_id, "unavailable")
+
+    async def _async_send(self, message):
+        if self._ws is None:
+            _LOGGER.warning("%s: not connected, dropped %s", self.url, message["type"])
+            return
+        await self._ws.send_json({"id": next(self._ids), **message})
+
+    async def _forward_service(self, call):
+        await self._async_send(
+            {
+                "type": "call_service",
+                "domain": call.domain,
+                "service": call.service,
+                "service_data": dict(call.data),
+            }
+        )
+
+    @callback
+    def _forward_command(self, command):
+        self._supervisor.create_task(
+            self._async_send(
+                {
+                    "type": "fire_event",
+                    "event_type": HEADLESS_FORWARD_EVENT,
+                    "event_data": {"inverter_id": self.inverter_id, **command.to_dict()},
+                }
+            ),
+            "forward command",
+        )
+
+
+class MqttBrokerSource:
+    """MQTT broker connection that the topic based backends subscribe through.
+
+    Stands in for Home Assistant's MQTT integration: messages are delivered
+    on the event loop with the payload decoded to str, like HA delivers them.
+    """
+
+    def __init__(self, hass: HomeAssistant, config) -> None:
+        """Initialize a disconnected broker client."""
+        self.hass = hass
+        self.host = config["host"]
+        self.port = config.get("port", 1883)
+        self._subscriptions = []  # (topic filter, callback)
+        self._client = mqtt.Client()
+        if config.get("username"):
+            self._client.username_pw_set(config["username"], config.get("password"))
+        self._client.on_connect = self._on_connect
+        self._client.on_message = self._on_message
+
+    async def async_start(self, supervisor):
+        """Connect to the broker in the background."""
+        self._client.connect_async(self.host, self.port)
+        self._client.loop_start()
+
+    async def async_stop(self):
+        """Disconnect from the broker."""
+        self._client.disconnect()
+        await self.hass.async_add_executor_job(self._client.loop_stop)
+
+    async def async_subscribe(self, topic_filter, msg_callback):
+        """Subscribe to a topic filter. Returns an unsubscriber."""
+        subscription = (topic_filter, msg_callback)
+        self._subscriptions.append(subscription)
+        self._client.subscribe(topic_filter)
+
+        def unsubscribe():
+            self._subscriptions.remove(subscription)
+            if not any(other == topic_filter for other, _ in self._subscriptions):
+                self._client.unsubscribe(topic_filter)
+
+        return unsubscribe
+
+    async def async_publish(self, topic, payload):
+        """Publish a message."""
+        self._client.publish(topic, payload)
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc != 0:
+            _LOGGER.warning("MQTT connection to %s refused: %s", self.host, rc)
+            return
+        # Subscriptions do not survive a reconnect to a clean session
+        for topic_filter in {topic_filter for topic_filter, _ in self._subscriptions}:
+            client.subscribe(topic_filter)
+
+    def _on_message(self, client, userdata, msg):
+        message = Message(msg.topic, msg.payload.decode("utf-8", errors="replace"))
+        self.hass.loop.call_soon_threadsafe(self._async_deliver, message)
+
+    @callback
+    def _async_deliver(self, message):
+        for topic_filter, msg_callback in list(self._subscriptions):
+            if mqtt.topic_matches_sub(topic_filter, message.topic):
+                msg_callback(message)
+
+
+class HeadlessSite:
+    """One config entry collected and published outside Home Assistant.
+
+    Every site gets its own bare Home Assistant core for the state machine,
+    dispatcher and storage the pipeline uses, with no HTTP server,
+    integrations or recorder, so many sites can share one event loop.
+    Home Assistant keeps the last core created as the process-wide
+    `async_get_hass()`, and a single default time zone, so the pipeline is
+    given its core explicitly and every site runs in the collector's zone.
+    """
+
+    def __init__(self, site_id, config, data_dir) -> None:
+        """Initialize a stopped site."""
+        self.site_id = site_id
+        self.config = config
+        self.entry = HeadlessEntry(site_id, config)
+        self.config_dir = Path(data_dir) / site_id
+        self.source_type = source_type(self.entry.data)
+        if config.get("source", {}).get("type", SOURCE_DIRECT) != self.source_type:
+            raise ValueError(
+                f"{site_id}: the {self.entry.data['inverter_model']} backend "
+                f"needs a {self.source_type} source"
+            )
+        self.hass = None
+        self.source = None
+        self.client = None
+        self.supervisor = None
+
+    async def async_start(self, manifest):
+        """Start the state source and the pipeline of the site."""
+        if self.hass is None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: self.config_dir.mkdir(parents=True, exist_ok=True)
+            )
+            self.hass = HomeAssistant(str(self.config_dir))
+            self.hass.config.time_zone = str(dt_util.DEFAULT_TIME_ZONE)
+            await dr.async_load(self.hass)
+            await er.async_load(self.hass)
+            # Read by MQTTClient for the version data it reports
+            self.hass.data["integrations"] = {DOMAIN: manifest}
+        self.supervisor = TaskSupervisor(self.hass, f"{self.entry.title} source")
+
+        if self.source_type == SOURCE_HOME_ASSISTANT:
+            self.source = HomeAssistantSource(self.hass, self.entry, self.config["source"])
+        elif self.source_type == SOURCE_MQTT:
+            self.source = MqttBrokerSource(self.hass, self.config["source"])
+            self.hass.data[DATA_BROKER] = self.source
+        if self.source is not None:
+            await self.source.async_start(self.supervisor)
+
+        self.client = MQTTClient(self.hass, self.entry)
+        await self.client.start()
+        _LOGGER.info("%s: collecting %s", self.site_id, self.entry.data["inverter_model"])
+
+    async def async_stop(self):
+        """Stop the pipeline and the state source, saving their storage."""
+        if self.client is not None:
+            await self.client.async_stop()
+        if self.supervisor is not None:
+            await self.supervisor.async_shutdown()
+        if self.source is not None:
+            await self.source.async_stop()
+        self.client = self.supervisor = self.source = None
+
+
+def load_manifest():
+    """Return the integration manifest, in the shape of a loaded integration."""
+    manifest = json.loads((Path(__file__).parent / "manifest.json").read_text())
+    return SimpleNamespace(version=manifest["version"], requirements=manifest["requirements"])
+
+
+async def _async_start_site(site, manifest):
+    """Start a site, retrying while e.g. the Qilowatt broker is unreachable."""
+    while True:
+        try:
+            await site.async_start(manifest)
+            return
+        except Exception as e:  # pylint: disable=broad-except
+            _LOGGER.warning(
+                "%s: could not start: %s, retrying in %s seconds",
+                site.site_id,
+                e,
+                HEADLESS_RECONNECT_DELAY,
+            )
+            try:
+                await site.async_stop()
+            except Exception:  # pylint: disable=broad-except
+                site.client = site.supervisor = site.source = None
+        await asyncio.sleep(HEADLESS_RECONNECT_DELAY)
+
+
+def get_time_zone(name):
+    """Return the time zone of a collector by name, raising ValueError if unknown."""
+    time_zone = dt_util.get_time_zone(name)
+    if time_zone is None:
+        raise ValueError(f"Unknown time zone: {name}")
+    return time_zone
+
+
+async def async_run(sites, data_dir, time_zone="UTC"):
+    """Run every site of a collector until cancelled.
+
+    `sites` maps a site id to its config entry `data` and `options`, as
+    stored by Home Assistant, an optional `title` and the `source` to read
+    from. Storage, e.g. the command history, is kept per site in data_dir.
+    Every site is checked before any is started; sites then start
+    concurrently and independently. `time_zone` is where the local energy
+    counters roll over at midnight; Home Assistant supports only one per
+    process, so sites in other zones need a collector of their own.
+    """
+    dt_util.set_default_time_zone(get_time_zone(time_zone))
+    loop = asyncio.get_running_loop()
+    manifest = await loop.run_in_executor(None, load_manifest)
+    running = [HeadlessSite(site_id, config, data_dir) for site_id, config in sites.items()]
+    try:
+        await asyncio.gather(*(_async_start_site(site, manifest) for site in running))
+        _LOGGER.info("Collecting %s sites", len(running))
+        await asyncio.Event().wait()
+    finally:
+        for site in running:
+            await site.async_stop()
+        for site in running:
+            if site.hass is not None:
+                await site.hass.async_stop(force=True)
@@ -1,9 +1,23 @@
+from types import SimpleNamespace
+
+from ..const import CONF_ENTITY_MAP
 from .huawei import HuaweiInverter
 from .solarassistant import SolarAssistantInverter
 from .solarman import SolarmanInverter
 from .sofar import SofarInverter
 from .esphome import EspHomeInverter
+from .esphome_api import EspHomeApiInverter
 from .victron import VictronInverter
+from .modbus import ModbusInverter
+from .simulator import SimulatorInverter
+from .mqtt_topics import SolarAssistantMqttInverter, VenusMqttInverter
+from .stack import InverterStack
+from .indexed import (
+    IndexedEspHomeInverter,
+    IndexedSolarAssistantInverter,
+    IndexedSolarmanInverter,
+    IndexedVictronInverter,
+)
 
 # from .deye_synsynk import SynsynkInverter
 # from .growatt import GrowattInverter
@@ -16,6 +30,19 @@ INVERTER_INTEGRATIONS = {
     "Huawei": HuaweiInverter,
     "EspHome": EspHomeInverter,
     "Victron": VictronInverter,
+    "Modbus": ModbusInverter,
+    "EspHomeApi": EspHomeApiInverter,
+    "SolarAssistantMqtt": SolarAssistantMqttInverter,
+    "VenusMqtt": VenusMqttInverter,
+    "Simulator": SimulatorInverter,
+}
+
+# Alternate implementations that shadow mode runs alongside the active one
+SHADOW_INTEGRATIONS = {
+    "SolarAssistant": IndexedSolarAssistantInverter,
+    "Solarman": IndexedSolarmanInverter,
+    "EspHome": IndexedEspHomeInverter,
+    "Victron": IndexedVictronInverter,
 }
 
 
@@ -24,3 +51,57 @@ def get_inverter_class(model_name):
         return INVERTER_INTEGRATIONS[model_name]
     except KeyError:
         raise ValueError(f"Unsupported inverter model: {model_name}")
+
+
+def create_inverter(hass, config_entry, inverter_class=None, pinned=True):
+    """Create the inverter for a config entry, stacking parallel units.
+
+    With `pinned` False the units ignore the pinned entity maps and look
+    every entity up, as the alternate collector of shadow mode does.
+    """
+    inverter_class = inverter_class or get_inverter_class(config_entry.data["inverter_model"])
+    device_ids = config_entry.data.get("device_ids") or [config_entry.data["device_id"]]
+    if not inverter_class.PER_DEVICE_ENTITIES:
+        # Every unit would read the same entities, counting them several times
+        device_ids = device_ids[:1]
+    entity_maps = get_entity_maps(config_entry) if pinned else {}
+    inverters = {}
+    for device_id in device_ids:
+        inverters[device_id] = inverter_class(hass, config_entry, device_id)
+        if device_id in entity_maps:
+            inverters[device_id].use_entity_map(entity_maps[device_id])
+    if len(inverters) == 1:
+        return inverters[device_ids[0]]
+    return InverterStack(hass, config_entry, inverters)
+
+
+def get_entity_maps(config_entry):
+    """Return the pinned entity map of every unit, as set up or as overridden.
+
+    The options flow saves complete maps, which replace the ones resolved
+    when the entry was set up.
+    """
+    return {
+        **config_entry.data.get(CONF_ENTITY_MAP, {}),
+        **config_entry.options.get(CONF_ENTITY_MAP, {}),
+    }
+
+
+def resolve_entity_maps(hass, data):
+    """Resolve the entity of every field of every unit, from config entry data.
+
+    Returns None for backends that do not read entities, or if any unit
+    could not be resolved; the backends then look entities up at runtime.
+    """
+    inverter_class = get_inverter_class(data["inverter_model"])
+    if not inverter_class.ENTITY_BASED:
+        return None
+    entry = SimpleNamespace(data=data, options={})
+    device_ids = data.get("device_ids") or [data["device_id"]]
+    entity_maps = {
+        device_id: inverter_class(hass, entry, device_id).resolve_entity_map()
+        for device_id in device_ids
+    }
+    if None in entity_maps.values():
+        return None
+    return entity_maps
@@ -1,14 +1,65 @@
 # custom_components/qilowatt/inverter/base_inverter.py
 
+import logging
+import re
+import threading
 from abc import ABC, abstractmethod
+from collections import Counter
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
 
 
 class BaseInverter(ABC):
     """Abstract base class for inverter implementations."""
 
+    # Entities that must report a value before the first sample is published
+    REQUIRED_ENTITIES = ()
+
+    # Indexed field of the grid power per phase, and its scale to W import
+    GRID_POWER_TEMPLATE = "grid_l{}_power"
+    GRID_POWER_SCALE = 1
+
+    # Whether the backend reads the Today and Total import energy counters;
+    # missing ones are integrated locally from the grid power
+    HAS_TODAY_ENERGY = True
+    HAS_TOTAL_ENERGY = True
+
+    # Whether fields are read from Home Assistant entities, which can then be
+    # pinned per field in the config entry
+    ENTITY_BASED = True
+
+    # Whether the entities of each source device can be told apart, so that
+    # several devices can be stacked in one config entry
+    PER_DEVICE_ENTITIES = True
+
+    # Entity of the rated battery capacity, weighting the unit in a parallel
+    # stack; read only when it reports a capacity unit, not a percentage
+    BATTERY_CAPACITY_ENTITY = None
+    CAPACITY_UNITS = {"Ah": 1, "kWh": 1, "Wh": 0.001}
+
     def __init__(self, hass, config_entry):
         self.hass = hass
         self.config_entry = config_entry
+        # State machine read by entity based backends; a snapshot replaces it
+        # only in the thread that collects from it, see use_states
+        self._live_states = hass.states
+        self._thread_states = threading.local()
+        self._indexed_fields = {}
+        self._grid_listeners = []
+        # Entity suffix -> reads that found it missing or unavailable
+        self.missing_fields = Counter()
+        # Pinned entity suffix -> entity id, replacing the lookup by suffix
+        self.entity_map = None
+
+    @property
+    def states(self):
+        """Return the states this thread reads: its snapshot, or the state machine."""
+        states = getattr(self._thread_states, "states", None)
+        return self._live_states if states is None else states
 
     @abstractmethod
     def get_energy_data(self):
@@ -19,3 +70,221 @@ class BaseInverter(ABC):
     def get_metrics_data(self):
         """Retrieve METRICS data."""
         pass
+
+    async def async_start(self, supervisor):
+        """Start any background work of the backend, e.g. a poll loop.
+
+        Tasks must be created through the entry's TaskSupervisor so they are
+        cancelled when the entry is unloaded.
+        """
+
+    async def async_stop(self):
+        """Release the resources of the backend, e.g. open connections."""
+
+    @callback
+    def handle_command(self, command):
+        """React to a received WORKMODE command, on the event loop.
+
+        Returns True if the backend actuated the command itself. Entity based
+        backends leave actuation to automations and ignore it.
+        """
+        return False
+
+    def resolve_entity(self, entity_id):
+        """Return the id of the entity ending with entity_id, or None."""
+        return next(
+            (entity for entity in self.indexed_entity_ids() if entity.endswith(entity_id)),
+            None,
+        )
+
+    def entity_for(self, entity_id):
+        """Return the id of the entity a field is read from, pinned or resolved."""
+        if self.entity_map is not None:
+            return self.entity_map.get(entity_id)
+        return self.resolve_entity(entity_id)
+
+    def find_entity_state(self, entity_id):
+        """Return the state of the entity a field is read from."""
+        target = self.entity_for(entity_id)
+        return None if target is None else self.states.get(target)
+
+    def use_entity_map(self, entity_map):
+        """Read every field from its entity in `entity_map`, without any lookup."""
+        self.entity_map = entity_map
+        self._indexed_fields.clear()
+
+    def resolve_entity_map(self):
+        """Return the entity every field resolves to now, to be pinned.
+
+        Runs one collection that records each field looked up and the entity
+        id it resolved to, or None where none did. Returns None if the
+        collection fails, as a partial map would hide the other fields.
+        """
+        entity_map = {}
+        resolve = self.entity_for
+
+        def record(entity_id):
+            entity_map[entity_id] = resolve(entity_id)
+            return entity_map[entity_id]
+
+        self.entity_for = record
+        try:
+            self.is_ready()
+            for suffix in self.grid_power_suffixes():
+                record(suffix)
+            self.get_energy_data()
+            self.get_metrics_data()
+            self.get_battery_capacity()
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Could not resolve the entities of %s", type(self).__name__)
+            return None
+        finally:
+            del self.entity_for
+            self.missing_fields.clear()
+        return entity_map
+
+    def is_ready(self):
+        """Return True once every required source entity reports a value."""
+        for entity_id in self.REQUIRED_ENTITIES:
+            state = self.find_entity_state(entity_id)
+            if state is None or state.state in ("unknown", "unavailable", ""):
+                return False
+        return True
+
+    def indexed_entity_ids(self):
+        """Return the entity ids that indexed fields are discovered from."""
+        return getattr(self, "inverter_entities", ())
+
+    def discover_indexed(self, template, minimum=1):
+        """Return the entity suffixes of an indexed field, ordered by index.
+
+        `template` holds a `{}` placeholder for the index, e.g. "pv{}_power".
+        Every index found among the entity ids is returned, and indices up to
+        `minimum` are always included so the payload keeps its shape when an
+        entity is missing. The result is cached per template.
+        """
+        suffixes = self._indexed_fields.get(template)
+        if suffixes is None:
+            pattern = re.compile(
+                re.escape(template).replace(r"\{\}", r"(\d+)") + "$"
+            )
+            indices = set(range(1, minimum + 1))
+            if self.entity_map is not None:
+                entity_ids = self.entity_map
+            else:
+                entity_ids = self.indexed_entity_ids()
+            for entity_id in entity_ids:
+                match = pattern.search(entity_id)
+                if match:
+                    indices.add(int(match.group(1)))
+            suffixes = [template.format(index) for index in sorted(indices)]
+            self._indexed_fields[template] = suffixes
+        return suffixes
+
+    def get_state_floats(self, template, minimum=1, scale=1):
+        """Return one float per index of an indexed field, multiplied by scale."""
+        values = [
+            self.get_state_float(suffix)
+            for suffix in self.discover_indexed(template, minimum)
+        ]
+        if scale == 1:
+            return values
+        return [value * scale if value is not None else None for value in values]
+
+    def get_module_floats(self, template, fallback, scale=1):
+        """Return per-module floats of an indexed field.
+
+        Falls back to the single `fallback` entity when no modules are found,
+        e.g. one battery instead of a stack of battery modules.
+        """
+        values = self.get_state_floats(template, minimum=0, scale=scale)
+        if values:
+            return values
+        value = self.get_state_float(fallback)
+        return [value * scale if value is not None else None]
+
+    def get_module_average(self, template, fallback):
+        """Return the mean of an indexed field as int, or the fallback entity."""
+        values = [
+            value
+            for value in self.get_state_floats(template, minimum=0)
+            if value is not None
+        ]
+        if values:
+            return int(sum(values) / len(values))
+        return self.get_state_int(fallback)
+
+    def grid_power_suffixes(self):
+        """Return the entity suffixes of the grid power per phase."""
+        return self.discover_indexed(self.GRID_POWER_TEMPLATE, minimum=3)
+
+    def get_grid_power(self):
+        """Return the total grid power in W, positive when importing."""
+        values = [self.get_state_float(suffix) for suffix in self.grid_power_suffixes()]
+        return sum(value for value in values if value is not None) * self.GRID_POWER_SCALE
+
+    @callback
+    def async_track_grid_power(self, action):
+        """Call action whenever the grid power changes. Returns an unsubscriber."""
+        entity_ids = [
+            entity_id
+            for entity_id in map(self.entity_for, self.grid_power_suffixes())
+            if entity_id is not None
+        ]
+        return async_track_state_change_event(self.hass, entity_ids, action)
+
+    def get_grid_power_age(self):
+        """Return seconds since the grid power was last reported, if known.
+
+        A state changed event fires only when a value changes, so this reads
+        the time the source last reported a value, even an unchanged one
+        (`last_updated` before Home Assistant 2024.7). Backends notifying grid
+        power themselves return None.
+        """
+        if not self.ENTITY_BASED:
+            return None
+        reported = []
+        for suffix in self.grid_power_suffixes():
+            state = self.find_entity_state(suffix)
+            if state is not None:
+                reported.append(getattr(state, "last_reported", state.last_updated))
+        if not reported:
+            return None
+        return (dt_util.utcnow() - max(reported)).total_seconds()
+
+    @callback
+    def _async_add_grid_listener(self, action):
+        """Register action for backends that notify grid power changes themselves."""
+        self._grid_listeners.append(action)
+        return lambda: self._grid_listeners.remove(action)
+
+    @callback
+    def _async_notify_grid_power(self):
+        for action in list(self._grid_listeners):
+            action(None)
+
+    def use_states(self, states):
+        """Read entity states from `states` in the calling thread, e.g. a snapshot.
+
+        Other threads, such as event loop callbacks reading the grid power,
+        keep reading the state machine. None goes back to the state machine.
+        """
+        self._thread_states.states = states
+
+    def get_missing_fields(self):
+        """Return how often each source field was read while missing."""
+        return self.missing_fields
+
+    def get_battery_capacity(self):
+        """Return the battery capacity used to weight a parallel stack, if known."""
+        if self.BATTERY_CAPACITY_ENTITY is None:
+            return None
+        state = self.find_entity_state(self.BATTERY_CAPACITY_ENTITY)
+        if state is None:
+            return None
+        scale = self.CAPACITY_UNITS.get(state.attributes.get("unit_of_measurement"))
+        try:
+            capacity = float(state.state) * scale
+        except (TypeError, ValueError):
+            return None
+        return capacity if capacity > 0 else None
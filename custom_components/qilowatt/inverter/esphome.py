@@ -12,27 +12,21 @@ _LOGGER = logging.getLogger(__name__)
 class EspHomeInverter(BaseInverter):
     """Implementation for EspHome integrated inverters."""
 
-    def __init__(self, hass: HomeAssistant, config_entry):
+    REQUIRED_ENTITIES = ("_external_ct_l1_power", "_battery_capacity")
+    GRID_POWER_TEMPLATE = "_external_ct_l{}_power"
+    HAS_TOTAL_ENERGY = False
+    BATTERY_CAPACITY_ENTITY = "_battery_rated_capacity"
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
         super().__init__(hass, config_entry)
         self.hass = hass
-        self.device_id = config_entry.data["device_id"]
+        self.device_id = device_id or config_entry.data["device_id"]
         self.entity_registry = er.async_get(hass)
         self.inverter_entities = {}
         for entity in self.entity_registry.entities.values():
             if entity.device_id == self.device_id:
                 self.inverter_entities[entity.entity_id] = entity.name
 
-    def find_entity_state(self, entity_id):
-        """Helper method to find a state by entity_id."""
-        return next(
-            (
-                self.hass.states.get(entity)
-                for entity in self.inverter_entities
-                if entity.endswith(entity_id)
-            ),
-            None,
-        )
-
     def get_state_float(self, entity_id, default=0.0):
         """Helper method to get a sensor state as float."""
 
@@ -44,6 +38,7 @@ class EspHomeInverter(BaseInverter):
                 _LOGGER.warning(f"Could not convert state of {entity_id} to float")
         else:
             _LOGGER.warning(f"State of {entity_id} is unavailable or unknown")
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_state_int(self, entity_id, default=0):
@@ -56,23 +51,16 @@ class EspHomeInverter(BaseInverter):
                 _LOGGER.warning(f"Could not convert state of {entity_id} to int")
         else:
             _LOGGER.warning(f"State of {entity_id} is unavailable or unknown")
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_energy_data(self):
         """Retrieve ENERGY data."""
-        power = [
-            self.get_state_float("_external_ct_l1_power"),
-            self.get_state_float("_external_ct_l2_power"),
-            self.get_state_float("_external_ct_l3_power"),
-        ]
+        power = self.get_state_floats("_external_ct_l{}_power", minimum=3)
         today = self.get_state_float("_daily_energy_bought")
         total = 0.0  # As per payload
-        current = [0.0, 0.0, 0.0]  # As per payload
-        voltage = [
-            self.get_state_float("_grid_voltage_l1"),
-            self.get_state_float("_grid_voltage_l2"),
-            self.get_state_float("_grid_voltage_l3"),
-        ]
+        voltage = self.get_state_floats("_grid_voltage_l{}", minimum=3)
+        current = [round(x / y, 2) if y else 0 for x, y in zip(power, voltage)]
         frequency = self.get_state_float("_inverter_frequency")
 
         return EnergyData(
@@ -86,32 +74,19 @@ class EspHomeInverter(BaseInverter):
 
     def get_metrics_data(self):
         """Retrieve METRICS data."""
-        pv_power = [
-            self.get_state_float("_pv1_power"),
-            self.get_state_float("_pv2_power"),
-        ]
-        pv_voltage = [
-            self.get_state_float("_pv1_voltage"),
-            self.get_state_float("_pv2_voltage"),
-        ]
-        pv_current = [
-            self.get_state_float("_pv1_current"),
-            self.get_state_float("_pv2_current"),
-        ]
-        load_power = [
-            self.get_state_float("_load_power_l1"),
-            self.get_state_float("_load_power_l2"),
-            self.get_state_float("_load_power_l3"),
-        ]
+        pv_power = self.get_state_floats("_pv{}_power", minimum=2)
+        pv_voltage = self.get_state_floats("_pv{}_voltage", minimum=2)
+        pv_current = self.get_state_floats("_pv{}_current", minimum=2)
+        load_power = self.get_state_floats("_load_power_l{}", minimum=3)
         alarm_codes = [self.get_state_int("_error1"), self.get_state_int("_error2"), self.get_state_int("_error3"), self.get_state_int("_warning1"), self.get_state_int("_warning2"), self.get_state_int("_warning3")]
-        battery_soc = self.get_state_int("_battery_capacity")
+        battery_soc = self.get_module_average("_battery_{}_capacity", "_battery_capacity")
         load_current = [0.0, 0.0, 0.0]  # As per payload
-        battery_power = [-1 * self.get_state_float("_battery_output_power")]
-        battery_current = [-1 * self.get_state_float("_battery_output_current")]
-        battery_voltage = [self.get_state_float("_battery_voltage")]
+        battery_power = self.get_module_floats("_battery_{}_output_power", "_battery_output_power", scale=-1)
+        battery_current = self.get_module_floats("_battery_{}_output_current", "_battery_output_current", scale=-1)
+        battery_voltage = self.get_module_floats("_battery_{}_voltage", "_battery_voltage")
         inverter_status = 0  # As per payload
         grid_export_limit = self.get_state_float("_max_solar_sell_power")
-        battery_temperature = [self.get_state_float("_battery_temperature")]
+        battery_temperature = self.get_module_floats("_battery_{}_temperature", "_battery_temperature")
         inverter_temperature = self.get_state_float("_heat_sink_temperature")
 
         return MetricsData(
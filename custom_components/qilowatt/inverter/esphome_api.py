@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from collections import namedtuple
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import slugify
+
+from ..const import (
+    CONF_ESPHOME_HOST,
+    CONF_ESPHOME_NOISE_PSK,
+    CONF_ESPHOME_PORT,
+    ESPHOME_API_DEFAULT_PORT,
+    ESPHOME_API_RECONNECT_DELAY,
+)
+from .base_inverter import BaseInverter
+from .esphome import EspHomeInverter
+
+_LOGGER = logging.getLogger(__name__)
+
+# Stand-in for a HA State, so the ESPHome field mapping can read the table
+ApiState = namedtuple("ApiState", ["state", "attributes"], defaults=[{}])
+
+
+class EspHomeApiInverter(EspHomeInverter):
+    """Implementation reading a Deye ESP32 board over the ESPHome native API.
+
+    A supervised task connects to the board, lists its entities and
+    subscribes to its state stream, keeping the latest state of every entity
+    under a key shaped like the entity ids the ESPHome integration creates,
+    e.g. `_deye_external_ct_l1_power`. The field mapping of the ESPHome
+    backend is reused unchanged, but reads never wait for the ESPHome
+    integration or the HA state machine.
+    """
+
+    ENTITY_BASED = False
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
+        BaseInverter.__init__(self, hass, config_entry)
+        self.hass = hass
+        self.device_id = device_id or config_entry.data["device_id"]
+        self.host = config_entry.data[CONF_ESPHOME_HOST]
+        self.port = config_entry.data.get(CONF_ESPHOME_PORT, ESPHOME_API_DEFAULT_PORT)
+        self.noise_psk = config_entry.data.get(CONF_ESPHOME_NOISE_PSK) or None
+        self.client = None
+        self.connected = False
+        self.keys = {}  # Entity key on the board -> table key
+        self.decimals = {}  # Entity key on the board -> decimals to round to
+        self.attributes = {}  # Entity key on the board -> unit attributes
+        self.values = {}
+        self._suffix_index = {}
+        self._grid_keys = set()
+
+    async def async_start(self, supervisor):
+        """Start the connection to the board."""
+        try:
+            from aioesphomeapi import APIClient  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            _LOGGER.error("aioesphomeapi is not installed, no data will be read")
+            return
+        self.client = APIClient(self.host, self.port, None, noise_psk=self.noise_psk)
+        supervisor.create_task(self._run(), "esphome api")
+
+    async def async_stop(self):
+        """Disconnect from the board."""
+        if self.client is not None and self.connected:
+            await self.client.disconnect()
+        self.connected = False
+
+    async def _run(self):
+        failing = False
+        while True:
+            disconnected = asyncio.Event()
+
+            async def on_stop(expected_disconnect):
+                disconnected.set()
+
+            try:
+                await self.client.connect(on_stop=on_stop, login=True)
+                entities, _ = await self.client.list_entities_services()
+            except Exception as e:  # pylint: disable=broad-except
+                if not failing:
+                    _LOGGER.warning("ESPHome API connection to %s failed: %s", self.host, e)
+                failing = True
+                await self.client.disconnect(force=True)
+            else:
+                if failing:
+                    _LOGGER.info("ESPHome API connection to %s recovered", self.host)
+                failing = False
+                self._use_entities(entities)
+                self.client.subscribe_states(self._on_state)
+                self.connected = True
+                await disconnected.wait()
+                self.connected = False
+                _LOGGER.warning("ESPHome API connection to %s lost", self.host)
+            await asyncio.sleep(ESPHOME_API_RECONNECT_DELAY)
+
+    def _use_entities(self, entities):
+        """Key the table by the entities the board reports."""
+        self.keys = {
+            entity.key: "_" + slugify(entity.object_id or entity.name)
+            for entity in entities
+        }
+        # Round like the ESPHome integration, rather than publish float32 noise
+        self.decimals = {
+            entity.key: entity.accuracy_decimals
+            for entity in entities
+            if getattr(entity, "accuracy_decimals", None) is not None
+        }
+        self.attributes = {
+            entity.key: {"unit_of_measurement": entity.unit_of_measurement}
+            for entity in entities
+            if getattr(entity, "unit_of_measurement", None)
+        }
+        self.values = {}
+        self._suffix_index.clear()
+        self._indexed_fields.clear()
+        self._grid_keys = {
+            key
+            for key in map(self.entity_for, self.grid_power_suffixes())
+            if key is not None
+        }
+
+    @callback
+    def _on_state(self, state):
+        key = self.keys.get(state.key)
+        if key is None:
+            return
+        attributes = self.attributes.get(state.key, {})
+        if getattr(state, "missing_state", False):
+            self.values[key] = ApiState("unavailable", attributes)
+        elif state.key in self.decimals:
+            self.values[key] = ApiState(round(state.state, self.decimals[state.key]), attributes)
+        else:
+            self.values[key] = ApiState(state.state, attributes)
+        if key in self._grid_keys:
+            self._async_notify_grid_power()
+
+    @callback
+    def async_track_grid_power(self, action):
+        """Call action on every grid power state. Returns an unsubscriber."""
+        return self._async_add_grid_listener(action)
+
+    def indexed_entity_ids(self):
+        """Return the table keys that indexed fields are discovered from."""
+        return list(self.keys.values())
+
+    def resolve_entity(self, entity_id):
+        """Return the table key ending with entity_id, or None."""
+        try:
+            return self._suffix_index[entity_id]
+        except KeyError:
+            target = super().resolve_entity(entity_id)
+            if target is not None:
+                # Keys change only on reconnect, which clears the index
+                self._suffix_index[entity_id] = target
+            return target
+
+    def find_entity_state(self, entity_id):
+        """Return the latest state of the entity a field is read from."""
+        key = self.entity_for(entity_id)
+        return None if key is None else self.values.get(key)
+
+    def _check_connected(self):
+        """Raise while the board is not streaming states."""
+        if not self.connected:
+            raise ConnectionError(f"Not connected to the ESPHome API of {self.host}")
+
+    def get_energy_data(self):
+        """Retrieve ENERGY data."""
+        self._check_connected()
+        return super().get_energy_data()
+
+    def get_metrics_data(self):
+        """Retrieve METRICS data."""
+        self._check_connected()
+        return super().get_metrics_data()
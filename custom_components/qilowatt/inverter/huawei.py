@@ -1,4 +1,5 @@
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
 from qilowatt import EnergyData, MetricsData
 
 from .base_inverter import BaseInverter
@@ -6,23 +7,41 @@ from .base_inverter import BaseInverter
 class HuaweiInverter(BaseInverter):
     """Implementation for Huawei integrated inverters."""
 
-    def __init__(self, hass: HomeAssistant, config_entry):
+    REQUIRED_ENTITIES = ("power_meter_phase_a_active_power", "batteries_state_of_capacity")
+    GRID_POWER_SCALE = -1
+    HAS_TODAY_ENERGY = False
+    # Entities are looked up by name, the same for every Huawei device
+    PER_DEVICE_ENTITIES = False
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
         super().__init__(hass, config_entry)
         self.hass = hass
-        self.device_id = config_entry.data["device_id"]
-        # We only need entity registry to get device ID - no need to store entity lists
+        self.device_id = device_id or config_entry.data["device_id"]
+        # Huawei entities are looked up by name; the registry is only used to
+        # discover indexed entities such as extra PV strings or battery packs
+        self.huawei_entities = [
+            entity.entity_id
+            for entity in er.async_get(hass).entities.values()
+            if entity.platform == "huawei_solar"
+        ]
+
+    def indexed_entity_ids(self):
+        """Return the Huawei Solar entity ids indexed fields are discovered from."""
+        return self.huawei_entities
 
-    def find_entity_state(self, entity_id):
-        """Helper method to find a state by entity_id (for Huawei sensors)."""
+    def grid_power_suffixes(self):
+        """Return the entity suffixes of the grid power per phase."""
+        return [f"power_meter_phase_{phase}_active_power" for phase in "abc"]
+
+    def resolve_entity(self, entity_id):
+        """Return the id of the entity a field is read from (for Huawei sensors)."""
         # Special case for inverter_power_derating which is a number entity
         if entity_id == "inverter_power_derating" or entity_id == "sensor.inverter_power_derating":
-            result = self.hass.states.get("number.inverter_power_derating")
-            if result:
-                return result
-        
+            if self.states.get("number.inverter_power_derating"):
+                return "number.inverter_power_derating"
+
         # For all other entities, use sensor prefix approach
-        sensor_entity = entity_id if entity_id.startswith("sensor.") else f"sensor.{entity_id}"
-        return self.hass.states.get(sensor_entity)
+        return entity_id if entity_id.startswith("sensor.") else f"sensor.{entity_id}"
 
     def get_state_float(self, entity_id, default=None):
         """Helper method to get a sensor state as float."""
@@ -32,6 +51,8 @@ class HuaweiInverter(BaseInverter):
                 return float(state.state)
             except ValueError:
                 pass
+        else:
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_state_int(self, entity_id, default=None):
@@ -42,6 +63,8 @@ class HuaweiInverter(BaseInverter):
                 return int(float(state.state) // 1)
             except ValueError:
                 pass
+        else:
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_state_text(self, entity_id, default=""):
@@ -93,21 +116,15 @@ class HuaweiInverter(BaseInverter):
 
     def get_metrics_data(self):
         """Retrieve METRICS data."""
-        # Calculate PV Power for each string
-        pv_voltage_1 = self.get_state_float("inverter_pv_1_voltage")
-        pv_current_1 = self.get_state_float("inverter_pv_1_current")
-        pv_voltage_2 = self.get_state_float("inverter_pv_2_voltage")
-        pv_current_2 = self.get_state_float("inverter_pv_2_current")
-        
+        # Retrieve PV Voltage and Current for each string
+        pv_voltage = self.get_state_floats("inverter_pv_{}_voltage", minimum=2)
+        pv_current = self.get_state_floats("inverter_pv_{}_current", minimum=2)
+
         # Calculate PV power, handling None values
-        pv_power_1 = (pv_voltage_1 * pv_current_1) if (pv_voltage_1 is not None and pv_current_1 is not None) else None
-        pv_power_2 = (pv_voltage_2 * pv_current_2) if (pv_voltage_2 is not None and pv_current_2 is not None) else None
-        
-        pv_power = [pv_power_1, pv_power_2]
-        
-        # Retrieve PV Voltage and Current
-        pv_voltage = [pv_voltage_1, pv_voltage_2]
-        pv_current = [pv_current_1, pv_current_2]
+        pv_power = [
+            voltage * current if voltage is not None and current is not None else None
+            for voltage, current in zip(pv_voltage, pv_current)
+        ]
 
         # Load Power and Current
         inverter_active_power = self.get_state_float("inverter_active_power")
@@ -121,11 +138,11 @@ class HuaweiInverter(BaseInverter):
         load_current = [0.0, 0.0, 0.0]  # As per payload
 
         # Battery metrics
-        battery_power = [self.get_state_float("batteries_charge_discharge_power")]
+        battery_power = self.get_module_floats("battery_{}_charge_discharge_power", "batteries_charge_discharge_power")
         battery_current = [self.get_state_float("batteries_bus_current")]
         battery_voltage = [self.get_state_float("batteries_bus_voltage")]
-        battery_soc = self.get_state_int("batteries_state_of_capacity")
-        battery_temperature = [self.get_state_float("battery_1_bms_temperature")]
+        battery_soc = self.get_module_average("battery_{}_state_of_capacity", "batteries_state_of_capacity")
+        battery_temperature = self.get_state_floats("battery_{}_bms_temperature")
 
         # Inverter metrics
         inverter_status = 2  # As per payload
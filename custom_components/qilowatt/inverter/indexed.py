@@ -0,0 +1,39 @@
+from .esphome import EspHomeInverter
+from .solarassistant import SolarAssistantInverter
+from .solarman import SolarmanInverter
+from .victron import VictronInverter
+
+
+class SuffixIndexMixin:
+    """Entity lookup through a cached suffix index instead of a scan.
+
+    The entity based backends scan every entity of the device for each field
+    they read. This resolves each suffix once and then reads its state
+    directly. It is offered as the alternate collector of shadow mode, so
+    it can be compared against the scan on live data before replacing it.
+    """
+
+    def resolve_entity(self, entity_id):
+        """Return the id of the entity ending with entity_id, or None."""
+        index = self.__dict__.setdefault("_suffix_index", {})
+        try:
+            return index[entity_id]
+        except KeyError:
+            target = index[entity_id] = super().resolve_entity(entity_id)
+            return target
+
+
+class IndexedSolarAssistantInverter(SuffixIndexMixin, SolarAssistantInverter):
+    """SolarAssistant with indexed entity lookup."""
+
+
+class IndexedSolarmanInverter(SuffixIndexMixin, SolarmanInverter):
+    """Solarman with indexed entity lookup."""
+
+
+class IndexedEspHomeInverter(SuffixIndexMixin, EspHomeInverter):
+    """ESPHome with indexed entity lookup."""
+
+
+class IndexedVictronInverter(SuffixIndexMixin, VictronInverter):
+    """Victron with indexed entity lookup."""
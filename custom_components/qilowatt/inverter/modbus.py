@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from qilowatt import EnergyData, MetricsData
+
+from ..const import (
+    CONF_MODBUS_HOST,
+    CONF_MODBUS_PORT,
+    CONF_MODBUS_UNIT,
+    CONF_REGISTER_MAP,
+    MODBUS_POLL_INTERVAL,
+    MODBUS_STALE_AFTER,
+)
+from ..modbus import REGISTER_MAPS, ModbusError, ModbusTcpClient, decode_blocks, plan_blocks
+from .base_inverter import BaseInverter
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ModbusInverter(BaseInverter):
+    """Implementation reading a Deye or Sofar inverter directly over Modbus TCP.
+
+    A supervised task polls the register map in contiguous blocks and keeps
+    the latest values in memory, so the data does not depend on another
+    integration's poll interval or on the Home Assistant state machine.
+    """
+
+    ENTITY_BASED = False
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
+        super().__init__(hass, config_entry)
+        self.hass = hass
+        self.device_id = device_id or config_entry.data["device_id"]
+        self.registers = REGISTER_MAPS[config_entry.data[CONF_REGISTER_MAP]]
+        self.blocks = plan_blocks(self.registers.values())
+        self.client = ModbusTcpClient(
+            config_entry.data[CONF_MODBUS_HOST],
+            config_entry.data[CONF_MODBUS_PORT],
+            config_entry.data[CONF_MODBUS_UNIT],
+        )
+        self.values = {}
+        self.updated_at = None
+        self._failing = False
+
+    async def async_start(self, supervisor):
+        """Start polling the inverter."""
+        supervisor.create_task(self._poll_loop(), "modbus poll")
+
+    async def async_stop(self):
+        """Close the Modbus connection."""
+        await self.client.close()
+
+    async def async_poll(self):
+        """Read every block of the register map and replace the value table."""
+        results = [
+            await self.client.read_holding_registers(start, count)
+            for start, count in self.blocks
+        ]
+        # Swap in a new table so executor reads always see one consistent poll
+        self.values = decode_blocks(self.registers, self.blocks, results)
+        self.updated_at = time.monotonic()
+        self._async_notify_grid_power()
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                await self.async_poll()
+            except ModbusError as e:
+                if not self._failing:
+                    _LOGGER.warning("Modbus poll of %s failed: %s", self.client.host, e)
+                self._failing = True
+            else:
+                if self._failing:
+                    _LOGGER.info("Modbus poll of %s recovered", self.client.host)
+                self._failing = False
+            await asyncio.sleep(MODBUS_POLL_INTERVAL)
+
+    @callback
+    def async_track_grid_power(self, action):
+        """Call action after every poll. Returns an unsubscriber."""
+        return self._async_add_grid_listener(action)
+
+    def is_ready(self):
+        """Return True once the first poll has completed."""
+        return self.updated_at is not None
+
+    def indexed_entity_ids(self):
+        """Return the register names that indexed fields are discovered from."""
+        return self.registers
+
+    def get_state_float(self, entity_id, default=0.0):
+        """Return the latest value of a register as float."""
+        value = self.values.get(entity_id)
+        if value is None:
+            self.missing_fields[entity_id] += 1
+            return default
+        return float(value)
+
+    def get_state_int(self, entity_id, default=0):
+        """Return the latest value of a register as int."""
+        value = self.values.get(entity_id)
+        if value is None:
+            self.missing_fields[entity_id] += 1
+            return default
+        return int(value)
+
+    def _check_fresh(self):
+        """Raise if the value table is too old to be published."""
+        if self.updated_at is None or time.monotonic() - self.updated_at > MODBUS_STALE_AFTER:
+            raise ModbusError(f"No fresh Modbus data from {self.client.host}")
+
+    def get_energy_data(self):
+        """Retrieve ENERGY data."""
+        self._check_fresh()
+        power = self.get_state_floats("grid_l{}_power", minimum=3)
+        today = self.get_state_float("today_energy_import")
+        total = self.get_state_float("total_energy_import")
+        current = self.get_state_floats("grid_l{}_current", minimum=3)
+        voltage = self.get_state_floats("grid_l{}_voltage", minimum=3)
+        frequency = self.get_state_float("grid_frequency")
+
+        return EnergyData(
+            Power=power,
+            Today=today,
+            Total=total,
+            Current=current,
+            Voltage=voltage,
+            Frequency=frequency,
+        )
+
+    def get_metrics_data(self):
+        """Retrieve METRICS data."""
+        self._check_fresh()
+        pv_power = self.get_state_floats("pv{}_power", minimum=2)
+        pv_voltage = self.get_state_floats("pv{}_voltage", minimum=2)
+        pv_current = self.get_state_floats("pv{}_current", minimum=2)
+
+        voltage = self.get_state_floats("grid_l{}_voltage", minimum=3)
+        load_power = self.get_state_floats("load_l{}_power", minimum=0)
+        if not load_power:
+            # Only a total is available, split it over the phases
+            load_power = [self.get_state_float("load_power") / len(voltage)] * len(voltage)
+        load_current = [round(x / y, 2) if y else 0 for x, y in zip(load_power, voltage)]
+
+        return MetricsData(
+            PvPower=pv_power,
+            PvVoltage=pv_voltage,
+            PvCurrent=pv_current,
+            LoadPower=load_power,
+            AlarmCodes=[0, 0, 0, 0, 0, 0],  # As per payload
+            BatterySOC=self.get_state_int("battery_soc"),
+            LoadCurrent=load_current,
+            BatteryPower=[self.get_state_float("battery_power")],
+            BatteryCurrent=[self.get_state_float("battery_current")],
+            BatteryVoltage=[self.get_state_float("battery_voltage")],
+            InverterStatus=2,  # As per payload
+            GridExportLimit=self.get_state_float("grid_export_limit"),
+            BatteryTemperature=[self.get_state_float("battery_temperature")],
+            InverterTemperature=self.get_state_float("inverter_temperature"),
+        )
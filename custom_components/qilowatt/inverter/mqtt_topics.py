@@ -0,0 +1,297 @@
+import asyncio
+import json
+import logging
+import time
+from collections import namedtuple
+from functools import partial
+
+from homeassistant.components import mqtt
+from homeassistant.core import HomeAssistant, callback
+from qilowatt import EnergyData, MetricsData
+
+from ..const import (
+    DATA_BROKER,
+    MQTT_TOPICS_STALE_AFTER,
+    SOLAR_ASSISTANT_TOPIC_PREFIX,
+    VENUS_KEEPALIVE_INTERVAL,
+)
+from .base_inverter import BaseInverter
+from .solarassistant import SolarAssistantInverter
+
+_LOGGER = logging.getLogger(__name__)
+
+# Stand-in for a HA State, so entity based backends can read the table
+TopicState = namedtuple("TopicState", ["state"])
+
+
+class MqttTopicMixin:
+    """Latest-value table fed directly from MQTT topics.
+
+    Subscribes through Home Assistant's MQTT integration, or the broker of a
+    headless collector site, and stores the last payload of every topic
+    under a key shaped like the entity id suffixes of the entity based
+    backends. Reads never touch the HA state machine.
+    """
+
+    ENTITY_BASED = False
+
+    def _init_topics(self):
+        self.values = {}
+        self.updated_at = None
+
+    def topic_filters(self):
+        """Return (topic filter, key template) pairs to subscribe to."""
+        return ()
+
+    def topic_key(self, topic, topic_filter, template):
+        """Return the table key for a topic, or None to ignore it.
+
+        By default the template is formatted with the topic segments matched
+        by the `+` wildcards of the filter.
+        """
+        return template.format(*_wildcards(topic, topic_filter))
+
+    def decode_payload(self, payload):
+        """Return the value of a payload."""
+        return payload
+
+    async def async_start(self, supervisor):
+        """Subscribe to the topics of the backend."""
+        if DATA_BROKER not in self.hass.data and not await mqtt.async_wait_for_mqtt_client(
+            self.hass
+        ):
+            _LOGGER.error("MQTT integration is not available, no data will be read")
+            return
+        for topic_filter, template in self.topic_filters():
+            supervisor.async_on_shutdown(
+                await self._async_subscribe(
+                    topic_filter,
+                    partial(self._on_message, topic_filter, template),
+                )
+            )
+
+    async def _async_subscribe(self, topic_filter, msg_callback):
+        """Subscribe through the headless site's broker, else Home Assistant's."""
+        broker = self.hass.data.get(DATA_BROKER)
+        if broker is not None:
+            return await broker.async_subscribe(topic_filter, msg_callback)
+        return await mqtt.async_subscribe(self.hass, topic_filter, msg_callback)
+
+    async def _async_publish(self, topic, payload):
+        """Publish through the broker the topics are read from."""
+        broker = self.hass.data.get(DATA_BROKER)
+        if broker is not None:
+            await broker.async_publish(topic, payload)
+        else:
+            await mqtt.async_publish(self.hass, topic, payload)
+
+    @callback
+    def _on_message(self, topic_filter, template, msg):
+        key = self.topic_key(msg.topic, topic_filter, template)
+        if key is None:
+            return
+        if key not in self.values:
+            # A new indexed field may have appeared, rediscover
+            self._indexed_fields.clear()
+        self.values[key] = TopicState(self.decode_payload(msg.payload))
+        self.updated_at = time.monotonic()
+        if key in self.grid_power_suffixes():
+            self._async_notify_grid_power()
+
+    @callback
+    def async_track_grid_power(self, action):
+        """Call action on every grid power message. Returns an unsubscriber."""
+        return self._async_add_grid_listener(action)
+
+    def indexed_entity_ids(self):
+        """Return the table keys that indexed fields are discovered from."""
+        return list(self.values)
+
+    def find_entity_state(self, entity_id):
+        """Return the latest value of a table key."""
+        return self.values.get(entity_id)
+
+    def get_state_float(self, entity_id, default=0.0):
+        """Return the latest value of a table key as float."""
+        state = self.values.get(entity_id)
+        if state is None or state.state is None:
+            self.missing_fields[entity_id] += 1
+            return default
+        try:
+            return float(state.state)
+        except (TypeError, ValueError):
+            return default
+
+    def get_state_int(self, entity_id, default=0):
+        """Return the latest value of a table key as int."""
+        return int(self.get_state_float(entity_id, default))
+
+    def _check_fresh(self):
+        """Raise if no message arrived recently."""
+        if self.updated_at is None or time.monotonic() - self.updated_at > MQTT_TOPICS_STALE_AFTER:
+            raise TimeoutError("No recent MQTT messages from the inverter")
+
+
+def _wildcards(topic, topic_filter):
+    """Return the topic segments matched by the `+` wildcards of a filter."""
+    return [
+        segment
+        for segment, pattern in zip(topic.split("/"), topic_filter.split("/"))
+        if pattern == "+"
+    ]
+
+
+class SolarAssistantMqttInverter(MqttTopicMixin, SolarAssistantInverter):
+    """SolarAssistant read directly from its MQTT topics.
+
+    Uses the SolarAssistant payload mapping on a table keyed like the
+    SolarAssistant entity ids: `inverter_1/grid_power_1` becomes
+    `grid_power_1`, `battery_2/power` becomes `battery_2_power`.
+    """
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
+        super().__init__(hass, config_entry, device_id)
+        self._init_topics()
+        self._inverter_keys = set()
+
+    def topic_filters(self):
+        return ((f"{SOLAR_ASSISTANT_TOPIC_PREFIX}/+/+/state", None),)
+
+    def topic_key(self, topic, topic_filter, template):
+        group, name = _wildcards(topic, topic_filter)
+        if group == "inverter_1":
+            self._inverter_keys.add(name)
+            return name
+        if group == "total" and name not in self._inverter_keys:
+            return name
+        if group.startswith("battery_"):
+            return f"{group}_{name}"
+        return None
+
+    def get_energy_data(self):
+        """Retrieve ENERGY data."""
+        self._check_fresh()
+        return super().get_energy_data()
+
+    def get_metrics_data(self):
+        """Retrieve METRICS data."""
+        self._check_fresh()
+        return super().get_metrics_data()
+
+
+# Venus OS dbus paths, below N/<portal id>/, and their table keys
+VENUS_TOPICS = {
+    **{f"system/0/Ac/Grid/L{n}/Power": f"grid_l{n}_power" for n in (1, 2, 3)},
+    **{f"grid/+/Ac/L{n}/Voltage": f"grid_l{n}_voltage" for n in (1, 2, 3)},
+    **{f"grid/+/Ac/L{n}/Current": f"grid_l{n}_current" for n in (1, 2, 3)},
+    **{f"system/0/Ac/Consumption/L{n}/Power": f"load_l{n}_power" for n in (1, 2, 3)},
+    **{f"system/0/Ac/PvOnGrid/L{n}/Power": f"ac_pv_l{n}_power" for n in (1, 2, 3)},
+    "vebus/+/Ac/ActiveIn/L1/F": "grid_frequency",
+    "grid/+/Ac/Energy/Forward": "total_energy_import",
+    "solarcharger/+/Yield/Power": "pv{1}_power",
+    "solarcharger/+/Pv/V": "pv{1}_voltage",
+    "solarcharger/+/Pv/I": "pv{1}_current",
+    "system/0/Dc/Battery/Soc": "battery_soc",
+    "system/0/Dc/Battery/Power": "battery_power",
+    "system/0/Dc/Battery/Voltage": "battery_voltage",
+    "system/0/Dc/Battery/Current": "battery_current",
+    "system/0/Dc/Battery/Temperature": "battery_temperature",
+    "settings/0/Settings/CGwacs/MaxFeedInPower": "grid_export_limit",
+    # Published without keepalives, to learn the portal id
+    "system/0/Serial": "serial",
+}
+
+
+class VenusMqttInverter(MqttTopicMixin, BaseInverter):
+    """Victron GX device read directly from the Venus OS MQTT topics.
+
+    Venus OS only publishes most values while it receives keepalives, so a
+    supervised task sends one every VENUS_KEEPALIVE_INTERVAL to the portal id
+    learned from the first message, e.g. the periodic system serial.
+    """
+
+    REQUIRED_ENTITIES = ("grid_l1_power", "battery_soc")
+    HAS_TODAY_ENERGY = False
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
+        super().__init__(hass, config_entry)
+        self.hass = hass
+        self.device_id = device_id or config_entry.data["device_id"]
+        self._init_topics()
+        self.portal_id = None
+
+    def topic_filters(self):
+        return ((f"N/+/{path}", key) for path, key in VENUS_TOPICS.items())
+
+    def topic_key(self, topic, topic_filter, template):
+        self.portal_id = topic.split("/", 2)[1]
+        # The portal id is the first wildcard, a device instance the second
+        return super().topic_key(topic, topic_filter, template)
+
+    def decode_payload(self, payload):
+        """Return the value of a Venus OS JSON payload."""
+        try:
+            return json.loads(payload).get("value")
+        except (ValueError, AttributeError):
+            return None
+
+    async def async_start(self, supervisor):
+        """Subscribe to the topics and start sending keepalives."""
+        await super().async_start(supervisor)
+        supervisor.create_task(self._keepalive_loop(), "venus keepalive")
+
+    async def _keepalive_loop(self):
+        while True:
+            if self.portal_id is not None:
+                await self._async_publish(f"R/{self.portal_id}/keepalive", "")
+                await asyncio.sleep(VENUS_KEEPALIVE_INTERVAL)
+            else:
+                await asyncio.sleep(1)
+
+    def get_energy_data(self):
+        """Retrieve ENERGY data."""
+        self._check_fresh()
+        power = self.get_state_floats("grid_l{}_power", minimum=3)
+        today = 0.0  # Not published by Venus OS
+        total = self.get_state_float("total_energy_import")
+        current = self.get_state_floats("grid_l{}_current", minimum=3)
+        voltage = self.get_state_floats("grid_l{}_voltage", minimum=3)
+        frequency = self.get_state_float("grid_frequency")
+
+        return EnergyData(
+            Power=power,
+            Today=today,
+            Total=total,
+            Current=current,
+            Voltage=voltage,
+            Frequency=frequency,
+        )
+
+    def get_metrics_data(self):
+        """Retrieve METRICS data."""
+        self._check_fresh()
+        # MPPT solar chargers by device instance, then AC coupled PV
+        pv_power = self.get_state_floats("pv{}_power", minimum=0)
+        pv_voltage = self.get_state_floats("pv{}_voltage", minimum=0)
+        pv_current = self.get_state_floats("pv{}_current", minimum=0)
+        ac_pv_power = sum(self.get_state_floats("ac_pv_l{}_power", minimum=0))
+        if ac_pv_power:
+            pv_power.append(ac_pv_power)
+        load_power = self.get_state_floats("load_l{}_power", minimum=3)
+
+        return MetricsData(
+            PvPower=pv_power,
+            PvVoltage=pv_voltage,
+            PvCurrent=pv_current,
+            LoadPower=load_power,
+            AlarmCodes=[0, 0, 0, 0, 0, 0],  # As per payload
+            BatterySOC=self.get_state_int("battery_soc"),
+            LoadCurrent=[0.0, 0.0, 0.0],  # As per payload
+            BatteryPower=[self.get_state_float("battery_power")],
+            BatteryCurrent=[self.get_state_float("battery_current")],
+            BatteryVoltage=[self.get_state_float("battery_voltage")],
+            InverterStatus=2,  # As per payload
+            GridExportLimit=self.get_state_float("grid_export_limit"),
+            BatteryTemperature=[self.get_state_float("battery_temperature")],
+            InverterTemperature=0.0,  # Not published by Venus OS
+        )
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import math
+import random
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+from qilowatt import EnergyData, MetricsData, WorkModeCommand
+
+from ..const import (
+    CONF_SIMULATOR_INTERVAL,
+    CONF_SIMULATOR_PHASES,
+    CONF_SIMULATOR_SEED,
+    CONF_SIMULATOR_STRINGS,
+    SIMULATOR_BATTERY_CAPACITY,
+    SIMULATOR_BATTERY_POWER,
+    SIMULATOR_DEFAULT_INTERVAL,
+    SIMULATOR_MIN_SOC,
+    SIMULATOR_STRING_PEAK,
+)
+from .base_inverter import BaseInverter
+
+_LOGGER = logging.getLogger(__name__)
+
+# Mean size (W) and duration (s) of appliances switching on, e.g. a kettle
+APPLIANCE_POWER = 2000
+APPLIANCE_DURATION = 300
+APPLIANCES_PER_HOUR = 2
+
+
+class SimulatorInverter(BaseInverter):
+    """Synthetic inverter for load and latency testing without hardware.
+
+    A supervised task advances a seeded model of PV strings, household load,
+    battery and grid at the configured rate and keeps the latest values in
+    memory, like the Modbus backend. PV follows the local time of day with
+    drifting clouds; the battery follows the received WORKMODE commands, so
+    the whole pipeline can be exercised end to end.
+    """
+
+    ENTITY_BASED = False
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
+        super().__init__(hass, config_entry)
+        self.hass = hass
+        self.device_id = device_id or config_entry.data["device_id"]
+        data = config_entry.data
+        self.interval = data.get(CONF_SIMULATOR_INTERVAL, SIMULATOR_DEFAULT_INTERVAL)
+        self.phases = data.get(CONF_SIMULATOR_PHASES, 3)
+        self.strings = data.get(CONF_SIMULATOR_STRINGS, 2)
+        self.random = random.Random(data.get(CONF_SIMULATOR_SEED, 0))
+
+        # Fixed per installation: how the load is spread over the phases
+        weights = [self.random.uniform(0.5, 1.5) for _ in range(self.phases)]
+        self.phase_weights = [weight / sum(weights) for weight in weights]
+        self.soc = self.random.uniform(30, 80)  # %
+        self.total_import = self.random.uniform(1000, 20000)  # kWh
+        self.today_import = 0.0
+        self.today = None
+        self.clouds = self.random.uniform(0.3, 1.0)
+        self.appliances = []  # (power, seconds left)
+        self.command = WorkModeCommand()
+
+        self.values = {}
+        self.updated_at = None
+        self._last_step = None
+
+    async def async_start(self, supervisor):
+        """Start advancing the model."""
+        supervisor.create_task(self._run(), "simulator")
+
+    async def _run(self):
+        while True:
+            self.step()
+            self._async_notify_grid_power()
+            await asyncio.sleep(self.interval)
+
+    @callback
+    def async_track_grid_power(self, action):
+        """Call action after every step. Returns an unsubscriber."""
+        return self._async_add_grid_listener(action)
+
+    @callback
+    def handle_command(self, command: WorkModeCommand):
+        """Drive the battery from the WORKMODE command from now on."""
+        _LOGGER.debug("Simulator following %s", command)
+        self.command = command
+        return True
+
+    def is_ready(self):
+        """Return True once the model has made its first step."""
+        return self.updated_at is not None
+
+    def indexed_entity_ids(self):
+        """Return the value names that indexed fields are discovered from."""
+        return self.values
+
+    def step(self):
+        """Advance the model by the time passed since the previous step."""
+        now = time.monotonic()
+        dt = min(now - self._last_step, 60) if self._last_step is not None else 0
+        self._last_step = now
+        local = dt_util.now()
+        hour = local.hour + local.minute / 60 + local.second / 3600
+        if local.date() != self.today:
+            self.today = local.date()
+            self.today_import = 0.0
+
+        pv = self._step_pv(hour, dt)
+        load = self._step_load(hour, dt)
+        battery = self._battery_power(sum(pv), sum(load))
+        if self.command.Mode == "limitexport":
+            # Curtail PV so the export stays within the limit
+            limit = self.command.PowerLimit or 0
+            excess = sum(pv) - sum(load) - battery - limit
+            if excess > 0:
+                pv = [power * (1 - excess / sum(pv)) for power in pv]
+        self.soc = min(max(self.soc + battery * dt / 3600 / SIMULATOR_BATTERY_CAPACITY * 100, 0), 100)
+
+        # The inverter output is shared evenly over the phases
+        output = (sum(pv) - battery) / self.phases
+        grid = [power - output for power in load]
+        imported = max(sum(grid), 0) * dt / 3600000
+        self.today_import += imported
+        self.total_import += imported
+
+        voltage = [round(self.random.gauss(230, 1.5), 1) for _ in range(self.phases)]
+        battery_voltage = 48 + 6 * self.soc / 100
+        values = {"grid_frequency": round(self.random.gauss(50, 0.02), 2)}
+        for phase, (power, volts, load_power) in enumerate(zip(grid, voltage, load), 1):
+            values[f"grid_l{phase}_power"] = round(power)
+            values[f"grid_l{phase}_voltage"] = volts
+            values[f"grid_l{phase}_current"] = round(power / volts, 2)
+            values[f"load_l{phase}_power"] = round(load_power)
+        for string, power in enumerate(pv, 1):
+            volts = round(self.random.gauss(360, 3), 1) if power else 0.0
+            values[f"pv{string}_power"] = round(power)
+            values[f"pv{string}_voltage"] = volts
+            values[f"pv{string}_current"] = round(power / volts, 2) if volts else 0.0
+        values.update(
+            today_energy_import=round(self.today_import, 3),
+            total_energy_import=round(self.total_import, 3),
+            battery_soc=round(self.soc),
+            battery_power=round(battery),
+            battery_voltage=round(battery_voltage, 1),
+            battery_current=round(battery / battery_voltage, 1),
+            battery_temperature=round(20 + abs(battery) / 1000, 1),
+            inverter_temperature=round(30 + (sum(pv) + abs(battery)) / 500, 1),
+            grid_export_limit=(
+                self.command.PowerLimit or 0
+                if self.command.Mode == "limitexport"
+                else SIMULATOR_STRING_PEAK * self.strings
+            ),
+        )
+        # Swap in a new table so executor reads always see one consistent step
+        self.values = values
+        self.updated_at = now
+
+    def _step_pv(self, hour, dt):
+        """Return the power of every PV string."""
+        self.clouds = min(max(self.clouds + self.random.gauss(0, 0.02) * math.sqrt(dt), 0.1), 1.0)
+        powers = []
+        for string in range(self.strings):
+            # Strings face east to west, shifting their peak over the day
+            shift = (string - (self.strings - 1) / 2) * 1.5
+            sun = math.sin(math.pi * (hour - 6 - shift) / 14)
+            powers.append(max(sun, 0) * self.clouds * SIMULATOR_STRING_PEAK)
+        return powers
+
+    def _step_load(self, hour, dt):
+        """Return the household load of every phase."""
+        base = (
+            250
+            + 300 * math.exp(-(((hour - 7.5) / 1) ** 2))
+            + 600 * math.exp(-(((hour - 19) / 2) ** 2))
+        )
+        if self.random.random() < APPLIANCES_PER_HOUR * dt / 3600:
+            self.appliances.append(
+                (
+                    self.random.uniform(0.5, 1.5) * APPLIANCE_POWER,
+                    self.random.expovariate(1 / APPLIANCE_DURATION),
+                )
+            )
+        self.appliances = [(power, left - dt) for power, left in self.appliances if left > dt]
+        total = base * self.random.uniform(0.95, 1.05) + sum(power for power, _ in self.appliances)
+        return [total * weight for weight in self.phase_weights]
+
+    def _battery_power(self, pv, load):
+        """Return the battery power in W, positive when charging."""
+        command = self.command
+        if command.Mode == "buy":
+            target = SIMULATOR_BATTERY_POWER if command.PowerLimit is None else command.PowerLimit
+            if self.soc >= (command.BatterySoc or 100):
+                target = max(pv - load, 0)
+        elif command.Mode in ("sell", "frrup"):
+            target = -SIMULATOR_BATTERY_POWER if command.PowerLimit is None else -command.PowerLimit
+            if self.soc <= (command.BatterySoc or SIMULATOR_MIN_SOC):
+                target = 0
+        elif command.Mode == "savebattery":
+            target = max(pv - load, 0)
+        elif command.Mode in ("pvsell", "nobattery"):
+            target = 0
+        else:
+            # Self-use, discharging only what the load needs
+            target = pv - load
+            if command.PeakShaving is not None:
+                # Discharge only to hold the grid import at the threshold
+                target = min(target + command.PeakShaving, max(target, 0))
+
+        # Current limits of the command, at the present battery voltage
+        voltage = 48 + 6 * self.soc / 100
+        if target > 0 and self.soc < 100:
+            limit = SIMULATOR_BATTERY_POWER
+            if command.ChargeCurrent is not None:
+                limit = min(limit, command.ChargeCurrent * voltage)
+            return min(target, limit)
+        if target < 0 and self.soc > SIMULATOR_MIN_SOC:
+            limit = SIMULATOR_BATTERY_POWER
+            if command.DischargeCurrent is not None:
+                limit = min(limit, command.DischargeCurrent * voltage)
+            return max(target, -limit)
+        return 0.0
+
+    def get_state_float(self, entity_id, default=0.0):
+        """Return the latest simulated value as float."""
+        value = self.values.get(entity_id)
+        if value is None:
+            self.missing_fields[entity_id] += 1
+            return default
+        return float(value)
+
+    def get_state_int(self, entity_id, default=0):
+        """Return the latest simulated value as int."""
+        value = self.values.get(entity_id)
+        if value is None:
+            self.missing_fields[entity_id] += 1
+            return default
+        return int(value)
+
+    def get_energy_data(self):
+        """Retrieve ENERGY data."""
+        return EnergyData(
+            Power=self.get_state_floats("grid_l{}_power"),
+            Today=self.get_state_float("today_energy_import"),
+            Total=self.get_state_float("total_energy_import"),
+            Current=self.get_state_floats("grid_l{}_current"),
+            Voltage=self.get_state_floats("grid_l{}_voltage"),
+            Frequency=self.get_state_float("grid_frequency"),
+        )
+
+    def get_metrics_data(self):
+        """Retrieve METRICS data."""
+        voltage = self.get_state_floats("grid_l{}_voltage")
+        load_power = self.get_state_floats("load_l{}_power")
+        load_current = [round(x / y, 2) if y else 0 for x, y in zip(load_power, voltage)]
+
+        return MetricsData(
+            PvPower=self.get_state_floats("pv{}_power"),
+            PvVoltage=self.get_state_floats("pv{}_voltage"),
+            PvCurrent=self.get_state_floats("pv{}_current"),
+            LoadPower=load_power,
+            AlarmCodes=[0, 0, 0, 0, 0, 0],  # As per payload
+            BatterySOC=self.get_state_int("battery_soc"),
+            LoadCurrent=load_current,
+            BatteryPower=[self.get_state_float("battery_power")],
+            BatteryCurrent=[self.get_state_float("battery_current")],
+            BatteryVoltage=[self.get_state_float("battery_voltage")],
+            InverterStatus=2,  # As per payload
+            GridExportLimit=self.get_state_float("grid_export_limit"),
+            BatteryTemperature=[self.get_state_float("battery_temperature")],
+            InverterTemperature=self.get_state_float("inverter_temperature"),
+        )
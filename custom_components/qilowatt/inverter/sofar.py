@@ -12,26 +12,31 @@ _LOGGER = logging.getLogger(__name__)
 class SofarInverter(BaseInverter):
     """Implementation for Sofar integrated inverters."""
 
-    def __init__(self, hass: HomeAssistant, config_entry):
+    REQUIRED_ENTITIES = ("sofar_active_power_pcc_l1", "sofar_battery_capacity_total")
+    GRID_POWER_TEMPLATE = "sofar_active_power_pcc_l{}"
+    GRID_POWER_SCALE = -1000
+    HAS_TOTAL_ENERGY = False
+    BATTERY_CAPACITY_ENTITY = "sofar_battery_rated_capacity"
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
         super().__init__(hass, config_entry)
         self.hass = hass
-        self.device_id = config_entry.data["device_id"]
+        self.device_id = device_id or config_entry.data["device_id"]
         self.entity_registry = er.async_get(hass)
         self.inverter_entities = {}
         for entity in self.entity_registry.entities.values():
             if entity.device_id == self.device_id:
                 self.inverter_entities[entity.entity_id] = entity.name
 
-    def find_entity_state(self, entity_id):
-        """Helper method to find a state by entity_id (for Sofar sensors)."""
-        for entity in self.inverter_entities:
-            if entity.endswith(entity_id):
-                return self.hass.states.get(entity)
-    
-        state = self.hass.states.get(f"sensor.{entity_id}")
-        if state:
-            return state
-        return self.hass.states.get(f"number.{entity_id}")
+    def resolve_entity(self, entity_id):
+        """Return the id of the entity a field is read from (for Sofar sensors)."""
+        entity = super().resolve_entity(entity_id)
+        if entity:
+            return entity
+        for domain in ("sensor", "number"):
+            if self.states.get(f"{domain}.{entity_id}"):
+                return f"{domain}.{entity_id}"
+        return None
 
     def get_state_float(self, entity_id, default=0.0):
         """Helper method to get a sensor state as float (for Sofar sensors)."""
@@ -43,6 +48,7 @@ class SofarInverter(BaseInverter):
                 _LOGGER.warning(f"Could not convert state of {entity_id} to float")
         else:
             _LOGGER.warning(f"State of {entity_id} is unavailable or unknown")
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_state_int(self, entity_id, default=0):
@@ -55,6 +61,7 @@ class SofarInverter(BaseInverter):
                 _LOGGER.warning(f"Could not convert state of {entity_id} to int")
         else:
             _LOGGER.warning(f"State of {entity_id} is unavailable or unknown")
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_state_text(self, entity_id, default=""):
@@ -69,25 +76,13 @@ class SofarInverter(BaseInverter):
     def get_energy_data(self):
         """Retrieve ENERGY data."""
         # Sensor is in kW and swap positive with negative and vice versa
-        power = [
-            self.get_state_float("sofar_active_power_pcc_l1") * -1000,
-            self.get_state_float("sofar_active_power_pcc_l2") * -1000,
-            self.get_state_float("sofar_active_power_pcc_l3") * -1000,
-        ]
+        power = self.get_state_floats("sofar_active_power_pcc_l{}", minimum=3, scale=-1000)
         today = self.get_state_float("sofar_import_energy_today")
         total = 0.0  # As per payload
-        current = [
-            self.get_state_float("sofar_current_pcc_l1"),
-            self.get_state_float("sofar_current_pcc_l2"),
-            self.get_state_float("sofar_current_pcc_l3"),
-        ]
+        current = self.get_state_floats("sofar_current_pcc_l{}", minimum=3)
 
         # Define voltage as self, because we need it in another function to calculate current from power
-        self.voltage = [
-            self.get_state_float("sofar_voltage_l1"),
-            self.get_state_float("sofar_voltage_l2"),
-            self.get_state_float("sofar_voltage_l3"),
-        ]
+        self.voltage = self.get_state_floats("sofar_voltage_l{}", minimum=3)
         frequency = self.get_state_float("sofar_grid_frequency")
 
         return EnergyData(
@@ -101,22 +96,14 @@ class SofarInverter(BaseInverter):
 
     def get_metrics_data(self):
         """Retrieve METRICS data."""
-        pv_power = [
-            self.get_state_float("sofar_pv_power_1") * 1000,
-            self.get_state_float("sofar_pv_power_2") * 1000,
-        ]
-        pv_voltage = [
-            self.get_state_float("sofar_pv_voltage_1"),
-            self.get_state_float("sofar_pv_voltage_2"),
-        ]
-        pv_current = [
-            self.get_state_float("sofar_pv_current_1"),
-            self.get_state_float("sofar_pv_current_2"),
-        ]
-
-        # Create power array values from one sensor
-        combined_power = round(self.get_state_float("sofar_active_power_load_sys") * 1000 / 3)
-        load_power = [combined_power] * 3
+        pv_power = self.get_state_floats("sofar_pv_power_{}", minimum=2, scale=1000)
+        pv_voltage = self.get_state_floats("sofar_pv_voltage_{}", minimum=2)
+        pv_current = self.get_state_floats("sofar_pv_current_{}", minimum=2)
+
+        # Create power array values from one sensor, split over the phases
+        phases = len(self.voltage)
+        combined_power = round(self.get_state_float("sofar_active_power_load_sys") * 1000 / phases)
+        load_power = [combined_power] * phases
 
         alarm_codes = [0]
         battery_soc = self.get_state_int("sofar_battery_capacity_total")
@@ -130,12 +117,15 @@ class SofarInverter(BaseInverter):
             else:
                 load_current.append(round(x / y, 2))
 
-        battery_power = [self.get_state_float("sofar_battery_power_total") * 1000]
-        battery_current = [self.get_state_float("sofar_battery_current_1")]
-        battery_voltage = [self.get_state_float("sofar_battery_voltage_1")]
+        battery_current = self.get_state_floats("sofar_battery_current_{}")
+        battery_voltage = self.get_state_floats("sofar_battery_voltage_{}")
+        if len(battery_current) > 1:
+            battery_power = self.get_state_floats("sofar_battery_power_{}", scale=1000)
+        else:
+            battery_power = [self.get_state_float("sofar_battery_power_total") * 1000]
         inverter_status = 0  # As per payload
         grid_export_limit = self.get_state_float("sofar_feedin_max_power")
-        battery_temperature = [self.get_state_float("sofar_battery_temperature_1")]
+        battery_temperature = self.get_state_floats("sofar_battery_temperature_{}")
         inverter_temperature = self.get_state_float("sofar_inverter_temperature_1")
 
         return MetricsData(
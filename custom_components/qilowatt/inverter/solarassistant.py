@@ -12,27 +12,20 @@ _LOGGER = logging.getLogger(__name__)
 class SolarAssistantInverter(BaseInverter):
     """Implementation for SolarAssistant integrated inverters."""
 
-    def __init__(self, hass: HomeAssistant, config_entry):
+    REQUIRED_ENTITIES = ("grid_power_1", "battery_state_of_charge")
+    GRID_POWER_TEMPLATE = "grid_power_{}"
+    HAS_TOTAL_ENERGY = False
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
         super().__init__(hass, config_entry)
         self.hass = hass
-        self.device_id = config_entry.data["device_id"]
+        self.device_id = device_id or config_entry.data["device_id"]
         self.entity_registry = er.async_get(hass)
         self.inverter_entities = {}
         for entity in self.entity_registry.entities.values():
             if entity.device_id == self.device_id:
                 self.inverter_entities[entity.entity_id] = entity.name
 
-    def find_entity_state(self, entity_id):
-        """Helper method to find a state by entity_id."""
-        return next(
-            (
-                self.hass.states.get(entity)
-                for entity in self.inverter_entities
-                if entity.endswith(entity_id)
-            ),
-            None,
-        )
-
     def get_state_float(self, entity_id, default=0.0):
         """Helper method to get a sensor state as float."""
 
@@ -44,6 +37,7 @@ class SolarAssistantInverter(BaseInverter):
                 _LOGGER.warning(f"Could not convert state of {entity_id} to float")
         else:
             _LOGGER.warning(f"State of {entity_id} is unavailable or unknown")
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_state_int(self, entity_id, default=0):
@@ -56,23 +50,16 @@ class SolarAssistantInverter(BaseInverter):
                 _LOGGER.warning(f"Could not convert state of {entity_id} to int")
         else:
             _LOGGER.warning(f"State of {entity_id} is unavailable or unknown")
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_energy_data(self):
         """Retrieve ENERGY data."""
-        power = [
-            self.get_state_float("grid_power_1"),
-            self.get_state_float("grid_power_2"),
-            self.get_state_float("grid_power_3"),
-        ]
+        power = self.get_state_floats("grid_power_{}", minimum=3)
         today = self.get_state_float("grid_energy_in")
         total = 0.0  # As per payload
-        current = [0.0, 0.0, 0.0]  # As per payload
-        voltage = [
-            self.get_state_float("grid_voltage_1"),
-            self.get_state_float("grid_voltage_2"),
-            self.get_state_float("grid_voltage_3"),
-        ]
+        voltage = self.get_state_floats("grid_voltage_{}", minimum=3)
+        current = [round(x / y, 2) if y else 0 for x, y in zip(power, voltage)]
         frequency = self.get_state_float("grid_frequency")
 
         return EnergyData(
@@ -86,32 +73,19 @@ class SolarAssistantInverter(BaseInverter):
 
     def get_metrics_data(self):
         """Retrieve METRICS data."""
-        pv_power = [
-            self.get_state_float("pv_power_1"),
-            self.get_state_float("pv_power_2"),
-        ]
-        pv_voltage = [
-            self.get_state_float("pv_voltage_1"),
-            self.get_state_float("pv_voltage_2"),
-        ]
-        pv_current = [
-            self.get_state_float("pv_current_1"),
-            self.get_state_float("pv_current_2"),
-        ]
-        load_power = [
-            self.get_state_float("load_power_1"),
-            self.get_state_float("load_power_2"),
-            self.get_state_float("load_power_3"),
-        ]
+        pv_power = self.get_state_floats("pv_power_{}", minimum=2)
+        pv_voltage = self.get_state_floats("pv_voltage_{}", minimum=2)
+        pv_current = self.get_state_floats("pv_current_{}", minimum=2)
+        load_power = self.get_state_floats("load_power_{}", minimum=3)
         alarm_codes = [0]  # As per payload
-        battery_soc = self.get_state_int("battery_state_of_charge")
+        battery_soc = self.get_module_average("battery_{}_state_of_charge", "battery_state_of_charge")
         load_current = [0.0, 0.0, 0.0]  # As per payload
-        battery_power = [self.get_state_float("battery_power")]
-        battery_current = [self.get_state_float("battery_current")]
-        battery_voltage = [self.get_state_float("battery_voltage")]
+        battery_power = self.get_module_floats("battery_{}_power", "battery_power")
+        battery_current = self.get_module_floats("battery_{}_current", "battery_current")
+        battery_voltage = self.get_module_floats("battery_{}_voltage", "battery_voltage")
         inverter_status = 0  # As per payload
         grid_export_limit = self.get_state_float("max_sell_power")
-        battery_temperature = [self.get_state_float("battery_temperature")]
+        battery_temperature = self.get_module_floats("battery_{}_temperature", "battery_temperature")
         inverter_temperature = self.get_state_float("temperature")
 
         return MetricsData(
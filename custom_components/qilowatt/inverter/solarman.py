@@ -12,27 +12,20 @@ _LOGGER = logging.getLogger(__name__)
 class SolarmanInverter(BaseInverter):
     """Implementation for Solarman integrated inverters."""
 
-    def __init__(self, hass: HomeAssistant, config_entry):
+    REQUIRED_ENTITIES = ("grid_l1_power", "_battery")
+    HAS_TOTAL_ENERGY = False
+    BATTERY_CAPACITY_ENTITY = "battery_capacity"
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
         super().__init__(hass, config_entry)
         self.hass = hass
-        self.device_id = config_entry.data["device_id"]
+        self.device_id = device_id or config_entry.data["device_id"]
         self.entity_registry = er.async_get(hass)
         self.inverter_entities = {}
         for entity in self.entity_registry.entities.values():
             if entity.device_id == self.device_id:
                 self.inverter_entities[entity.entity_id] = entity.name
 
-    def find_entity_state(self, entity_id):
-        """Helper method to find a state by entity_id."""
-        return next(
-            (
-                self.hass.states.get(entity)
-                for entity in self.inverter_entities
-                if entity.endswith(entity_id)
-            ),
-            None,
-        )
-
     def get_state_float(self, entity_id, default=0.0):
         """Helper method to get a sensor state as float."""
 
@@ -44,6 +37,7 @@ class SolarmanInverter(BaseInverter):
                 _LOGGER.warning(f"Could not convert state of {entity_id} to float")
         else:
             _LOGGER.warning(f"State of {entity_id} is unavailable or unknown")
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_state_int(self, entity_id, default=0):
@@ -56,22 +50,15 @@ class SolarmanInverter(BaseInverter):
                 _LOGGER.warning(f"Could not convert state of {entity_id} to int")
         else:
             _LOGGER.warning(f"State of {entity_id} is unavailable or unknown")
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_energy_data(self):
         """Retrieve ENERGY data."""
-        power = [
-            self.get_state_float("grid_l1_power"),
-            self.get_state_float("grid_l2_power"),
-            self.get_state_float("grid_l3_power"),
-        ]
+        power = self.get_state_floats("grid_l{}_power", minimum=3)
         today = self.get_state_float("today_energy_import")
         total = 0.0  # As per payload
-        voltage = [
-            self.get_state_float("grid_l1_voltage"),
-            self.get_state_float("grid_l2_voltage"),
-            self.get_state_float("grid_l3_voltage"),
-        ]
+        voltage = self.get_state_floats("grid_l{}_voltage", minimum=3)
         current = [round(x / y, 2) if y else 0 for x, y in zip(power, voltage)]
         frequency = self.get_state_float("grid_frequency")
 
@@ -86,32 +73,19 @@ class SolarmanInverter(BaseInverter):
 
     def get_metrics_data(self):
         """Retrieve METRICS data."""
-        pv_power = [
-            self.get_state_float("pv1_power"),
-            self.get_state_float("pv2_power"),
-        ]
-        pv_voltage = [
-            self.get_state_float("pv1_voltage"),
-            self.get_state_float("pv2_voltage"),
-        ]
-        pv_current = [
-            self.get_state_float("pv1_current"),
-            self.get_state_float("pv2_current"),
-        ]
-        load_power = [
-            self.get_state_float("load_l1_power"),
-            self.get_state_float("load_l2_power"),
-            self.get_state_float("load_l3_power"),
-        ]
+        pv_power = self.get_state_floats("pv{}_power", minimum=2)
+        pv_voltage = self.get_state_floats("pv{}_voltage", minimum=2)
+        pv_current = self.get_state_floats("pv{}_current", minimum=2)
+        load_power = self.get_state_floats("load_l{}_power", minimum=3)
         alarm_codes = [0, 0, 0, 0, 0, 0]  # As per payload
-        battery_soc = self.get_state_int("_battery")
+        battery_soc = self.get_module_average("battery_{}_soc", "_battery")
         load_current = [0.0, 0.0, 0.0]  # As per payload
-        battery_power = [-1 * self.get_state_float("battery_power")]
-        battery_current = [-1 * self.get_state_float("battery_current")]
-        battery_voltage = [self.get_state_float("battery_voltage")]
+        battery_power = self.get_module_floats("battery_{}_power", "battery_power", scale=-1)
+        battery_current = self.get_module_floats("battery_{}_current", "battery_current", scale=-1)
+        battery_voltage = self.get_module_floats("battery_{}_voltage", "battery_voltage")
         inverter_status = 2  # As per payload
         grid_export_limit = self.get_state_float("grid_max_export_power")
-        battery_temperature = [self.get_state_float("battery_temperature")]
+        battery_temperature = self.get_module_floats("battery_{}_temperature", "battery_temperature")
         inverter_temperature = self.get_state_float("inverter_temperature")
 
         return MetricsData(
@@ -0,0 +1,221 @@
+import logging
+from collections import Counter
+from dataclasses import fields
+from itertools import zip_longest
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from qilowatt import EnergyData, MetricsData, WorkModeCommand
+
+from .base_inverter import BaseInverter
+
+_LOGGER = logging.getLogger(__name__)
+
+# How each payload field is merged across the units of a stack
+ENERGY_MERGE = {
+    "Power": "sum",
+    "Today": "sum",
+    "Total": "sum",
+    "Current": "sum",
+    "Voltage": "primary",
+    "Frequency": "primary",
+}
+
+METRICS_MERGE = {
+    "PvPower": "concat",
+    "PvVoltage": "concat",
+    "PvCurrent": "concat",
+    "LoadPower": "sum",
+    "BatterySOC": "soc",
+    "LoadCurrent": "sum",
+    "BatteryPower": "sum",
+    "BatteryCurrent": "sum",
+    "BatteryVoltage": "primary",
+    "GridExportLimit": "sum",
+    "BatteryTemperature": "max",
+    "InverterTemperature": "max",
+    "AlarmCodes": "or",
+    "InverterStatus": "primary",
+}
+
+# WORKMODE fields that are shared out between the units of a stack
+SPLIT_COMMAND_FIELDS = (
+    "PowerLimit",
+    "ChargeCurrent",
+    "DischargeCurrent",
+    "MaxPower",
+    "MxByPw",
+    "MxSlPw",
+)
+
+
+def _reduce(values, func):
+    """Apply func to the non-None values, or return None if there are none."""
+    values = [value for value in values if value is not None]
+    return func(values) if values else None
+
+
+def _bitwise_or(values):
+    result = 0
+    for value in values:
+        result |= int(value)
+    return result
+
+
+def _merge_field(method, values, weights):
+    """Merge one payload field from every unit."""
+    if method == "primary":
+        return values[0]
+    if method == "concat":
+        return [item for value in values for item in value or []]
+    if method == "soc":
+        pairs = [(v, w) for v, w in zip(values, weights) if v is not None]
+        if not pairs:
+            return None
+        return round(sum(v * w for v, w in pairs) / sum(w for _, w in pairs))
+
+    func = {"sum": sum, "max": max, "or": _bitwise_or}[method]
+    if any(isinstance(value, list) for value in values):
+        # Element-wise, e.g. per phase, padding units with fewer elements
+        columns = zip_longest(*(value or [] for value in values))
+        return [_reduce(column, func) for column in columns]
+    return _reduce(values, func)
+
+
+class InverterStack(BaseInverter):
+    """Parallel inverter stack reported as one Qilowatt device."""
+
+    def __init__(self, hass: HomeAssistant, config_entry, inverters):
+        super().__init__(hass, config_entry)
+        self.hass = hass
+        # device_id -> inverter, the primary (master) unit first
+        self.inverters = inverters
+        self.HAS_TODAY_ENERGY = all(i.HAS_TODAY_ENERGY for i in inverters.values())
+        self.HAS_TOTAL_ENERGY = all(i.HAS_TOTAL_ENERGY for i in inverters.values())
+        device_registry = dr.async_get(hass)
+        self.unit_names = {}
+        for device_id in inverters:
+            device = device_registry.async_get(device_id)
+            self.unit_names[device_id] = (device and device.name) or device_id
+
+    async def async_start(self, supervisor):
+        """Start the background work of every unit."""
+        for inverter in self.inverters.values():
+            await inverter.async_start(supervisor)
+
+    async def async_stop(self):
+        """Stop the background work of every unit."""
+        for inverter in self.inverters.values():
+            await inverter.async_stop()
+
+    def is_ready(self):
+        """Return True once every unit of the stack is ready."""
+        return all(inverter.is_ready() for inverter in self.inverters.values())
+
+    def get_grid_power(self):
+        """Return the total grid power of all units in W."""
+        return sum(inverter.get_grid_power() for inverter in self.inverters.values())
+
+    def get_grid_power_age(self):
+        """Return seconds since any unit last reported its grid power, if known."""
+        ages = [
+            age
+            for age in (inverter.get_grid_power_age() for inverter in self.inverters.values())
+            if age is not None
+        ]
+        return min(ages, default=None)
+
+    @callback
+    def async_track_grid_power(self, action):
+        """Call action whenever the grid power of any unit changes."""
+        unsubscribers = [
+            inverter.async_track_grid_power(action)
+            for inverter in self.inverters.values()
+        ]
+
+        def unsubscribe():
+            for unsub in unsubscribers:
+                unsub()
+
+        return unsubscribe
+
+    def use_states(self, states):
+        """Read entity states of every unit from `states` in the calling thread."""
+        super().use_states(states)
+        for inverter in self.inverters.values():
+            inverter.use_states(states)
+
+    def get_missing_fields(self):
+        """Return the missing field counts of all units."""
+        return sum(
+            (inverter.get_missing_fields() for inverter in self.inverters.values()),
+            Counter(),
+        )
+
+    def get_weights(self):
+        """Return the share of each unit, by battery capacity when known."""
+        capacities = [
+            inverter.get_battery_capacity() for inverter in self.inverters.values()
+        ]
+        if all(capacities):
+            return capacities
+        return [1.0] * len(capacities)
+
+    def _merge(self, data_class, merge, payloads):
+        weights = self.get_weights()
+        return data_class(
+            **{
+                field.name: _merge_field(
+                    merge[field.name],
+                    [getattr(payload, field.name) for payload in payloads],
+                    weights,
+                )
+                for field in fields(data_class)
+            }
+        )
+
+    def get_energy_data(self):
+        """Retrieve ENERGY data merged over all units."""
+        payloads = [inverter.get_energy_data() for inverter in self.inverters.values()]
+        return self._merge(EnergyData, ENERGY_MERGE, payloads)
+
+    def get_metrics_data(self):
+        """Retrieve METRICS data merged over all units."""
+        payloads = [inverter.get_metrics_data() for inverter in self.inverters.values()]
+        return self._merge(MetricsData, METRICS_MERGE, payloads)
+
+    @callback
+    def handle_command(self, command: WorkModeCommand):
+        """Pass every unit its share of a WORKMODE command."""
+        applied = [
+            self.inverters[device_id].handle_command(unit_command)
+            for device_id, unit_command in self._split_command(command).items()
+        ]
+        return any(applied)
+
+    def split_command(self, command: WorkModeCommand):
+        """Split a WORKMODE command into one command per unit name."""
+        commands = {
+            self.unit_names[device_id]: unit_command
+            for device_id, unit_command in self._split_command(command).items()
+        }
+        _LOGGER.debug("Split WORKMODE command over stack: %s", commands)
+        return commands
+
+    def _split_command(self, command: WorkModeCommand):
+        """Split a WORKMODE command into one command per device_id.
+
+        Power and current targets are shared out in proportion to the unit
+        weights; mode, SOC and peak shaving targets apply to every unit.
+        """
+        weights = self.get_weights()
+        total = sum(weights)
+        commands = {}
+        for device_id, weight in zip(self.inverters, weights):
+            unit_command = WorkModeCommand.from_dict(command.to_dict())
+            for name in SPLIT_COMMAND_FIELDS:
+                value = getattr(unit_command, name, None)
+                if value is not None:
+                    setattr(unit_command, name, round(value * weight / total))
+            commands[device_id] = unit_command
+        return commands
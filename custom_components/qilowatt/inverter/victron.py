@@ -12,27 +12,20 @@ _LOGGER = logging.getLogger(__name__)
 class VictronInverter(BaseInverter):
     """Implementation for Victron cerbo  integrated inverters."""
 
-    def __init__(self, hass: HomeAssistant, config_entry):
+    REQUIRED_ENTITIES = ("victron_qw_grid_l1", "victron_qw_battery_state_of_charge")
+    GRID_POWER_TEMPLATE = "victron_qw_grid_l{}"
+    HAS_TOTAL_ENERGY = False
+
+    def __init__(self, hass: HomeAssistant, config_entry, device_id=None):
         super().__init__(hass, config_entry)
         self.hass = hass
-        self.device_id = config_entry.data["device_id"]
+        self.device_id = device_id or config_entry.data["device_id"]
         self.entity_registry = er.async_get(hass)
         self.inverter_entities = {}
         for entity in self.entity_registry.entities.values():
             if entity.device_id == self.device_id:
                 self.inverter_entities[entity.entity_id] = entity.name
 
-    def find_entity_state(self, entity_id):
-        """Helper method to find a state by entity_id."""
-        return next(
-            (
-                self.hass.states.get(entity)
-                for entity in self.inverter_entities
-                if entity.endswith(entity_id)
-            ),
-            None,
-        )
-
     def get_state_float(self, entity_id, default=0.0):
         """Helper method to get a sensor state as float."""
 
@@ -44,6 +37,7 @@ class VictronInverter(BaseInverter):
                 _LOGGER.warning(f"Could not convert state of {entity_id} to float")
         else:
             _LOGGER.warning(f"State of {entity_id} is unavailable or unknown")
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_state_int(self, entity_id, default=0):
@@ -56,22 +50,15 @@ class VictronInverter(BaseInverter):
                 _LOGGER.warning(f"Could not convert state of {entity_id} to int")
         else:
             _LOGGER.warning(f"State of {entity_id} is unavailable or unknown")
+            self.missing_fields[entity_id] += 1
         return default
 
     def get_energy_data(self):
         """Retrieve ENERGY data."""
-        power = [
-            self.get_state_float("victron_qw_grid_l1"),
-            self.get_state_float("victron_qw_grid_l2"),
-            self.get_state_float("victron_qw_grid_l3"),
-        ]
+        power = self.get_state_floats("victron_qw_grid_l{}", minimum=3)
         today = self.get_state_float("today_energy_import")
         total = 0.0  # As per payload
-        voltage = [
-            self.get_state_float("victron_qw_input_voltage_phase_1"),
-            self.get_state_float("victron_qw_input_voltage_phase_2"),
-            self.get_state_float("victron_qw_input_voltage_phase_3"),
-        ]
+        voltage = self.get_state_floats("victron_qw_input_voltage_phase_{}", minimum=3)
         current = [round(x / y, 2) if y else 0 for x, y in zip(power, voltage)]
         frequency = self.get_state_float("victron_qw_grid_frequency")
 
@@ -86,29 +73,20 @@ class VictronInverter(BaseInverter):
 
     def get_metrics_data(self):
         """Retrieve METRICS data."""
-        pv_power = [
-            self.get_state_float("total_pv_power"),
-            self.get_state_float("pv2_power"),
-        ]
-        pv_voltage = [
-            self.get_state_float("pv1_voltage"),
-            self.get_state_float("pv2_voltage"),
-        ]
-        pv_current = [
-            self.get_state_float("pv1_current"),
-            self.get_state_float("pv2_current"),
-        ]
-        load_power = [
-            self.get_state_float("victron_qw_ac_consumption_l1"),
-            self.get_state_float("victron_qw_ac_consumption_l2"),
-            self.get_state_float("victron_qw_ac_consumption_l3"),
-        ]
+        pv_power = self.get_state_floats("pv{}_power", minimum=0)
+        if not pv_power:
+            # A single MPPT may report only its total
+            pv_power = [self.get_state_float("total_pv_power")]
+        pv_power += [0.0] * (2 - len(pv_power))
+        pv_voltage = self.get_state_floats("pv{}_voltage", minimum=2)
+        pv_current = self.get_state_floats("pv{}_current", minimum=2)
+        load_power = self.get_state_floats("victron_qw_ac_consumption_l{}", minimum=3)
         alarm_codes = [0, 0, 0, 0, 0, 0]  # As per payload
-        battery_soc = self.get_state_int("victron_qw_battery_state_of_charge")
+        battery_soc = self.get_module_average("victron_qw_battery_{}_state_of_charge", "victron_qw_battery_state_of_charge")
         load_current = [0.0, 0.0, 0.0]  # As per payload
-        battery_power = [self.get_state_float("victron_qw_battery_power")]
-        battery_current = [self.get_state_float("victron_qw_battery_current")]
-        battery_voltage = [self.get_state_float("victron_qw_battery_voltage")]
+        battery_power = self.get_module_floats("victron_qw_battery_{}_power", "victron_qw_battery_power")
+        battery_current = self.get_module_floats("victron_qw_battery_{}_current", "victron_qw_battery_current")
+        battery_voltage = self.get_module_floats("victron_qw_battery_{}_voltage", "victron_qw_battery_voltage")
         inverter_status = 2  # As per payload
         grid_export_limit = self.get_state_float("sell_limit_2")
         battery_temperature = [self.get_state_float("victron_qw_battery_temperature")]
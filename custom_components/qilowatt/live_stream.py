@@ -0,0 +1,112 @@
+"""Live stream of published payloads and received commands for Qilowatt integration."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# Messages held per subscriber; a slow subscriber loses the oldest ones
+LIVE_STREAM_QUEUE_SIZE = 64
+
+
+class _Subscriber:
+    """Bounded queue and forwarding task of one subscriber."""
+
+    __slots__ = ("send", "queue", "wakeup", "dropped", "task")
+
+    def __init__(self, send, size) -> None:
+        self.send = send
+        self.queue = deque(maxlen=size)
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        self.task = None
+
+
+class LiveStream:
+    """Fan out the entry's outgoing payloads and WORKMODE commands.
+
+    One producer side is shared by every subscriber. Each subscriber has a
+    bounded queue drained by its own supervised task, so a slow websocket
+    only loses its own oldest messages and never holds up publishing. With
+    no subscribers, publishing costs one truthiness check.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, supervisor, size=LIVE_STREAM_QUEUE_SIZE
+    ) -> None:
+        """Initialize the stream."""
+        self.hass = hass
+        self._supervisor = supervisor
+        self._size = size
+        self._subscribers = []
+
+    @property
+    def subscriber_count(self) -> int:
+        """Return the number of subscribers."""
+        return len(self._subscribers)
+
+    @callback
+    def async_subscribe(self, send):
+        """Call send with every message from now on. Returns an unsubscriber."""
+        subscriber = _Subscriber(send, self._size)
+        subscriber.task = self._supervisor.create_task(
+            self._forward(subscriber), "live stream subscriber"
+        )
+        if subscriber.task is None:
+            # The entry is shutting down
+            return lambda: None
+        self._subscribers.append(subscriber)
+
+        @callback
+        def unsubscribe():
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+                subscriber.task.cancel()
+
+        return unsubscribe
+
+    @callback
+    def async_close(self):
+        """Drop every subscriber, e.g. when the entry is unloaded."""
+        while self._subscribers:
+            self._subscribers.pop().task.cancel()
+
+    def publish(self, kind, data):
+        """Queue a message for every subscriber. Safe to call from any thread."""
+        if not self._subscribers:
+            return
+        self.hass.loop.call_soon_threadsafe(self.async_publish, kind, data, time.time())
+
+    @callback
+    def async_publish(self, kind, data, timestamp=None):
+        """Queue a message for every subscriber."""
+        if not self._subscribers:
+            return
+        message = {
+            "kind": kind,
+            "time": time.time() if timestamp is None else timestamp,
+            **data,
+        }
+        for subscriber in self._subscribers:
+            if len(subscriber.queue) == subscriber.queue.maxlen:
+                subscriber.dropped += 1
+            subscriber.queue.append(message)
+            subscriber.wakeup.set()
+
+    async def _forward(self, subscriber: _Subscriber):
+        """Hand a subscriber's queued messages to it, oldest first."""
+        while True:
+            await subscriber.wakeup.wait()
+            subscriber.wakeup.clear()
+            if subscriber.dropped:
+                _LOGGER.debug(
+                    "Live stream subscriber too slow, dropped %s messages",
+                    subscriber.dropped,
+                )
+                subscriber.dropped = 0
+            while subscriber.queue:
+                subscriber.send(subscriber.queue.popleft())
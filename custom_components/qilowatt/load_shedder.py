@@ -0,0 +1,105 @@
+"""Event loop lag monitor and load shedding for Qilowatt integration."""
+
+import asyncio
+import logging
+import time
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+LEVEL_FULL = "full"
+LEVEL_REDUCED_METRICS = "reduced_metrics"  # METRICS collected less often
+LEVEL_MINIMAL = "minimal"  # Also no filters, shadow or frequent energy samples
+
+LEVELS = [LEVEL_FULL, LEVEL_REDUCED_METRICS, LEVEL_MINIMAL]
+
+
+class LoadShedder:
+    """Shed telemetry work while the Home Assistant event loop lags.
+
+    A supervised task sleeps `interval` seconds at a time and measures how
+    late it wakes up; the lag is smoothed with an exponential moving average.
+    The shedding level rises immediately when the smoothed lag crosses the
+    threshold of a higher level, and steps down one level at a time once the
+    lag has stayed below the threshold of the current level for
+    `recover_after` seconds. WORKMODE handling and peak shaving are never
+    shed; the client consults `level` for everything else.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        name,
+        thresholds=(0.1, 0.5),
+        interval=1.0,
+        smoothing=0.3,
+        recover_after=60.0,
+        clock=time.monotonic,
+    ) -> None:
+        """Initialize the monitor at full service."""
+        self.hass = hass
+        self._name = name
+        self._thresholds = thresholds  # Smoothed lag in seconds per level above full
+        self._interval = interval
+        self._smoothing = smoothing
+        self._recover_after = recover_after
+        self._clock = clock
+        self.level = 0
+        self.lag = 0.0
+        self._calm_since = None
+
+    @property
+    def state(self) -> str:
+        """Return the name of the current shedding level."""
+        return LEVELS[self.level]
+
+    @property
+    def reduce_metrics(self) -> bool:
+        """Return True while METRICS should be collected less often."""
+        return self.level >= LEVELS.index(LEVEL_REDUCED_METRICS)
+
+    @property
+    def minimal(self) -> bool:
+        """Return True while only the essential work should be done."""
+        return self.level >= LEVELS.index(LEVEL_MINIMAL)
+
+    async def async_start(self, supervisor):
+        """Start measuring the event loop lag."""
+        supervisor.create_task(self._run(), "loop lag monitor")
+
+    async def _run(self):
+        loop = self.hass.loop
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            self.add_sample(max(loop.time() - expected, 0.0))
+
+    def add_sample(self, lag):
+        """Update the smoothed lag and the shedding level with one measurement."""
+        self.lag += self._smoothing * (lag - self.lag)
+        target = sum(self.lag >= threshold for threshold in self._thresholds)
+        if target > self.level:
+            _LOGGER.warning(
+                "%s: event loop lag %.0f ms, shedding load: %s",
+                self._name,
+                self.lag * 1000,
+                LEVELS[target],
+            )
+            self.level = target
+            self._calm_since = None
+        elif target < self.level:
+            now = self._clock()
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self._recover_after:
+                self.level -= 1
+                self._calm_since = now if target < self.level else None
+                _LOGGER.info(
+                    "%s: event loop lag recovered to %.0f ms, load shedding: %s",
+                    self._name,
+                    self.lag * 1000,
+                    self.state,
+                )
+        else:
+            self._calm_since = None
@@ -0,0 +1,102 @@
+"""Pipeline metrics for Qilowatt integration."""
+
+from bisect import bisect_left
+from collections import Counter
+
+# Upper bounds in seconds of the duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class Histogram:
+    """Fixed bucket histogram, in the shape Prometheus expects."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=DURATION_BUCKETS) -> None:
+        """Initialize the histogram with sorted bucket upper bounds."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Count one observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class PipelineMetrics:
+    """Counters and histograms of one entry's collection and publish pipeline.
+
+    Updates are plain increments from the thread that does the work, without
+    locks or allocations; a scrape may see one observation half counted,
+    which the next scrape corrects. Everything is formatted at scrape time.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.cycles = 0
+        self.cycles_skipped = Counter()  # reason -> cycles
+        self.suppressed = 0
+        self.publishes = Counter()  # topic -> messages
+        self.publish_bytes = Counter()  # topic -> bytes
+        self.publish_failures = 0
+        self.cycle_duration = Histogram()
+        self.command_latency = Histogram()
+
+
+class MetricFamily:
+    """One metric with its HELP and TYPE lines and its samples."""
+
+    def __init__(self, name, kind, help_text) -> None:
+        """Initialize an empty family."""
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.samples = []  # (name suffix, labels, value)
+
+    def add(self, labels, value):
+        """Add a sample."""
+        self.samples.append(("", labels, value))
+
+    def add_histogram(self, labels, histogram: Histogram):
+        """Add the bucket, sum and count samples of a histogram."""
+        cumulative = 0
+        bounds = [*map(_format_value, histogram.buckets), "+Inf"]
+        for bound, count in zip(bounds, histogram.counts):
+            cumulative += count
+            self.samples.append(("_bucket", {**labels, "le": bound}, cumulative))
+        self.samples.append(("_sum", labels, histogram.sum))
+        self.samples.append(("_count", labels, histogram.count))
+
+
+def render(families) -> str:
+    """Return metric families in the Prometheus text exposition format."""
+    lines = []
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.help_text}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for suffix, labels, value in family.samples:
+            lines.append(
+                f"{family.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+            )
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
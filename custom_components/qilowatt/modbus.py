@@ -0,0 +1,246 @@
+"""Modbus TCP client and inverter register maps for Qilowatt integration."""
+
+import asyncio
+import logging
+import struct
+from dataclasses import dataclass
+
+_LOGGER = logging.getLogger(__name__)
+
+READ_HOLDING_REGISTERS = 0x03
+
+# Modbus limits a single read to 125 registers
+MAX_READ_COUNT = 125
+
+
+class ModbusError(Exception):
+    """Error talking to a Modbus TCP device."""
+
+
+@dataclass(frozen=True)
+class Register:
+    """One value in an inverter register map.
+
+    Values are decoded as (raw + offset) * scale. Two-register values are
+    big-endian within each register; `word_swap` puts the low word first.
+    """
+
+    address: int
+    count: int = 1
+    signed: bool = False
+    scale: float = 1.0
+    offset: int = 0
+    word_swap: bool = False
+
+    def decode(self, words):
+        """Decode the raw register words of this value."""
+        if self.word_swap:
+            words = words[::-1]
+        raw = 0
+        for word in words:
+            raw = (raw << 16) | word
+        if self.signed and raw >= 1 << (16 * self.count - 1):
+            raw -= 1 << (16 * self.count)
+        return (raw + self.offset) * self.scale
+
+    def encode(self, value):
+        """Encode a value into raw register words, e.g. for a simulator."""
+        raw = round(value / self.scale) - self.offset
+        raw &= (1 << (16 * self.count)) - 1
+        words = [(raw >> (16 * i)) & 0xFFFF for i in reversed(range(self.count))]
+        return words[::-1] if self.word_swap else words
+
+
+def plan_blocks(registers, max_gap=16, max_count=MAX_READ_COUNT):
+    """Group registers into as few contiguous (start, count) reads as possible.
+
+    Registers less than `max_gap` apart share a read, since reading a few
+    unused registers is cheaper than another request round trip.
+    """
+    blocks = []
+    for register in sorted(registers, key=lambda r: r.address):
+        end = register.address + register.count
+        if blocks:
+            start, count = blocks[-1]
+            if (
+                register.address - (start + count) < max_gap
+                and end - start <= max_count
+            ):
+                blocks[-1] = (start, max(count, end - start))
+                continue
+        blocks.append((register.address, register.count))
+    return blocks
+
+
+def decode_blocks(registers, blocks, results):
+    """Map the words read for each block back to named values."""
+    values = {}
+    for name, register in registers.items():
+        for (start, count), words in zip(blocks, results):
+            if start <= register.address and register.address + register.count <= start + count:
+                offset = register.address - start
+                values[name] = register.decode(words[offset : offset + register.count])
+                break
+    return values
+
+
+# Deye SG04LP3/SG01HP3 three phase hybrid inverters. Battery power and current
+# are positive when discharging and are inverted to the Qilowatt convention.
+DEYE_REGISTERS = {
+    "today_energy_import": Register(520, scale=0.1),
+    "today_energy_export": Register(521, scale=0.1),
+    "total_energy_import": Register(522, count=2, scale=0.1, word_swap=True),
+    "total_energy_export": Register(524, count=2, scale=0.1, word_swap=True),
+    "grid_export_limit": Register(143),
+    "inverter_status": Register(500),
+    "inverter_temperature": Register(541, scale=0.1, offset=-1000),
+    "battery_temperature": Register(586, scale=0.1, offset=-1000),
+    "battery_voltage": Register(587, scale=0.01),
+    "battery_soc": Register(588),
+    "battery_power": Register(590, signed=True, scale=-1),
+    "battery_current": Register(591, signed=True, scale=-0.01),
+    "grid_l1_voltage": Register(598, scale=0.1),
+    "grid_l2_voltage": Register(599, scale=0.1),
+    "grid_l3_voltage": Register(600, scale=0.1),
+    "grid_frequency": Register(609, scale=0.01),
+    "grid_l1_current": Register(610, signed=True, scale=0.01),
+    "grid_l2_current": Register(611, signed=True, scale=0.01),
+    "grid_l3_current": Register(612, signed=True, scale=0.01),
+    "grid_l1_power": Register(622, signed=True),
+    "grid_l2_power": Register(623, signed=True),
+    "grid_l3_power": Register(624, signed=True),
+    "load_l1_power": Register(650, signed=True),
+    "load_l2_power": Register(651, signed=True),
+    "load_l3_power": Register(652, signed=True),
+    "pv1_power": Register(672),
+    "pv2_power": Register(673),
+    "pv1_voltage": Register(676, scale=0.1),
+    "pv1_current": Register(677, scale=0.1),
+    "pv2_voltage": Register(678, scale=0.1),
+    "pv2_current": Register(679, scale=0.1),
+}
+
+# Sofar HYD 5-20KTL-3PH (G3 protocol). Powers are reported in units of 10 W
+# and grid power at the PCC is inverted to the Qilowatt convention.
+SOFAR_REGISTERS = {
+    "inverter_status": Register(0x0404),
+    "inverter_temperature": Register(0x0418, signed=True),
+    "grid_frequency": Register(0x0484, scale=0.01),
+    "grid_l1_voltage": Register(0x048D, scale=0.1),
+    "grid_l1_current": Register(0x0492, scale=0.01),
+    "grid_l1_power": Register(0x0493, signed=True, scale=-10),
+    "grid_l2_voltage": Register(0x0498, scale=0.1),
+    "grid_l2_current": Register(0x049D, scale=0.01),
+    "grid_l2_power": Register(0x049E, signed=True, scale=-10),
+    "grid_l3_voltage": Register(0x04A3, scale=0.1),
+    "grid_l3_current": Register(0x04A8, scale=0.01),
+    "grid_l3_power": Register(0x04A9, signed=True, scale=-10),
+    "load_power": Register(0x04AF, signed=True, scale=10),
+    "pv1_voltage": Register(0x0584, scale=0.1),
+    "pv1_current": Register(0x0585, scale=0.01),
+    "pv1_power": Register(0x0586, scale=10),
+    "pv2_voltage": Register(0x0587, scale=0.1),
+    "pv2_current": Register(0x0588, scale=0.01),
+    "pv2_power": Register(0x0589, scale=10),
+    "battery_voltage": Register(0x0604, scale=0.1),
+    "battery_current": Register(0x0605, signed=True, scale=0.01),
+    "battery_temperature": Register(0x0607, signed=True),
+    "battery_power": Register(0x0667, signed=True, scale=10),
+    "battery_soc": Register(0x0668),
+    "today_energy_import": Register(0x068C, count=2, scale=0.01),
+    "total_energy_import": Register(0x068E, count=2, scale=0.1),
+    "today_energy_export": Register(0x0690, count=2, scale=0.01),
+    "total_energy_export": Register(0x0692, count=2, scale=0.1),
+}
+
+REGISTER_MAPS = {
+    "Deye": DEYE_REGISTERS,
+    "Sofar": SOFAR_REGISTERS,
+}
+
+
+class ModbusTcpClient:
+    """Minimal asyncio Modbus TCP client for reading holding registers.
+
+    Requests are serialized over one connection, which is (re)opened on
+    demand and closed on any I/O error so the next read starts clean.
+    """
+
+    def __init__(self, host, port=502, unit=1, timeout=3.0) -> None:
+        """Initialize the client."""
+        self.host = host
+        self.port = port
+        self.unit = unit
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._transaction = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the connection is open."""
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        """Open the connection if it is not open yet."""
+        if self.connected:
+            return
+        try:
+            async with asyncio.timeout(self.timeout):
+                self._reader, self._writer = await asyncio.open_connection(
+                    self.host, self.port
+                )
+        except (OSError, TimeoutError) as e:
+            raise ModbusError(f"Cannot connect to {self.host}:{self.port}: {e!r}") from e
+        _LOGGER.debug("Connected to Modbus device %s:%s", self.host, self.port)
+
+    async def close(self):
+        """Close the connection."""
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def read_holding_registers(self, address, count):
+        """Read `count` holding registers starting at `address`."""
+        async with self._lock:
+            await self.connect()
+            self._transaction = (self._transaction + 1) & 0xFFFF
+            request = struct.pack(
+                ">HHHBBHH",
+                self._transaction,
+                0,
+                6,
+                self.unit,
+                READ_HOLDING_REGISTERS,
+                address,
+                count,
+            )
+            try:
+                async with asyncio.timeout(self.timeout):
+                    self._writer.write(request)
+                    await self._writer.drain()
+                    header = await self._reader.readexactly(7)
+                    transaction, _, length, _ = struct.unpack(">HHHB", header)
+                    pdu = await self._reader.readexactly(length - 1)
+            except (OSError, TimeoutError, asyncio.IncompleteReadError) as e:
+                await self.close()
+                raise ModbusError(
+                    f"Reading {count} registers at {address} failed: {e!r}"
+                ) from e
+            if transaction != self._transaction:
+                # A late reply to a timed out request, resynchronize
+                await self.close()
+                raise ModbusError(f"Unexpected transaction id {transaction}")
+
+        if pdu[0] & 0x80:
+            raise ModbusError(
+                f"Device returned exception {pdu[1]} for {count} registers at {address}"
+            )
+        if pdu[1] != 2 * count:
+            raise ModbusError(f"Expected {2 * count} bytes, got {pdu[1]}")
+        return list(struct.unpack(f">{count}H", pdu[2 : 2 + 2 * count]))
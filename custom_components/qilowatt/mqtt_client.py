@@ -2,19 +2,73 @@
 
 import asyncio
 import logging
+import random
+import time
+from dataclasses import replace
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.const import __version__ as HA_VERSION
 
-from qilowatt import InverterDevice, QilowattMQTTClient, WorkModeCommand
+import paho.mqtt.client as mqtt
+from qilowatt import QilowattMQTTClient, WorkModeCommand
 
-from .const import DOMAIN
-from .inverter import get_inverter_class
+from .circuit_breaker import CircuitBreaker
+from .command_history import (
+    OUTCOME_APPLIED,
+    OUTCOME_DISPATCHED,
+    OUTCOME_PEAK_SHAVING,
+    CommandHistory,
+)
+from .const import (
+    CONF_ENERGY_INTERVAL,
+    CONF_ENERGY_TRIGGER,
+    CONF_FILTER_ENABLED,
+    CONF_FILTER_WINDOW,
+    CONF_FLOAT_PRECISION,
+    CONF_METRICS_INTERVAL,
+    CONF_METRICS_TRIGGER,
+    CONF_PEAK_SHAVING_ENTITY,
+    CONF_SHADOW_MODE,
+    DOMAIN,
+    FILTER_DEFAULT_WINDOW,
+    LOAD_SHED_METRICS_FACTOR,
+    LOAD_SHED_SAMPLE_INTERVAL,
+    READINESS_POLL_INTERVAL,
+    RECONNECT_MAX_DELAY,
+    RECONNECT_MIN_DELAY,
+    STARTUP_TIMEOUT,
+    TRIGGER_CHANGE,
+    TRIGGER_INTERVAL,
+    TRIGGER_TIMER,
+    UPDATE_INTERVAL,
+)
+from .device import QilowattInverterDevice
+from .energy_integrator import EnergyIntegrator
+from .filters import (
+    ENERGY_COUNTERS,
+    ENERGY_DERIVED,
+    ENERGY_RANGES,
+    METRICS_RANGES,
+    SampleFilter,
+)
+from .inverter import SHADOW_INTEGRATIONS, InverterStack, create_inverter
+from .live_stream import LiveStream
+from .load_shedder import LoadShedder
+from .metrics import PipelineMetrics
+from .peak_shaving import PeakShavingController
+from .publish_queue import PublishQueue
+from .serializer import PayloadSerializer
+from .shadow import ShadowCollector
+from .supervisor import TaskSupervisor
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def _drop_publish(topic, data):
+    """Publish callback of a stopped client, the device has no way to unset it."""
+
+
 class MQTTClient:
     """Wrapper for the Qilowatt MQTT client."""
 
@@ -29,11 +83,76 @@ class MQTTClient:
         self.inverter_model = config_entry.data["inverter_model"]
 
         self.qilowatt_client = None  # Will be initialized later
+        self.supervisor = TaskSupervisor(hass, config_entry.title)
+        self.breaker = CircuitBreaker(config_entry.title, base_delay=UPDATE_INTERVAL)
+        self.publish_queue = PublishQueue(self._send_payload)
+        self.metrics = PipelineMetrics()
+        self.live_stream = LiveStream(hass, self.supervisor)
+        self.command_history = CommandHistory(hass, config_entry.entry_id)
+        self.load_shedder = LoadShedder(hass, config_entry.title)
+        self.serializer = PayloadSerializer(
+            config_entry.options.get(CONF_FLOAT_PRECISION)
+        )
+
+        # Independent collection schedules and publish triggers per payload group
+        options = config_entry.options
+        self.energy_interval = options.get(CONF_ENERGY_INTERVAL, UPDATE_INTERVAL)
+        self.metrics_interval = options.get(CONF_METRICS_INTERVAL, UPDATE_INTERVAL)
+        self.energy_trigger = options.get(CONF_ENERGY_TRIGGER, TRIGGER_TIMER)
+        self.metrics_trigger = options.get(CONF_METRICS_TRIGGER, TRIGGER_TIMER)
+        self._energy_data = None
+        self._metrics_data = None
+
+        # Outlier filter between collection and publish
+        self.filter_enabled = options.get(CONF_FILTER_ENABLED, True)
+        window = options.get(CONF_FILTER_WINDOW, FILTER_DEFAULT_WINDOW)
+        self.energy_filter = SampleFilter(
+            ENERGY_RANGES, window, ENERGY_DERIVED, ENERGY_COUNTERS
+        )
+        self.metrics_filter = SampleFilter(METRICS_RANGES, window)
+
+        # Reconnect bookkeeping
+        self.reconnects = 0
+        self._has_connected = False
+        self.reconnect_latency = None  # Seconds from reconnect to first SENSOR
+        self._reconnected_at = None
+
+        # Startup readiness
+        self._connected_event = asyncio.Event()
+        self._ready = False
+        self._started_at = None
+        self.startup_latency = None  # Seconds from start to first valid sample
 
-        # Initialize the inverter
-        inverter_class = get_inverter_class(self.inverter_model)
-        self.inverter = inverter_class(self.hass, config_entry)
-        self.qw_device = InverterDevice(device_id=self.inverter_id)
+        # Initialize the inverter, or the stack of parallel inverters
+        self.inverter = create_inverter(self.hass, config_entry)
+        self.qw_device = QilowattInverterDevice(device_id=self.inverter_id)
+
+        # Optional alternate collector compared against the active one
+        self.shadow = None
+        if options.get(CONF_SHADOW_MODE):
+            shadow_class = SHADOW_INTEGRATIONS.get(self.inverter_model)
+            if shadow_class is None:
+                _LOGGER.warning(
+                    "No alternate collector for %s, shadow mode disabled",
+                    self.inverter_model,
+                )
+            else:
+                # Not pinned, so the alternate lookup is compared with the pinned entities
+                self.shadow = ShadowCollector(
+                    self.inverter,
+                    create_inverter(hass, config_entry, shadow_class, pinned=False),
+                )
+
+        # Local energy counters for backends that do not read them
+        self.energy_integrator = None
+        self._last_grid_sample = None
+        if not (self.inverter.HAS_TODAY_ENERGY and self.inverter.HAS_TOTAL_ENERGY):
+            self.energy_integrator = EnergyIntegrator(hass, config_entry.entry_id)
+
+        # Optional local control loop holding the WORKMODE PeakShaving threshold
+        self.peak_shaving = None
+        if config_entry.options.get(CONF_PEAK_SHAVING_ENTITY):
+            self.peak_shaving = PeakShavingController(hass, self.inverter, config_entry)
 
                 # Set qw_device version data (convert AwesomeVersion to str)
         qilowatt_integration = self.hass.data.get("integrations", {}).get(DOMAIN)
@@ -64,6 +183,8 @@ class MQTTClient:
             mqtt_password=self.mqtt_password,
             device=self.qw_device,
         )
+        # Route device publishes through the bounded latest-wins queue
+        self.qw_device.set_publish_callback(self.publish_queue.put)
         self.qw_device.set_command_callback(self._on_command_received)
         # Add connection status callback
         self.qilowatt_client.add_connection_callback(self._on_connection_status_changed)
@@ -71,35 +192,143 @@ class MQTTClient:
     async def start(self):
         """Start the Qilowatt MQTT client."""
         _LOGGER.debug("Starting Qilowatt MQTT client")
+        self._started_at = time.monotonic()
         # Run the blocking initialization in the executor
         if self.qilowatt_client is None:
             await self.hass.async_add_executor_job(self.initialize_client)
         # Run the blocking connect in the executor too
         await self.hass.async_add_executor_job(self.qilowatt_client.connect)
 
+        self.supervisor.async_on_shutdown(self.live_stream.async_close)
+        await self.command_history.async_load()
+        await self.load_shedder.async_start(self.supervisor)
+        # Start the backend's own background work, if any
+        await self.inverter.async_start(self.supervisor)
+        if self.energy_integrator:
+            await self.energy_integrator.async_load()
+            self.supervisor.async_on_shutdown(
+                self.inverter.async_track_grid_power(self._handle_grid_power)
+            )
+        if self.peak_shaving:
+            await self.peak_shaving.async_start(self.supervisor)
         # Start data update loop
-        self.hass.loop.create_task(self.update_data_loop())
+        self.supervisor.create_task(self.update_data_loop(), "update data loop")
+
+    async def async_stop(self):
+        """Cancel the background work and stop the Qilowatt MQTT client."""
+        await self.supervisor.async_shutdown()
+        await self.inverter.async_stop()
+        if self.energy_integrator:
+            await self.energy_integrator.async_save()
+        await self.command_history.async_save()
+        await self.hass.async_add_executor_job(self.stop)
 
     def stop(self):
         """Stop the Qilowatt MQTT client."""
         _LOGGER.debug("Stopping Qilowatt MQTT client")
         if self.qilowatt_client:
-            self.qilowatt_client.disconnect()
+            self.qilowatt_client.remove_connection_callback(
+                self._on_connection_status_changed
+            )
+            # QilowattMQTTClient.disconnect() only stops the network thread
+            # while connected, so one reconnecting through a broker outage
+            # would keep running. Stop the paho client itself instead.
+            # pylint: disable-next=protected-access
+            client = self.qilowatt_client._client
+            client.loop_stop()
+            client.disconnect()
+        # A message already received must not reach the unloaded entry
+        self.qw_device.set_command_callback(None)
+        self.qw_device.set_publish_callback(_drop_publish)
+        self.qw_device.stop_timers()
+        self.publish_queue.clear()
+
+    def _send_payload(self, topic, data):
+        """Publish a payload from the queue, returning the message info."""
+        if not self.qilowatt_client or not self.qilowatt_client.connected:
+            return None
+        payload = self.serializer.dumps(data)
+        # pylint: disable-next=protected-access
+        result = self.qilowatt_client._client.publish(topic, payload)
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
+            _LOGGER.warning("Failed to publish to %s: %s", topic, result.rc)
+            self.metrics.publish_failures += 1
+            return None
+        kind = topic.rsplit("/", 1)[-1]
+        self.metrics.publishes[kind] += 1
+        self.metrics.publish_bytes[kind] += len(payload)
+        self.live_stream.publish("payload", {"topic": topic, "data": data})
+        _LOGGER.debug("Published data to %s", topic)
+        if self._reconnected_at is not None and topic == self.qw_device.sensor_topic:
+            self.reconnect_latency = time.monotonic() - self._reconnected_at
+            self._reconnected_at = None
+            _LOGGER.debug(
+                "First SENSOR publish %.3f s after reconnect", self.reconnect_latency
+            )
+        return result
+
+    @callback
+    def _handle_grid_power(self, event=None):
+        """Feed the energy integrator from the grid power stream."""
+        now = time.monotonic()
+        if (
+            self.load_shedder.minimal
+            and self._last_grid_sample is not None
+            and now - self._last_grid_sample < LOAD_SHED_SAMPLE_INTERVAL
+        ):
+            # Fewer samples, still well within the integrator's maximum gap
+            return
+        self._last_grid_sample = now
+        self.energy_integrator.async_add_sample(self.inverter.get_grid_power())
+
+    def _complete_energy(self, energy_data):
+        """Fill in the energy counters that the backend does not read."""
+        if self.energy_integrator is None:
+            return energy_data
+        counters = {}
+        if not self.inverter.HAS_TODAY_ENERGY:
+            counters["Today"] = round(self.energy_integrator.today, 3)
+        if not self.inverter.HAS_TOTAL_ENERGY:
+            counters["Total"] = round(self.energy_integrator.total, 3)
+        return replace(energy_data, **counters)
 
     def _on_command_received(self, command: WorkModeCommand):
         """Handle the WORKMODE command received from the MQTT broker."""
         _LOGGER.debug("Received WORKMODE command: %s", command)
-        # Dispatch the command to Home Assistant using async_dispatcher_send
+        # Dispatch the command to Home Assistant on the event loop
         self.hass.loop.call_soon_threadsafe(
-            async_dispatcher_send,
-            self.hass,
-            f"{DOMAIN}_workmode_update_{self.inverter_id}",
-            command,
+            self._async_dispatch_command, command, time.monotonic(), time.time()
+        )
+
+    @callback
+    def _async_dispatch_command(self, command: WorkModeCommand, received_at, received):
+        """Dispatch a WORKMODE command and record how long it took to handle."""
+        applied = self.inverter.handle_command(command)
+        async_dispatcher_send(
+            self.hass, f"{DOMAIN}_workmode_update_{self.inverter_id}", command
         )
+        if isinstance(self.inverter, InverterStack):
+            async_dispatcher_send(
+                self.hass,
+                f"{DOMAIN}_workmode_units_{self.inverter_id}",
+                self.inverter.split_command(command),
+            )
+        latency = time.monotonic() - received_at
+        self.metrics.command_latency.observe(latency)
+        if applied:
+            outcome = OUTCOME_APPLIED
+        elif self.peak_shaving and self.peak_shaving.active:
+            outcome = OUTCOME_PEAK_SHAVING
+        else:
+            outcome = OUTCOME_DISPATCHED
+        self.command_history.async_add(command, received, latency, outcome)
+        self.live_stream.async_publish("command", {"command": command.to_dict()})
 
     def _on_connection_status_changed(self, connected: bool):
         """Handle MQTT connection status changes."""
         _LOGGER.debug("MQTT connection status changed: %s", connected)
+        # Messages in flight on the old connection will never be confirmed
+        self.publish_queue.reset_in_flight()
         # Dispatch the connection status to Home Assistant using async_dispatcher_send
         self.hass.loop.call_soon_threadsafe(
             async_dispatcher_send,
@@ -107,35 +336,162 @@ class MQTTClient:
             f"{DOMAIN}_connection_status_{self.inverter_id}",
             connected,
         )
+        self.hass.loop.call_soon_threadsafe(
+            self._connected_event.set if connected else self._connected_event.clear
+        )
+        if connected:
+            if self._has_connected:
+                self.reconnects += 1
+                self._reconnected_at = time.monotonic()
+            self._has_connected = True
+            # Publish a fresh snapshot and anything buffered right away
+            self.hass.loop.call_soon_threadsafe(
+                self.supervisor.create_task, self.async_publish_now(), "publish now"
+            )
+        elif self.qilowatt_client:
+            # Jitter the start of paho's exponential backoff so that many
+            # clients do not hammer the broker in lockstep after an outage
+            # pylint: disable-next=protected-access
+            self.qilowatt_client._client.reconnect_delay_set(
+                min_delay=RECONNECT_MIN_DELAY * random.uniform(1, 2),
+                max_delay=RECONNECT_MAX_DELAY,
+            )
+
+    async def async_publish_now(self):
+        """Collect a fresh snapshot and publish it without waiting for a tick."""
+        if not self._ready or not self.breaker.allow_request():
+            # The data loop publishes the first sample once sources are ready,
+            # and retries on its own schedule while the breaker is open
+            return
+        try:
+            await self.hass.async_add_executor_job(self.update_data, True)
+        except Exception as e:  # pylint: disable=broad-except
+            self.breaker.record_failure(e)
+        else:
+            self.breaker.record_success()
 
     async def update_data_loop(self):
-        """Loop to periodically fetch data and send it to MQTT."""
-        # Initial delay to give MQTT client time to establish connection
-        await asyncio.sleep(5)
+        """Loop to fetch ENERGY and METRICS on their own schedules and send them to MQTT."""
+        await self.async_wait_ready()
 
+        next_energy = next_metrics = time.monotonic()
         while True:
+            now = time.monotonic()
+            energy_due = now >= next_energy or self._energy_data is None
+            metrics_due = now >= next_metrics or self._metrics_data is None
+            if not self.breaker.allow_request():
+                # Skip reads while a failing backend is given time to recover
+                self.metrics.cycles_skipped["breaker_open"] += 1
+                await asyncio.sleep(self.breaker.retry_in)
+                continue
             try:
-                await self.hass.async_add_executor_job(self.update_data)
+                await self.hass.async_add_executor_job(
+                    self.update_data,
+                    self.startup_latency is None,
+                    energy_due,
+                    metrics_due,
+                )
             except Exception as e:  # pylint: disable=broad-except
-                _LOGGER.error("Error updating data: %s", e)
-            await asyncio.sleep(10)  # Adjust the interval as needed
+                self.breaker.record_failure(e)
+            else:
+                self.breaker.record_success()
+            # Slow down collection while the outbound link is congested
+            backoff = self.publish_queue.backoff_factor
+            if energy_due:
+                next_energy = now + self.energy_interval * backoff
+            if metrics_due:
+                # METRICS move slowly, they are the first to be shed
+                shed = LOAD_SHED_METRICS_FACTOR if self.load_shedder.reduce_metrics else 1
+                next_metrics = now + self.metrics_interval * backoff * shed
+            await asyncio.sleep(max(min(next_energy, next_metrics) - time.monotonic(), 0))
+
+    async def async_wait_ready(self):
+        """Wait until the broker is connected and the source entities report values."""
+        try:
+            async with asyncio.timeout(STARTUP_TIMEOUT):
+                await self._connected_event.wait()
+                while not self.inverter.is_ready():
+                    await asyncio.sleep(READINESS_POLL_INTERVAL)
+        except TimeoutError:
+            _LOGGER.warning(
+                "Inverter data or MQTT connection not ready after %s seconds, "
+                "starting anyway",
+                STARTUP_TIMEOUT,
+            )
+        self._ready = True
 
-    def update_data(self):
-        """Fetch data from inverter and send to MQTT."""
+    def update_data(self, publish=False, energy=True, metrics=True):
+        """Fetch data from inverter and send to MQTT.
+
+        Only the payload groups selected by `energy` and `metrics` are
+        collected; the other one keeps its last value. The SENSOR payload is
+        published immediately when `publish` is set or the trigger policy of a
+        collected group asks for it, else on the device's next timer tick.
+        """
         # Skip if client doesn't exist
         if not self.qilowatt_client:
             _LOGGER.debug("MQTT client not initialized, skipping data update")
+            self.metrics.cycles_skipped["not_initialized"] += 1
             return
 
         # Check connection status using the connected property
         if not self.qilowatt_client.connected:
             _LOGGER.debug("MQTT client not connected, skipping data update")
+            self.metrics.cycles_skipped["disconnected"] += 1
             return
+        started = time.perf_counter()
+
+        # Fetch the latest data of the due groups from the inverter. Under
+        # heavy event loop lag, skip the shadow comparison and the filters.
+        minimal = self.load_shedder.minimal
+        collector = self.inverter if minimal else self.shadow or self.inverter
+        filtered = self.filter_enabled and not minimal
+        if energy or self._energy_data is None:
+            energy_data = self._complete_energy(collector.get_energy_data())
+            if filtered:
+                energy_data = self.energy_filter.apply(energy_data)
+            publish |= self._triggered(self.energy_trigger, energy_data, self._energy_data)
+            self._energy_data = energy_data
+        if metrics or self._metrics_data is None:
+            metrics_data = collector.get_metrics_data()
+            if filtered:
+                metrics_data = self.metrics_filter.apply(metrics_data)
+            publish |= self._triggered(self.metrics_trigger, metrics_data, self._metrics_data)
+            self._metrics_data = metrics_data
+
+        # Set data in the qilowatt client, both payloads in one batch. An
+        # unchanged METRICS object reuses its cached serialized section.
+        self.qw_device.set_sensor_data(self._energy_data, self._metrics_data)
+        if publish:
+            self.qw_device.publish_sensor_data()
+
+        if self.startup_latency is None and self._started_at is not None:
+            self.startup_latency = time.monotonic() - self._started_at
+            _LOGGER.info(
+                "First valid sample published %.1f seconds after start",
+                self.startup_latency,
+            )
+
+        # Retry anything still held back by the outbound queue
+        self.publish_queue.flush()
+        if self.publish_queue.congested:
+            _LOGGER.debug(
+                "Outbound link congested: %s pending, %s coalesced, %s dropped",
+                self.publish_queue.depth,
+                self.publish_queue.coalesced,
+                self.publish_queue.dropped_overflow + self.publish_queue.dropped_stale,
+            )
 
-        # Fetch latest data from the inverter
-        energy_data = self.inverter.get_energy_data()
-        metrics_data = self.inverter.get_metrics_data()
+        self.metrics.cycles += 1
+        self.metrics.cycle_duration.observe(time.perf_counter() - started)
 
-        # Set data in the qilowatt client
-        self.qw_device.set_energy_data(energy_data)
-        self.qw_device.set_metrics_data(metrics_data)
+    def _triggered(self, trigger, data, previous):
+        """Return True if a freshly collected payload group should be published now."""
+        if trigger == TRIGGER_INTERVAL:
+            return True
+        if trigger != TRIGGER_CHANGE:
+            return False
+        if data != previous:
+            return True
+        self.metrics.suppressed += 1
+        return False
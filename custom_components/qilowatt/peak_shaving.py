@@ -0,0 +1,173 @@
+"""Local peak shaving controller for Qilowatt integration."""
+
+import asyncio
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from qilowatt import WorkModeCommand
+
+from .const import (
+    CONF_PEAK_SHAVING_ENTITY,
+    CONF_PEAK_SHAVING_FALLBACK,
+    CONF_PEAK_SHAVING_GAIN,
+    CONF_PEAK_SHAVING_RATE,
+    CONF_PEAK_SHAVING_STALE_AFTER,
+    DOMAIN,
+    PEAK_SHAVING_DEADBAND,
+    PEAK_SHAVING_DEFAULT_GAIN,
+    PEAK_SHAVING_DEFAULT_RATE,
+    PEAK_SHAVING_DEFAULT_STALE_AFTER,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PeakShavingController:
+    """Hold the WORKMODE PeakShaving threshold locally.
+
+    While a WORKMODE command carries a PeakShaving threshold, every grid power
+    update from the backend adjusts a number entity, e.g. the inverter's
+    battery discharge power limit, by `gain` times the grid import above (or
+    below) the threshold. The limit moves at most `rate` W per second and is
+    kept within the entity's min and max. When the source has not reported
+    the grid power for `stale_after` seconds, or the threshold is cleared,
+    the limit goes back to the fallback value: the configured one, or else
+    the value the entity had before the controller took over.
+    """
+
+    def __init__(self, hass: HomeAssistant, inverter, config_entry) -> None:
+        """Initialize the controller."""
+        self.hass = hass
+        self.inverter = inverter
+        self.inverter_id = config_entry.data["inverter_id"]
+        options = config_entry.options
+        self.entity_id = options[CONF_PEAK_SHAVING_ENTITY]
+        self.gain = options.get(CONF_PEAK_SHAVING_GAIN, PEAK_SHAVING_DEFAULT_GAIN)
+        self.rate = options.get(CONF_PEAK_SHAVING_RATE, PEAK_SHAVING_DEFAULT_RATE)
+        self.fallback = options.get(CONF_PEAK_SHAVING_FALLBACK)
+        self.stale_after = options.get(
+            CONF_PEAK_SHAVING_STALE_AFTER, PEAK_SHAVING_DEFAULT_STALE_AFTER
+        )
+
+        self.threshold = None  # Active while set
+        self.limit = None  # Last limit sent to the entity
+        self.stale = False
+        self.adjustments = 0
+        self._restore = None
+        self._last_sample = None
+        self._last_step = None
+        self._supervisor = None
+
+    @property
+    def active(self) -> bool:
+        """Return True while a threshold is being held."""
+        return self.threshold is not None
+
+    async def async_start(self, supervisor):
+        """Start following WORKMODE commands and grid power updates."""
+        self._supervisor = supervisor
+        supervisor.async_on_shutdown(
+            async_dispatcher_connect(
+                self.hass,
+                f"{DOMAIN}_workmode_update_{self.inverter_id}",
+                self._handle_workmode_update,
+            )
+        )
+        supervisor.async_on_shutdown(
+            self.inverter.async_track_grid_power(self._handle_grid_power)
+        )
+        supervisor.create_task(self._watchdog(), "peak shaving watchdog")
+
+    def _entity_bounds(self):
+        """Return the current value, min and max of the limit entity."""
+        state = self.hass.states.get(self.entity_id)
+        if state is None:
+            return None, None, None
+        try:
+            value = float(state.state)
+        except ValueError:
+            value = None
+        return value, state.attributes.get("min"), state.attributes.get("max")
+
+    @callback
+    def _handle_workmode_update(self, command: WorkModeCommand):
+        threshold = getattr(command, "PeakShaving", None) or None
+        if threshold == self.threshold:
+            return
+        if threshold is not None and self.threshold is None:
+            value, _, _ = self._entity_bounds()
+            self._restore = self.fallback if self.fallback is not None else value
+            self.limit = value
+            # The first grid power update is due within the stale timeout
+            self._last_sample = time.monotonic()
+            self._last_step = None
+            _LOGGER.info("Holding grid import below %s W with %s", threshold, self.entity_id)
+        elif threshold is None:
+            _LOGGER.info("Peak shaving cleared, restoring %s", self.entity_id)
+            self._set_limit(self._restore)
+        self.threshold = threshold
+
+    @callback
+    def _handle_grid_power(self, event=None):
+        if self.threshold is None:
+            return
+        now = time.monotonic()
+        self._last_sample = now
+        if self.stale:
+            _LOGGER.info("Grid power updates resumed, peak shaving control resumed")
+            self.stale = False
+
+        value, minimum, maximum = self._entity_bounds()
+        current = self.limit if self.limit is not None else value
+        if current is None:
+            return
+        # Proportional step on the error, limited in rate and to the entity range
+        dt = now - self._last_step if self._last_step is not None else 1.0
+        step = self.gain * (self.inverter.get_grid_power() - self.threshold)
+        max_step = self.rate * dt
+        target = current + max(-max_step, min(step, max_step))
+        if minimum is not None:
+            target = max(target, minimum)
+        if maximum is not None:
+            target = min(target, maximum)
+        self._last_step = now
+        if abs(target - current) >= PEAK_SHAVING_DEADBAND:
+            self._set_limit(target)
+
+    @callback
+    def _set_limit(self, value):
+        if value is None or self._supervisor is None:
+            return
+        self.limit = value
+        self.adjustments += 1
+        self._supervisor.create_task(
+            self.hass.services.async_call(
+                "number",
+                "set_value",
+                {"entity_id": self.entity_id, "value": round(value)},
+            ),
+            "peak shaving set limit",
+        )
+
+    async def _watchdog(self):
+        """Fall back when the grid power is no longer reported while a threshold is held."""
+        while True:
+            await asyncio.sleep(1)
+            if self.threshold is None or self.stale:
+                continue
+            if time.monotonic() - self._last_sample <= self.stale_after:
+                continue
+            # Unchanged values fire no event, but the source may still report them
+            age = self.inverter.get_grid_power_age()
+            if age is not None and age <= self.stale_after:
+                continue
+            _LOGGER.warning(
+                "No grid power reported for %s seconds, setting %s to %s",
+                self.stale_after,
+                self.entity_id,
+                self._restore,
+            )
+            self.stale = True
+            self._set_limit(self._restore)
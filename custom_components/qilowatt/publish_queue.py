@@ -0,0 +1,138 @@
+"""Bounded outbound publish stage for Qilowatt integration."""
+
+import logging
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper bound for the collection interval multiplier while the link is congested
+MAX_BACKOFF_FACTOR = 8
+
+
+class PublishQueue:
+    """Latest-wins outbound queue between the Qilowatt device and the broker.
+
+    At most one payload is held per topic. A newer payload for a topic replaces
+    the pending one, and a topic is only handed to the MQTT client once the
+    previous message on that topic has left the socket, so a slow link never
+    grows memory and never delivers old samples ahead of fresh ones.
+    """
+
+    def __init__(self, send, max_topics=8, max_age=60.0) -> None:
+        """Initialize the queue.
+
+        `send` is called with (topic, data) and returns the paho message info
+        of the publish, or None if the message could not be handed over.
+        """
+        self._send = send
+        self._max_topics = max_topics
+        self._max_age = max_age
+        self._pending = {}  # topic -> (enqueued_at, data)
+        self._in_flight = {}  # topic -> paho MQTTMessageInfo
+        self._lock = threading.Lock()
+        self._congestion = 0
+
+        self.enqueued = 0
+        self.published = 0
+        self.coalesced = 0
+        self.dropped_overflow = 0
+        self.dropped_stale = 0
+
+    @property
+    def depth(self) -> int:
+        """Return the number of topics waiting to be published."""
+        return len(self._pending)
+
+    @property
+    def congested(self) -> bool:
+        """Return True if the last flush found topics blocked behind the link."""
+        return self._congestion > 0
+
+    @property
+    def backoff_factor(self) -> int:
+        """Return the multiplier to apply to the collection interval."""
+        return min(2**self._congestion, MAX_BACKOFF_FACTOR)
+
+    def put(self, topic, data):
+        """Queue a payload for a topic, replacing any pending one."""
+        with self._lock:
+            if topic in self._pending:
+                self.coalesced += 1
+            elif len(self._pending) >= self._max_topics:
+                oldest = min(self._pending, key=lambda t: self._pending[t][0])
+                del self._pending[oldest]
+                self.dropped_overflow += 1
+                _LOGGER.debug("Publish queue full, dropped pending %s", oldest)
+            self._pending[topic] = (time.monotonic(), data)
+            self.enqueued += 1
+        self.flush()
+
+    def flush(self):
+        """Hand every pending topic whose link slot is free to the MQTT client."""
+        now = time.monotonic()
+        ready = []
+        blocked = False
+        with self._lock:
+            for topic, (enqueued_at, data) in list(self._pending.items()):
+                if now - enqueued_at > self._max_age:
+                    del self._pending[topic]
+                    self.dropped_stale += 1
+                    _LOGGER.debug("Dropped stale payload for %s", topic)
+                    continue
+                info = self._in_flight.get(topic)
+                if info is not None and not _settled(info):
+                    blocked = True
+                    continue
+                del self._pending[topic]
+                ready.append((topic, enqueued_at, data))
+
+            if blocked:
+                self._congestion = min(self._congestion + 1, 3)
+            else:
+                self._congestion = 0
+
+        for topic, enqueued_at, data in ready:
+            info = self._send(topic, data)
+            with self._lock:
+                if info is None:
+                    # Not handed over, keep it unless a newer payload arrived
+                    self._pending.setdefault(topic, (enqueued_at, data))
+                    continue
+                self._in_flight[topic] = info
+                self.published += 1
+
+    def reset_in_flight(self):
+        """Stop waiting for the messages in flight, e.g. after a connection change.
+
+        Messages on a lost connection are never published, and the link slot
+        of their topic must not stay blocked waiting for them.
+        """
+        with self._lock:
+            self._in_flight.clear()
+            self._congestion = 0
+
+    def clear(self):
+        """Drop everything that is pending or tracked as in flight."""
+        with self._lock:
+            self._pending.clear()
+            self._in_flight.clear()
+            self._congestion = 0
+
+
+def _settled(info):
+    """Return True once a message has left the socket or can never do so.
+
+    paho sets a failure `rc`, e.g. MQTT_ERR_CONN_LOST for a QoS 0 message
+    that was unsent when the connection dropped, and from then on
+    `is_published()` raises instead of answering. MQTT_ERR_AGAIN only means
+    the message is queued for the socket.
+    """
+    if info.rc not in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_AGAIN):
+        return True
+    try:
+        return info.is_published()
+    except (RuntimeError, ValueError):
+        return True
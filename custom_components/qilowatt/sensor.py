@@ -1,13 +1,20 @@
 # custom_components/qilowatt/sensor.py
 
 import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
 from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo, async_generate_entity_id
 from qilowatt import WorkModeCommand
 
+from .circuit_breaker import STATES as BREAKER_STATES
+from .load_shedder import LEVELS as LOAD_SHED_LEVELS
 from .const import CONF_INVERTER_ID, DATA_CLIENT, DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
@@ -66,6 +73,95 @@ WORKMODE_FIELDS = {
     },
 }
 
+
+@dataclass(frozen=True, kw_only=True)
+class DiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Describes a diagnostic sensor read from the MQTT client wrapper."""
+
+    value_fn: Callable[[Any], Any]
+
+
+DIAGNOSTIC_SENSORS = (
+    DiagnosticSensorEntityDescription(
+        key="background_tasks",
+        name="Background Tasks",
+        state_class="measurement",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda client: client.supervisor.task_count,
+    ),
+    DiagnosticSensorEntityDescription(
+        key="circuit_breaker",
+        name="Circuit Breaker",
+        device_class="enum",
+        options=BREAKER_STATES,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda client: client.breaker.state,
+    ),
+    DiagnosticSensorEntityDescription(
+        key="read_failures",
+        name="Read Failures",
+        state_class="total_increasing",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda client: client.breaker.total_failures,
+    ),
+    DiagnosticSensorEntityDescription(
+        key="filtered_values",
+        name="Filtered Values",
+        state_class="total_increasing",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda client: client.energy_filter.rejected
+        + client.metrics_filter.rejected,
+    ),
+    DiagnosticSensorEntityDescription(
+        key="filter_holds_expired",
+        name="Filter Holds Expired",
+        state_class="total_increasing",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda client: client.energy_filter.expired
+        + client.metrics_filter.expired,
+    ),
+    DiagnosticSensorEntityDescription(
+        key="peak_shaving_limit",
+        name="Peak Shaving Limit",
+        native_unit_of_measurement="W",
+        device_class="power",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda client: client.peak_shaving and client.peak_shaving.limit,
+    ),
+    DiagnosticSensorEntityDescription(
+        key="shadow_mismatches",
+        name="Shadow Mismatches",
+        state_class="total_increasing",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda client: client.shadow
+        and sum(client.shadow.mismatches.values()),
+    ),
+    DiagnosticSensorEntityDescription(
+        key="shadow_speedup",
+        name="Shadow Speedup",
+        state_class="measurement",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda client: client.shadow and client.shadow.speedup,
+    ),
+    DiagnosticSensorEntityDescription(
+        key="load_shedding",
+        name="Load Shedding",
+        device_class="enum",
+        options=LOAD_SHED_LEVELS,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda client: client.load_shedder.state,
+    ),
+    DiagnosticSensorEntityDescription(
+        key="event_loop_lag",
+        name="Event Loop Lag",
+        native_unit_of_measurement="ms",
+        device_class="duration",
+        state_class="measurement",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda client: round(client.load_shedder.lag * 1000, 1),
+    ),
+)
+
 async def async_setup_entry(
     hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities
 ):
@@ -92,6 +188,13 @@ async def async_setup_entry(
 
     async_add_entities(workmode_sensors, update_before_add=True)
 
+    # Add diagnostic sensors for the integration itself
+    client = hass.data[DOMAIN][config_entry.entry_id][DATA_CLIENT]
+    async_add_entities(
+        DiagnosticSensor(hass, client, description, config_entry)
+        for description in DIAGNOSTIC_SENSORS
+    )
+
 class WorkModeSensor(SensorEntity):
     """Sensor for WORKMODE command fields."""
 
@@ -103,6 +206,7 @@ class WorkModeSensor(SensorEntity):
         self._name = entity_description.name
         self._unique_id = f"{inverter_id}_{entity_description.key}"
         self._state = None
+        self._unit_values = {}
         self.entity_id = async_generate_entity_id(
             ENTITY_ID_FORMAT, f"qw_{entity_description.key}", hass.states.async_entity_ids()
         )
@@ -148,6 +252,11 @@ class WorkModeSensor(SensorEntity):
         """Return the state class of the sensor."""
         return self.entity_description.state_class
 
+    @property
+    def extra_state_attributes(self):
+        """Return the share of the command for each unit of a parallel stack."""
+        return self._unit_values
+
     async def async_added_to_hass(self):
         """Register dispatcher to listen for WORKMODE updates."""
         self.async_on_remove(
@@ -157,6 +266,13 @@ class WorkModeSensor(SensorEntity):
                 self._handle_workmode_update,
             )
         )
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                f"{DOMAIN}_workmode_units_{self._inverter_id}",
+                self._handle_workmode_units_update,
+            )
+        )
 
     async def _handle_workmode_update(self, command: WorkModeCommand):
         """Handle WORKMODE command updates."""
@@ -164,3 +280,51 @@ class WorkModeSensor(SensorEntity):
         value = getattr(command, self.entity_description.key, None)
         self._state = value
         self.async_schedule_update_ha_state()
+
+    async def _handle_workmode_units_update(self, commands):
+        """Handle WORKMODE commands split over the units of a stack."""
+        self._unit_values = {
+            unit: getattr(command, self.entity_description.key, None)
+            for unit, command in commands.items()
+        }
+        self.async_schedule_update_ha_state()
+
+
+class DiagnosticSensor(SensorEntity):
+    """Sensor exposing the health of the integration's own background work."""
+
+    entity_description: DiagnosticSensorEntityDescription
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client,
+        entity_description: DiagnosticSensorEntityDescription,
+        entry,
+    ) -> None:
+        self.hass = hass
+        self._client = client
+        self.entity_description = entity_description
+        self.entry = entry
+        self._attr_name = entity_description.name
+        self._attr_unique_id = (
+            f"{entry.data[CONF_INVERTER_ID]}_{entity_description.key}"
+        )
+        self.entity_id = async_generate_entity_id(
+            ENTITY_ID_FORMAT, f"qw_{entity_description.key}", hass.states.async_entity_ids()
+        )
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device information for the sensor."""
+        return DeviceInfo(
+            identifiers={(DOMAIN, self.entry.entry_id)},
+            name=self.entry.title,
+            manufacturer="Qilowatt",
+            model=self.entry.data["inverter_model"],
+        )
+
+    @property
+    def native_value(self):
+        """Return the current value, polled from the client."""
+        return self.entity_description.value_fn(self._client)
@@ -0,0 +1,69 @@
+"""Payload serialization for Qilowatt integration."""
+
+import json
+from json.encoder import encode_basestring_ascii
+
+
+def _compile_template(keys) -> str:
+    """Build a format string for a top-level payload with the given keys."""
+    fields = ", ".join(
+        encode_basestring_ascii(str(key)).replace("%", "%%") + ": %s" for key in keys
+    )
+    return "{" + fields + "}"
+
+
+class PayloadSerializer:
+    """Serialize device payloads to the JSON the Qilowatt server accepts.
+
+    Output is byte-identical to `json.dumps` when no precision is configured.
+    A format template is compiled once per payload shape, and sections such as
+    ENERGY, METRICS and VERSION are only re-encoded when the device hands over
+    a new object for them, so unchanged sections cost nothing per publish.
+    """
+
+    def __init__(self, precision=None) -> None:
+        """Initialize the serializer with an optional float precision."""
+        self._precision = precision
+        self._templates = {}
+        self._sections = {}  # key -> (source object, encoded JSON)
+
+    def dumps(self, data) -> str:
+        """Return the JSON encoding of a payload."""
+        if not isinstance(data, dict):
+            return json.dumps(data)
+
+        keys = tuple(data)
+        template = self._templates.get(keys)
+        if template is None:
+            template = self._templates[keys] = _compile_template(keys)
+        return template % tuple([self._encode(key, data[key]) for key in keys])
+
+    def _encode(self, key, value) -> str:
+        """Encode one top-level value, reusing the cached encoding if possible."""
+        if isinstance(value, str):
+            return encode_basestring_ascii(value)
+        if not isinstance(value, dict):
+            return json.dumps(self._quantize(value))
+
+        cached = self._sections.get(key)
+        if cached is not None and cached[0] is value:
+            return cached[1]
+        encoded = json.dumps({k: self._quantize(v) for k, v in value.items()})
+        # Keep a reference to the source so its identity cannot be reused
+        self._sections[key] = (value, encoded)
+        return encoded
+
+    def _quantize(self, value):
+        """Round floats, including floats inside lists, to the precision."""
+        precision = self._precision
+        if precision is None:
+            return value
+        if value.__class__ is float:
+            return round(value, precision)
+        if value.__class__ is list:
+            return [round(x, precision) if x.__class__ is float else x for x in value]
+        return value
+
+    def clear(self):
+        """Forget cached section encodings."""
+        self._sections.clear()
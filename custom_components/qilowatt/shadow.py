@@ -0,0 +1,143 @@
+"""Shadow mode comparison of two collectors for Qilowatt integration."""
+
+import logging
+import math
+import time
+from collections import Counter
+from dataclasses import fields
+
+from .const import SHADOW_ABS_TOLERANCE, SHADOW_REL_TOLERANCE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StateSnapshot:
+    """State machine view that keeps the first state read of every entity.
+
+    Both collectors of a cycle read through the same snapshot, so they see
+    identical inputs even when an entity updates between them.
+    """
+
+    def __init__(self, states) -> None:
+        """Initialize an empty snapshot of `states`."""
+        self._states = states
+        self._taken = {}
+
+    def get(self, entity_id):
+        """Return the state of an entity as first read in this snapshot."""
+        try:
+            return self._taken[entity_id]
+        except KeyError:
+            state = self._taken[entity_id] = self._states.get(entity_id)
+            return state
+
+    def clear(self):
+        """Start a new snapshot."""
+        self._taken.clear()
+
+
+class ShadowCollector:
+    """Run an alternate collector alongside the active one and compare them.
+
+    Every ENERGY and METRICS collection runs the primary and the shadow on
+    one state snapshot, in alternating order, as the first to run also fills
+    the snapshot. The results are compared field by field, numbers within
+    SHADOW_ABS_TOLERANCE or SHADOW_REL_TOLERANCE, and the time of both is
+    accumulated. Only the primary result is returned; errors of the shadow
+    are counted and never reach the caller. Only the collecting thread reads
+    the snapshot, so event loop callbacks reading the same inverter, e.g.
+    for peak shaving, keep reading live states.
+    """
+
+    def __init__(self, primary, shadow) -> None:
+        """Initialize the comparison of two inverter instances."""
+        self.primary = primary
+        self.shadow = shadow
+        self._snapshot = StateSnapshot(primary.states)
+
+        self.collections = 0
+        self.comparisons = 0
+        self.mismatches = Counter()  # "GROUP.Field" -> mismatching collections
+        self.shadow_errors = 0
+        self.primary_time = 0.0
+        self.shadow_time = 0.0
+
+    @property
+    def speedup(self):
+        """Return how many times faster the shadow collects than the primary."""
+        if not self.shadow_time:
+            return None
+        return round(self.primary_time / self.shadow_time, 2)
+
+    def get_energy_data(self):
+        """Retrieve ENERGY data from the primary, comparing the shadow."""
+        return self._collect("ENERGY", "get_energy_data")
+
+    def get_metrics_data(self):
+        """Retrieve METRICS data from the primary, comparing the shadow."""
+        return self._collect("METRICS", "get_metrics_data")
+
+    def _collect(self, group, method):
+        self._snapshot.clear()
+        self.primary.use_states(self._snapshot)
+        self.shadow.use_states(self._snapshot)
+        shadow_first = self.collections % 2
+        self.collections += 1
+        try:
+            if shadow_first:
+                shadow_result = self._collect_shadow(method)
+            started = time.perf_counter()
+            result = getattr(self.primary, method)()
+            self.primary_time += time.perf_counter() - started
+            if not shadow_first:
+                shadow_result = self._collect_shadow(method)
+        finally:
+            self.primary.use_states(None)
+            self.shadow.use_states(None)
+
+        if isinstance(shadow_result, Exception):
+            self.shadow_errors += 1
+            _LOGGER.debug("Shadow %s collection failed: %r", group, shadow_result)
+            return result
+
+        self.comparisons += 1
+        for name in _differences(result, shadow_result):
+            key = f"{group}.{name}"
+            if not self.mismatches[key]:
+                _LOGGER.warning(
+                    "Shadow collector differs in %s: %r != %r",
+                    key,
+                    getattr(result, name),
+                    getattr(shadow_result, name),
+                )
+            self.mismatches[key] += 1
+        return result
+
+    def _collect_shadow(self, method):
+        """Return the shadow result, or the exception it raised."""
+        try:
+            started = time.perf_counter()
+            result = getattr(self.shadow, method)()
+            self.shadow_time += time.perf_counter() - started
+        except Exception as e:  # pylint: disable=broad-except
+            return e
+        return result
+
+
+def _differences(primary, shadow):
+    """Return the names of the dataclass fields that differ."""
+    return [
+        field.name
+        for field in fields(primary)
+        if not _equal(getattr(primary, field.name), getattr(shadow, field.name, None))
+    ]
+
+
+def _equal(a, b) -> bool:
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return math.isclose(
+            a, b, rel_tol=SHADOW_REL_TOLERANCE, abs_tol=SHADOW_ABS_TOLERANCE
+        )
+    return a == b
@@ -0,0 +1,67 @@
+"""Background task supervision for Qilowatt integration."""
+
+import asyncio
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TaskSupervisor:
+    """Track the background tasks and listeners of one config entry.
+
+    Everything registered here is cancelled or unsubscribed when the entry
+    is unloaded, so reloads never leave loops running against a stale client.
+    """
+
+    def __init__(self, hass: HomeAssistant, name: str) -> None:
+        """Initialize the supervisor."""
+        self.hass = hass
+        self._name = name
+        self._tasks = set()
+        self._unsubscribers = []
+        self._shutting_down = False
+
+    @property
+    def task_count(self) -> int:
+        """Return the number of live background tasks."""
+        return len(self._tasks)
+
+    @property
+    def listener_count(self) -> int:
+        """Return the number of registered listeners."""
+        return len(self._unsubscribers)
+
+    @callback
+    def create_task(self, coro, name: str) -> asyncio.Task | None:
+        """Start a supervised background task. Must run in the event loop."""
+        if self._shutting_down:
+            coro.close()
+            return None
+        task = self.hass.loop.create_task(coro, name=f"{self._name} {name}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    @callback
+    def async_on_shutdown(self, unsubscribe) -> None:
+        """Register a callback, e.g. a listener unsubscriber, to run on shutdown."""
+        self._unsubscribers.append(unsubscribe)
+
+    async def async_shutdown(self) -> None:
+        """Unsubscribe all listeners and cancel all tasks, waiting for them."""
+        self._shutting_down = True
+        while self._unsubscribers:
+            self._unsubscribers.pop()()
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for task, result in zip(tasks, results):
+            if isinstance(result, Exception) and not isinstance(
+                result, asyncio.CancelledError
+            ):
+                _LOGGER.debug("Task %s ended with %r", task.get_name(), result)
+        _LOGGER.debug("Stopped %s background tasks for %s", len(tasks), self._name)
@@ -0,0 +1,71 @@
+"""Websocket API for Qilowatt integration."""
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_CLIENT, DOMAIN
+
+
+@callback
+def async_setup(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, websocket_subscribe)
+    websocket_api.async_register_command(hass, websocket_command_history)
+
+
+def _get_client(hass: HomeAssistant, connection, msg):
+    """Return the client of the requested entry, or send an error."""
+    client = hass.data.get(DOMAIN, {}).get(msg["entry_id"], {}).get(DATA_CLIENT)
+    if client is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Entry not found or not loaded"
+        )
+    return client
+
+
+@websocket_api.require_admin
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe",
+        vol.Required("entry_id"): str,
+    }
+)
+@callback
+def websocket_subscribe(hass: HomeAssistant, connection, msg) -> None:
+    """Stream the payloads published and the commands received by an entry."""
+    client = _get_client(hass, connection, msg)
+    if client is None:
+        return
+
+    @callback
+    def forward(message):
+        connection.send_message(websocket_api.event_message(msg["id"], message))
+
+    connection.subscriptions[msg["id"]] = client.live_stream.async_subscribe(forward)
+    connection.send_result(msg["id"])
+
+
+@websocket_api.require_admin
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/command_history",
+        vol.Required("entry_id"): str,
+        vol.Optional("limit"): vol.All(int, vol.Range(min=1)),
+    }
+)
+@callback
+def websocket_command_history(hass: HomeAssistant, connection, msg) -> None:
+    """Return the recent WORKMODE commands of an entry and their latency percentiles."""
+    client = _get_client(hass, connection, msg)
+    if client is None:
+        return
+    history = client.command_history
+    connection.send_result(
+        msg["id"],
+        {
+            "commands": history.recent(msg.get("limit")),
+            "latency": history.latency_percentiles(),
+        },
+    )
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Headless Qilowatt collector.
+
+Runs the collection-and-publish pipeline of one or more sites as a
+standalone asyncio service, outside Home Assistant. Each site is a config
+entry of the integration plus the source its backend reads from:
+
+    {
+      "time_zone": "Europe/Tallinn",
+      "sites": {
+        "home": {
+          "title": "Home",
+          "data": {"inverter_model": "Huawei", "inverter_id": "...", ...},
+          "options": {"energy_interval": 5},
+          "source": {"type": "home_assistant",
+                     "url": "ws://homeassistant.local:8123/api/websocket",
+                     "token": "<long-lived access token>"}
+        }
+      }
+    }
+
+`data` and `options` are those of the entry in Home Assistant's
+.storage/core.config_entries. Entity based backends (SolarAssistant,
+Solarman, Sofar, Huawei, ESPHome, Victron) read their pinned entities from a
+remote Home Assistant, so set the entry up there first, then disable it
+there: a loaded entry would publish the site and handle its WORKMODE
+commands too. `time_zone` is where Today's energy rolls over at midnight,
+UTC if unset; it applies to every site of the process. The MQTT topic
+backends need {"type": "mqtt", "host": ..., "port": ..., "username": ...,
+"password": ...}; Modbus, the ESPHome native API and the simulator connect
+to the inverter themselves and need no source:
+
+    python scripts/collector.py sites.json --data-dir /var/lib/qilowatt
+
+--check validates the file and exits. Requires Home Assistant and the
+integration requirements.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from custom_components.qilowatt.headless import (  # noqa: E402
+    HeadlessSite,
+    async_run,
+    get_time_zone,
+)
+
+
+async def main(args):
+    collector = json.loads(Path(args.config).read_text())
+    sites = collector["sites"]
+    time_zone = collector.get("time_zone", "UTC")
+    try:
+        get_time_zone(time_zone)
+        checked = [HeadlessSite(site_id, config, args.data_dir) for site_id, config in sites.items()]
+    except (KeyError, ValueError) as e:
+        print(f"Invalid site: {e}", file=sys.stderr)
+        return 1
+    if args.check:
+        print(f"Time zone {time_zone}")
+        for site in checked:
+            print(f"{site.site_id:16} {site.entry.data['inverter_model']:20} {site.source_type}")
+        return 0
+    task = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, task.cancel)
+    try:
+        await async_run(sites, args.data_dir, time_zone)
+    except asyncio.CancelledError:
+        pass
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("config", help="JSON file with the sites to collect")
+    parser.add_argument(
+        "--data-dir", default="qilowatt-data", help="storage directory, one subdirectory per site"
+    )
+    parser.add_argument("--check", action="store_true", help="validate the sites and exit")
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if arguments.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    sys.exit(asyncio.run(main(arguments)))
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""ESPHome native API stand-in for the Qilowatt ESPHome API backend.
+
+Serves the sensors of the Deye ESP32 example configuration over the
+plaintext ESPHome native API, with plausible values that drift and are
+streamed as state updates, so the backend can be developed and tested
+without a board:
+
+    python scripts/esphome_sim.py --port 6053 --rate 10
+
+Then add the integration with "Deye ESP32 (ESPHome native API)", host
+127.0.0.1, port 6053 and no encryption key. --rate is the number of state
+updates per second of every power and current sensor. --check connects with
+aioesphomeapi, as the backend does, and prints the streamed states.
+Requires aioesphomeapi, which Home Assistant installs with ESPHome.
+"""
+
+import argparse
+import asyncio
+import math
+import time
+
+from aioesphomeapi import APIClient, api_pb2
+
+PREFIX = "deye"
+
+# Sensor names of the example configuration and their nominal values
+SENSORS = {
+    "External CT L1 Power": 420,
+    "External CT L2 Power": -180,
+    "External CT L3 Power": 260,
+    "Grid Voltage L1": 231.0,
+    "Grid Voltage L2": 230.4,
+    "Grid Voltage L3": 232.1,
+    "inverter-frequency": 50.0,
+    "Daily Energy Bought": 12.3,
+    "PV1 Power": 2600,
+    "PV2 Power": 2400,
+    "PV1 Voltage": 400.0,
+    "PV2 Voltage": 395.0,
+    "PV1 Current": 6.5,
+    "PV2 Current": 6.1,
+    "Load power L1": 550,
+    "Load power L2": 700,
+    "Load power L3": 480,
+    "Warning1": 0,
+    "Warning2": 0,
+    "Warning3": 0,
+    "Error1": 0,
+    "Error2": 0,
+    "Error3": 0,
+    "battery capacity": 63,
+    "Battery Rated Capacity": 100,
+    "Battery output power": -1200,
+    "Battery output current": -22.9,
+    "battery voltage": 52.4,
+    "battery temperature": 24.0,
+    "Max Solar Sell Power": 10000,
+    "Heat sink temperature": 38.5,
+}
+DRIFTING = ("power", "current")
+UNITS = {"Battery Rated Capacity": "Ah"}
+
+# Message types of the native API, of the responses sent
+RESPONSES = {
+    api_pb2.HelloResponse: 2,
+    api_pb2.AuthenticationResponse: 4,
+    api_pb2.DisconnectResponse: 6,
+    api_pb2.PingResponse: 8,
+    api_pb2.DeviceInfoResponse: 10,
+    api_pb2.ListEntitiesSensorResponse: 16,
+    api_pb2.ListEntitiesDoneResponse: 19,
+    api_pb2.SensorStateResponse: 25,
+}
+
+
+def object_id(name):
+    """Return the ESPHome object id of an entity name."""
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name.lower())
+
+
+def varint(value):
+    """Encode an unsigned varint."""
+    out = bytearray()
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+async def read_varint(reader):
+    """Decode an unsigned varint from the stream."""
+    value = shift = 0
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value
+        shift += 7
+
+
+class Board:
+    """Sensor table of one simulated board."""
+
+    def __init__(self, rate) -> None:
+        self.rate = rate
+        self.names = {key: f"{PREFIX}-{name}" for key, name in enumerate(SENSORS, 1)}
+        self.states = {}
+        self.subscribers = set()
+        self.update()
+
+    def update(self):
+        """Recompute every sensor, drifting powers and currents over time."""
+        phase = time.monotonic() / 30
+        for key, name in enumerate(SENSORS, 1):
+            value = SENSORS[name]
+            if any(part in name.lower() for part in DRIFTING):
+                value *= 1 + 0.2 * math.sin(phase + key)
+            self.states[key] = value
+
+    def send(self, writer, message):
+        data = message.SerializeToString()
+        writer.write(b"\0" + varint(len(data)) + varint(RESPONSES[type(message)]) + data)
+
+    def send_states(self, writer, drifting_only=False):
+        for key, value in self.states.items():
+            if drifting_only and not any(part in self.names[key].lower() for part in DRIFTING):
+                continue
+            self.send(writer, api_pb2.SensorStateResponse(key=key, state=value))
+
+    def handle(self, writer, message_type):
+        """Answer one request, ignoring its fields. Returns False once the client disconnects."""
+        if message_type == 1:
+            self.send(
+                writer,
+                api_pb2.HelloResponse(
+                    api_version_major=1, api_version_minor=10, server_info="esphome_sim", name=PREFIX
+                ),
+            )
+        elif message_type == 3:
+            self.send(writer, api_pb2.AuthenticationResponse())
+        elif message_type == 5:
+            self.send(writer, api_pb2.DisconnectResponse())
+            return False
+        elif message_type == 7:
+            self.send(writer, api_pb2.PingResponse())
+        elif message_type == 9:
+            self.send(
+                writer,
+                api_pb2.DeviceInfoResponse(name=PREFIX, model="esp32dev", esphome_version="2025.9.0"),
+            )
+        elif message_type == 11:
+            for key, name in self.names.items():
+                self.send(
+                    writer,
+                    api_pb2.ListEntitiesSensorResponse(
+                        object_id=object_id(name),
+                        key=key,
+                        name=name,
+                        accuracy_decimals=2,
+                        unit_of_measurement=UNITS.get(name.removeprefix(f"{PREFIX}-"), ""),
+                    ),
+                )
+            self.send(writer, api_pb2.ListEntitiesDoneResponse())
+        elif message_type == 20:
+            self.send_states(writer)
+            self.subscribers.add(writer)
+        return True
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                if (await reader.readexactly(1)) != b"\0":
+                    break  # Encrypted or not the native API
+                length = await read_varint(reader)
+                message_type = await read_varint(reader)
+                await reader.readexactly(length)
+                if not self.handle(writer, message_type):
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            writer.close()
+
+    async def stream(self):
+        """Send the drifting sensors to every subscriber at the configured rate."""
+        while True:
+            await asyncio.sleep(1 / self.rate)
+            self.update()
+            for writer in list(self.subscribers):
+                self.send_states(writer, drifting_only=True)
+
+
+async def check(args):
+    """Stream the states for two seconds through aioesphomeapi."""
+    client = APIClient(args.host, args.port, None)
+    started = time.perf_counter()
+    await client.connect(login=True)
+    entities, _ = await client.list_entities_services()
+    names = {entity.key: entity.name for entity in entities}
+    states = {}
+    updates = 0
+
+    def on_state(state):
+        nonlocal updates
+        states[state.key] = state.state
+        updates += 1
+
+    client.subscribe_states(on_state)
+    while len(states) < len(names):
+        await asyncio.sleep(0.01)
+    first = time.perf_counter() - started
+    await asyncio.sleep(2)
+    await client.disconnect()
+    for key, name in names.items():
+        print(f"{name:32} {states[key]:10.2f}")
+    print(f"{len(names)} sensors, full table after {first * 1000:.1f} ms, {updates / 2:.0f} states/s")
+
+
+async def main(args):
+    board = Board(args.rate)
+    server = await asyncio.start_server(board.serve_client, args.host, args.port)
+    print(f"Simulating ESPHome board {PREFIX} on {args.host}:{args.port}")
+    async with server:
+        stream = asyncio.create_task(board.stream())
+        if args.check:
+            await check(args)
+            stream.cancel()
+            return
+        await stream
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6053)
+    parser.add_argument("--rate", type=float, default=1, help="state updates per second")
+    parser.add_argument("--check", action="store_true", help="stream for two seconds and exit")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""Load test for the Qilowatt MQTT publish path.
+
+Spins up N simulated Qilowatt entries, each wired the same way as the
+integration's MQTTClient (QilowattInverterDevice -> PublishQueue ->
+PayloadSerializer -> QilowattMQTTClient), against a local broker. Entries
+publish SENSOR payloads at a configurable rate while a stand-in server
+injects WORKMODE commands, and the run reports publish throughput, one-way
+command latency (from the server's publish to the entry's command
+callback), CPU and memory per entry for each entry count.
+
+Without --host an amqtt broker is started in a child process, so the CPU
+figures only cover the client side. To use a container broker instead:
+
+    docker run --rm -p 1883:1883 eclipse-mosquitto:2 \
+        mosquitto -c /mosquitto-no-auth.conf
+    python scripts/loadtest.py --host 127.0.0.1 --entries 1 10 50
+
+Requires the integration requirements (qilowatt, paho-mqtt) and, for the
+built-in broker, amqtt.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import paho.mqtt.client as mqtt
+from qilowatt import EnergyData, MetricsData, QilowattMQTTClient
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "qilowatt"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+from device import QilowattInverterDevice  # noqa: E402
+from publish_queue import PublishQueue  # noqa: E402
+from serializer import PayloadSerializer  # noqa: E402
+
+MODES = ("normal", "buy", "sell", "savebattery", "pvsell", "limitexport")
+
+
+def _run_broker(port, ready):
+    """Run an amqtt broker until the process is terminated."""
+    from amqtt.broker import Broker
+
+    async def main():
+        broker = Broker(
+            {
+                "listeners": {"default": {"type": "tcp", "bind": f"127.0.0.1:{port}"}},
+                "plugins": {
+                    "amqtt.plugins.authentication.AnonymousAuthPlugin": {
+                        "allow_anonymous": True
+                    }
+                },
+            }
+        )
+        await broker.start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def _rss_bytes():
+    """Return the current resident set size of this process."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak RSS, in KiB on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _percentile(values, pct):
+    """Return the pct-th percentile of values, or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class SimulatedEntry:
+    """One simulated config entry with its own broker session."""
+
+    def __init__(self, index, host, port, command_latencies, seed):
+        self.inverter_id = f"LOADTEST{index:05d}"
+        self.random = random.Random(seed + index)
+        self.command_latencies = command_latencies
+
+        self.device = QilowattInverterDevice(device_id=self.inverter_id)
+        self.serializer = PayloadSerializer()
+        self.queue = PublishQueue(self._send_payload)
+        self.client = QilowattMQTTClient(
+            mqtt_username="loadtest",
+            mqtt_password="loadtest",
+            device=self.device,
+            host=host,
+            port=port,
+            tls=False,
+        )
+        self.device.set_publish_callback(self.queue.put)
+        self.device.set_command_callback(self._on_command_received)
+
+    def _send_payload(self, topic, data):
+        """Publish a payload from the queue, as MQTTClient does."""
+        if not self.client.connected:
+            return None
+        # pylint: disable-next=protected-access
+        result = self.client._client.publish(topic, self.serializer.dumps(data))
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
+            return None
+        return result
+
+    def _on_command_received(self, command):
+        """Record the one-way latency of an injected command, broker to device."""
+        sent = command.extras.get("_sent")
+        if sent is not None:
+            self.command_latencies.append(time.time() - sent)
+
+    def connect(self):
+        """Connect to the broker."""
+        self.client.connect()
+
+    def disconnect(self):
+        """Disconnect from the broker and stop the device timers."""
+        try:
+            self.client.disconnect()
+        except AttributeError:
+            # qilowatt 2025.9.3 calls a missing device._stop_timers()
+            pass
+        self.device.stop_timers()
+        self.queue.clear()
+
+    def cycle(self):
+        """Collect a synthetic sample and publish it."""
+        rnd = self.random
+        energy = EnergyData(
+            Power=[rnd.uniform(-3000, 3000) for _ in range(3)],
+            Today=rnd.uniform(0, 30),
+            Total=rnd.uniform(0, 30000),
+            Current=[rnd.uniform(0, 15) for _ in range(3)],
+            Voltage=[rnd.uniform(225, 240) for _ in range(3)],
+            Frequency=rnd.uniform(49.9, 50.1),
+        )
+        metrics = MetricsData(
+            PvPower=[rnd.uniform(0, 5000) for _ in range(2)],
+            PvVoltage=[rnd.uniform(300, 500) for _ in range(2)],
+            PvCurrent=[rnd.uniform(0, 12) for _ in range(2)],
+            LoadPower=[rnd.uniform(0, 3000) for _ in range(3)],
+            BatterySOC=rnd.randint(10, 100),
+            LoadCurrent=[rnd.uniform(0, 15) for _ in range(3)],
+            BatteryPower=[rnd.uniform(-5000, 5000)],
+            BatteryCurrent=[rnd.uniform(-100, 100)],
+            BatteryVoltage=[rnd.uniform(48, 56)],
+            GridExportLimit=10000.0,
+            BatteryTemperature=[rnd.uniform(15, 35)],
+            InverterTemperature=rnd.uniform(30, 60),
+        )
+        self.device.set_sensor_data(energy, metrics)
+        self.device.publish_sensor_data()
+        self.queue.flush()
+
+
+class Server:
+    """Stand-in for the Qilowatt server: counts SENSOR data, sends commands."""
+
+    def __init__(self, host, port):
+        self.received = 0
+        self.received_bytes = 0
+        self._lock = threading.Lock()
+        self._client = mqtt.Client()
+        self._client.on_connect = self._on_connect
+        self._client.on_message = self._on_message
+        self._client.connect(host, port)
+        self._client.loop_start()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        client.subscribe("Q/+/SENSOR")
+
+    def _on_message(self, client, userdata, msg):
+        with self._lock:
+            self.received += 1
+            self.received_bytes += len(msg.payload)
+
+    def snapshot(self):
+        """Return the received message and byte counters."""
+        with self._lock:
+            return self.received, self.received_bytes
+
+    def send_command(self, inverter_id, rnd):
+        """Publish a WORKMODE command to one entry."""
+        command = {
+            "Mode": rnd.choice(MODES),
+            "_source": "loadtest",
+            "PowerLimit": rnd.randrange(0, 10000, 100),
+            "_sent": time.time(),
+        }
+        self._client.publish(
+            f"Q/{inverter_id}/cmnd/backlog", "WORKMODE " + json.dumps(command)
+        )
+
+    def close(self):
+        """Disconnect from the broker."""
+        self._client.loop_stop()
+        self._client.disconnect()
+
+
+async def _drive(entry, rate, stop):
+    """Run collection cycles for one entry at the given rate."""
+    loop = asyncio.get_running_loop()
+    interval = 1 / rate
+    # Spread entries over the interval instead of publishing in lockstep
+    await asyncio.sleep(entry.random.uniform(0, interval))
+    while not stop.is_set():
+        started = loop.time()
+        await loop.run_in_executor(None, entry.cycle)
+        await asyncio.sleep(max(0, interval - (loop.time() - started)))
+
+
+async def _inject_commands(server, entries, rate, stop, seed):
+    """Send WORKMODE commands to random entries at the given rate."""
+    rnd = random.Random(seed)
+    while not stop.is_set():
+        server.send_command(rnd.choice(entries).inverter_id, rnd)
+        await asyncio.sleep(1 / rate)
+
+
+async def run_step(args, count):
+    """Run one load step with `count` entries and return its results."""
+    command_latencies = []
+    # Start the executor workers up front so they are not counted per entry
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(None, time.sleep, 0.01) for _ in range(64)))
+    threads_before = threading.active_count()
+    rss_before = _rss_bytes()
+
+    entries = [
+        SimulatedEntry(i, args.host, args.port, command_latencies, args.seed)
+        for i in range(count)
+    ]
+    for entry in entries:
+        entry.connect()
+    deadline = time.monotonic() + 30
+    while not all(entry.client.connected for entry in entries):
+        if time.monotonic() > deadline:
+            raise RuntimeError("Timed out connecting entries to the broker")
+        await asyncio.sleep(0.1)
+
+    server = Server(args.host, args.port)
+    threads_before += 1  # The server's network thread
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(_drive(e, args.rate, stop)) for e in entries]
+    tasks.append(
+        asyncio.create_task(
+            _inject_commands(server, entries, args.command_rate, stop, args.seed)
+        )
+    )
+
+    await asyncio.sleep(args.warmup)
+    command_latencies.clear()
+    received_start, bytes_start = server.snapshot()
+    published_start = sum(e.queue.published for e in entries)
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+
+    await asyncio.sleep(args.duration)
+
+    wall = time.monotonic() - wall_start
+    cpu = time.process_time() - cpu_start
+    received_end, bytes_end = server.snapshot()
+    published = sum(e.queue.published for e in entries) - published_start
+    rss_after = _rss_bytes()
+    threads_after = threading.active_count()
+
+    stop.set()
+    await asyncio.gather(*tasks)
+    server.close()
+    dropped = sum(e.queue.dropped_overflow + e.queue.dropped_stale for e in entries)
+    coalesced = sum(e.queue.coalesced for e in entries)
+    for entry in entries:
+        entry.disconnect()
+
+    latencies = [s * 1000 for s in command_latencies]
+    return {
+        "entries": count,
+        "rate_hz": args.rate,
+        "published_per_s": published / wall,
+        "received_per_s": (received_end - received_start) / wall,
+        "received_kib_per_s": (bytes_end - bytes_start) / wall / 1024,
+        "commands": len(latencies),
+        "command_p50_ms": _percentile(latencies, 50),
+        "command_p95_ms": _percentile(latencies, 95),
+        "command_max_ms": max(latencies) if latencies else None,
+        "cpu_pct_per_entry": cpu / wall * 100 / count,
+        "rss_kib_per_entry": (rss_after - rss_before) / 1024 / count,
+        "threads_per_entry": (threads_after - threads_before) / count,
+        "coalesced": coalesced,
+        "dropped": dropped,
+    }
+
+
+def _fmt(value, digits=1):
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def render_report(args, results):
+    """Render the results as a markdown report."""
+    lines = [
+        "# Qilowatt MQTT load test",
+        "",
+        f"- Date: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')}",
+        f"- Host: {platform.platform()}, Python {platform.python_version()}, "
+        f"{os.cpu_count()} CPUs",
+        f"- Broker: {args.broker_label}",
+        f"- Publish rate per entry: {args.rate} Hz, commands: {args.command_rate}/s, "
+        f"measured over {args.duration} s after {args.warmup} s warmup",
+        "- Cmd: one-way WORKMODE latency, from the server's publish to the entry's "
+        "command callback",
+        "",
+        "| Entries | Published/s | Received/s | KiB/s | Cmds | Cmd p50 ms "
+        "| Cmd p95 ms | Cmd max ms | CPU %/entry | RSS KiB/entry | Threads/entry "
+        "| Coalesced | Dropped |",
+        "|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for r in results:
+        lines.append(
+            f"| {r['entries']} | {_fmt(r['published_per_s'])} "
+            f"| {_fmt(r['received_per_s'])} | {_fmt(r['received_kib_per_s'])} "
+            f"| {r['commands']} | {_fmt(r['command_p50_ms'])} | {_fmt(r['command_p95_ms'])} "
+            f"| {_fmt(r['command_max_ms'])} | {_fmt(r['cpu_pct_per_entry'], 2)} "
+            f"| {_fmt(r['rss_kib_per_entry'], 0)} | {_fmt(r['threads_per_entry'])} "
+            f"| {r['coalesced']} | {r['dropped']} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+async def main(args):
+    broker = None
+    if args.host is None:
+        args.host = "127.0.0.1"
+        args.broker_label = "amqtt in a child process"
+        ready = multiprocessing.Event()
+        broker = multiprocessing.Process(
+            target=_run_broker, args=(args.port, ready), daemon=True
+        )
+        broker.start()
+        if not ready.wait(30):
+            raise RuntimeError("Broker did not start")
+    else:
+        args.broker_label = f"external at {args.host}:{args.port}"
+
+    results = []
+    try:
+        for count in args.entries:
+            result = await run_step(args, count)
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+    finally:
+        if broker is not None:
+            broker.terminate()
+
+    report = render_report(args, results)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    else:
+        print(report)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", help="external broker host (default: built-in)")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--entries", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--rate", type=float, default=1.0, help="publishes/s per entry")
+    parser.add_argument("--command-rate", type=float, default=5.0, help="commands/s")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per step")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the markdown report to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Modbus TCP inverter simulator for the Qilowatt Modbus backend.
+
+Serves the holding registers of one of the integration's register maps
+(Deye or Sofar) with plausible, slowly drifting values, so the Modbus TCP
+backend can be developed and tested without an inverter:
+
+    python scripts/modbus_sim.py --map Deye --port 5020
+
+Then add the integration with "Direct Modbus TCP", host 127.0.0.1 and port
+5020. Registers outside the map read as 0. --check reads the map once with
+the integration's client against the simulator and prints the values.
+"""
+
+import argparse
+import asyncio
+import math
+import struct
+import sys
+import time
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "qilowatt"
+sys.path.insert(0, str(PACKAGE_DIR))
+
+from modbus import (  # noqa: E402
+    READ_HOLDING_REGISTERS,
+    REGISTER_MAPS,
+    ModbusTcpClient,
+    decode_blocks,
+    plan_blocks,
+)
+
+# Nominal value of each register name, before drift
+NOMINAL = {
+    "grid_export_limit": 10000,
+    "inverter_status": 2,
+    "inverter_temperature": 38.5,
+    "battery_temperature": 24.0,
+    "battery_voltage": 52.4,
+    "battery_soc": 63,
+    "battery_power": -1200,
+    "battery_current": -22.9,
+    "grid_frequency": 50.0,
+    "load_power": 2100,
+}
+DRIFTING = ("power", "current")
+
+
+def nominal(name):
+    """Return the nominal value for a register name."""
+    if name in NOMINAL:
+        return NOMINAL[name]
+    if "voltage" in name:
+        return 400.0 if name.startswith("pv") else 231.0
+    if "current" in name:
+        return 6.5 if name.startswith("pv") else 2.4
+    if "power" in name:
+        return 2600 if name.startswith("pv") else 550
+    if name.startswith("today"):
+        return 12.3
+    if name.startswith("total"):
+        return 4321.5
+    return 0
+
+
+class Simulator:
+    """Holding register table for one register map."""
+
+    def __init__(self, register_map, unit) -> None:
+        self.registers = REGISTER_MAPS[register_map]
+        self.unit = unit
+        self.table = {}
+        self.requests = 0
+        self.update()
+
+    def update(self):
+        """Recompute every register, drifting powers and currents over time."""
+        phase = time.monotonic() / 30
+        for name, register in self.registers.items():
+            value = nominal(name)
+            if any(part in name for part in DRIFTING):
+                value *= 1 + 0.2 * math.sin(phase + register.address)
+            for i, word in enumerate(register.encode(value)):
+                self.table[register.address + i] = word
+
+    def handle(self, pdu):
+        """Return the response PDU for a request PDU."""
+        function = pdu[0]
+        if function != READ_HOLDING_REGISTERS:
+            return bytes([function | 0x80, 1])  # Illegal function
+        address, count = struct.unpack(">HH", pdu[1:5])
+        if not 1 <= count <= 125:
+            return bytes([function | 0x80, 3])  # Illegal data value
+        self.requests += 1
+        words = [self.table.get(address + i, 0) for i in range(count)]
+        return struct.pack(f">BB{count}H", function, 2 * count, *words)
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                transaction, protocol, length, unit = struct.unpack(">HHHB", header)
+                pdu = await reader.readexactly(length - 1)
+                if unit != self.unit:
+                    continue  # Another device on the bus, no reply
+                response = self.handle(pdu)
+                writer.write(
+                    struct.pack(">HHHB", transaction, protocol, len(response) + 1, unit)
+                    + response
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def check(args):
+    """Read the register map once through the integration's client."""
+    registers = REGISTER_MAPS[args.map]
+    blocks = plan_blocks(registers.values())
+    client = ModbusTcpClient(args.host, args.port, args.unit)
+    started = time.perf_counter()
+    results = [await client.read_holding_registers(start, count) for start, count in blocks]
+    elapsed = time.perf_counter() - started
+    await client.close()
+    for name, value in decode_blocks(registers, blocks, results).items():
+        print(f"{name:24} {value:10.2f}")
+    print(f"{len(registers)} registers in {len(blocks)} reads, {elapsed * 1000:.1f} ms")
+
+
+async def main(args):
+    simulator = Simulator(args.map, args.unit)
+    server = await asyncio.start_server(simulator.serve_client, args.host, args.port)
+    print(f"Simulating {args.map} unit {args.unit} on {args.host}:{args.port}")
+    async with server:
+        if args.check:
+            await check(args)
+            return
+        while True:
+            await asyncio.sleep(1)
+            simulator.update()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--map", choices=list(REGISTER_MAPS), default="Deye")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--unit", type=int, default=1)
+    parser.add_argument("--check", action="store_true", help="read once and exit")
+    asyncio.run(main(parser.parse_args()))
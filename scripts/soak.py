@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+"""Accelerated soak test for the Qilowatt integration.
+
+Sets up and unloads a Qilowatt config entry over and over for simulated
+days on a virtual clock: whenever the event loop is idle, time jumps to the
+next timer, so a week of 10 second collection cycles takes minutes. The
+entry goes through Home Assistant's own setup and unload, platforms
+included, and its real Qilowatt MQTT client connects to a stub broker on a
+local port. It reads a Huawei Solar stand-in from the state machine. Along
+the way the run flaps source entities, takes the broker down and back up,
+and sends bursts of WORKMODE commands (with peak shaving).
+
+Before and after every unload the run samples traced memory, live asyncio
+tasks, threads (without executor workers), event bus listeners and
+dispatcher connections. Each loaded sample must show the client's threads
+and listeners, and each unloaded one must be rid of them again. The first
+simulated day (--warm-up) is warm-up; the process exits non-zero if any
+count ends above its baseline or memory grows more than --max-growth:
+
+    python scripts/soak.py --days 7
+
+Requires Home Assistant and the integration requirements.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from unittest.mock import patch
+
+from homeassistant import auth, bootstrap, loader
+from homeassistant.config_entries import (
+    SOURCE_USER,
+    ConfigEntries,
+    ConfigEntry,
+    ConfigEntryState,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import DATA_DISPATCHER
+from homeassistant.setup import async_setup_component
+from qilowatt import QilowattMQTTClient
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from custom_components.qilowatt import mqtt_client  # noqa: E402
+from custom_components.qilowatt.const import (  # noqa: E402
+    CONF_ENERGY_INTERVAL,
+    CONF_ENERGY_TRIGGER,
+    CONF_PEAK_SHAVING_ENTITY,
+    DATA_CLIENT,
+    DOMAIN,
+    TRIGGER_CHANGE,
+)
+
+
+DAY = 86400
+CONNECT_TIMEOUT = 30  # Real seconds for the client to (re)subscribe
+LIMIT_ENTITY = "number.soak_discharge_limit"
+MODES = ("normal", "buy", "sell", "savebattery", "pvsell", "limitexport")
+
+# MQTT control packet types
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 12, 13, 14
+
+# Huawei Solar sensors read by the Huawei backend, with nominal values
+SOURCES = {
+    **{f"power_meter_phase_{p}_active_power": 300.0 for p in "abc"},
+    **{f"power_meter_phase_{p}_voltage": 230.0 for p in "abc"},
+    **{f"power_meter_phase_{p}_current": 1.3 for p in "abc"},
+    "power_meter_frequency": 50.0,
+    "power_meter_consumption": 1234.5,
+    "power_meter_active_power": 900.0,
+    "inverter_active_power": 2500.0,
+    "inverter_pv_1_voltage": 380.0,
+    "inverter_pv_1_current": 4.2,
+    "inverter_pv_2_voltage": 375.0,
+    "inverter_pv_2_current": 4.0,
+    "inverter_internal_temperature": 41.0,
+    "batteries_charge_discharge_power": -800.0,
+    "batteries_bus_current": -15.0,
+    "batteries_bus_voltage": 52.0,
+    "batteries_state_of_capacity": 64.0,
+    "battery_1_bms_temperature": 23.0,
+}
+
+
+class VirtualClock:
+    """Event loop clock that jumps to the next timer whenever the loop is idle.
+
+    Replaces the loop's time and its selector, plus time.monotonic and
+    time.time, which the integration uses for its schedules. While executor
+    jobs are running the clock stands still, so a collection cycle never
+    overlaps the timers that follow it.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the clock at the current wall time."""
+        self.now = 0.0
+        self.epoch = time.time()
+        self._in_flight = 0
+
+    def monotonic(self):
+        """Return virtual seconds since the start."""
+        return self.now
+
+    def wall(self):
+        """Return the virtual wall clock time."""
+        return self.epoch + self.now
+
+    def install(self, loop):
+        """Drive `loop` and the time module from this clock."""
+        real_select = loop._selector.select  # pylint: disable=protected-access
+        real_run_in_executor = loop.run_in_executor
+
+        def select(timeout=None):
+            if timeout == 0:
+                return real_select(0)
+            if self._in_flight:
+                # Wait in real time for the executor, the clock stands still
+                return real_select(0.05)
+            events = real_select(0)
+            if not events:
+                if timeout is None:
+                    return real_select(1)
+                self.now += timeout
+            return events
+
+        def run_in_executor(executor, func, *args):
+            self._in_flight += 1
+            future = real_run_in_executor(executor, func, *args)
+            future.add_done_callback(self._job_done)
+            return future
+
+        loop._selector.select = select  # pylint: disable=protected-access
+        loop.time = self.monotonic
+        loop.run_in_executor = run_in_executor
+        self._restore = (loop, time.monotonic, time.time)
+        time.monotonic = self.monotonic
+        time.time = self.wall
+
+    def uninstall(self):
+        """Give the loop and the time module their own clocks back."""
+        loop, time.monotonic, time.time = self._restore
+        del loop._selector.select  # pylint: disable=protected-access
+        del loop.time
+        del loop.run_in_executor
+
+    @contextmanager
+    def frozen(self):
+        """Stand still while the caller waits for work done in real time.
+
+        Timers do not fire meanwhile, so only wait on executor jobs.
+        """
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+
+    def _job_done(self, future):
+        self._in_flight -= 1
+
+
+class StubBroker:
+    """Minimal MQTT 3.1.1 broker on a thread and event loop of its own.
+
+    Enough of the protocol for paho: it acknowledges connections,
+    subscriptions and QoS 1 publishes, answers pings, counts what it receives
+    and delivers what the harness publishes to the matching subscribers.
+    The thread runs no timers, so the virtual clock does not affect it.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a broker that is not listening yet."""
+        self.port = 0
+        self.published = 0
+        self.subscriptions = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="soak-broker", daemon=True
+        )
+        self._server = None
+        self._clients = {}  # StreamWriter -> subscribed topics
+        self._subscribed = threading.Condition()
+
+    def start(self):
+        """Start the broker thread and listen on a free local port."""
+        self._thread.start()
+        self.set_online(True)
+
+    def stop(self):
+        """Drop every client and stop the broker thread."""
+        self.set_online(False)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def set_online(self, online):
+        """Listen for clients, or close the listener and drop every client."""
+        asyncio.run_coroutine_threadsafe(
+            self._async_set_online(online), self._loop
+        ).result()
+
+    def publish(self, topic, payload):
+        """Deliver a QoS 0 message to the clients subscribed to `topic`."""
+        self._loop.call_soon_threadsafe(self._deliver, topic, payload)
+
+    def wait_for_subscription(self, seen, timeout):
+        """Wait until more than `seen` subscriptions were made in total."""
+        with self._subscribed:
+            return self._subscribed.wait_for(
+                lambda: self.subscriptions > seen, timeout
+            )
+
+    async def _async_set_online(self, online):
+        if online:
+            self._server = await asyncio.start_server(
+                self._serve, "127.0.0.1", self.port
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            return
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for writer in self._clients:
+            writer.close()
+        self._clients.clear()
+
+    def _deliver(self, topic, payload):
+        body = _encode_string(topic) + payload
+        packet = bytes([PUBLISH << 4]) + _encode_length(len(body)) + body
+        for writer, topics in self._clients.items():
+            if topic in topics:
+                writer.write(packet)
+
+    async def _serve(self, reader, writer):
+        topics = self._clients[writer] = set()
+        try:
+            while True:
+                header = (await reader.readexactly(1))[0]
+                length = shift = 0
+                while True:
+                    byte = (await reader.readexactly(1))[0]
+                    length |= (byte & 0x7F) << shift
+                    shift += 7
+                    if not byte & 0x80:
+                        break
+                body = await reader.readexactly(length)
+                kind = header >> 4
+                if kind == CONNECT:
+                    writer.write(bytes([CONNACK << 4, 2, 0, 0]))
+                elif kind == PUBLISH:
+                    self.published += 1
+                    if header & 0x06:
+                        end = 4 + int.from_bytes(body[:2], "big")
+                        writer.write(bytes([PUBACK << 4, 2]) + body[end - 2 : end])
+                elif kind == SUBSCRIBE:
+                    granted = 0
+                    position = 2
+                    while position < len(body):
+                        start = position + 2
+                        end = start + int.from_bytes(body[position:start], "big")
+                        topics.add(body[start:end].decode())
+                        position = end + 1
+                        granted += 1
+                    writer.write(
+                        bytes([SUBACK << 4, 2 + granted]) + body[:2] + bytes(granted)
+                    )
+                    with self._subscribed:
+                        self.subscriptions += 1
+                        self._subscribed.notify_all()
+                elif kind == PINGREQ:
+                    writer.write(bytes([PINGRESP << 4, 0]))
+                elif kind == DISCONNECT:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+
+def _encode_string(value):
+    data = value.encode()
+    return len(data).to_bytes(2, "big") + data
+
+
+def _encode_length(length):
+    data = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        data.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(data)
+
+
+def _make_entry():
+    return ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="Soak",
+        data={
+            "mqtt_username": "soak",
+            "mqtt_password": "soak",
+            "inverter_id": "SOAK0001",
+            "inverter_model": "Huawei",
+            "device_id": "soak",
+        },
+        source=SOURCE_USER,
+        options={
+            CONF_ENERGY_INTERVAL: 2,
+            CONF_ENERGY_TRIGGER: TRIGGER_CHANGE,
+            CONF_PEAK_SHAVING_ENTITY: LIMIT_ENTITY,
+        },
+    )
+
+
+async def _setup_hass(config_dir):
+    """Return a Home Assistant instance with the stand-in Huawei entities."""
+    hass = HomeAssistant(config_dir)
+    hass.config.skip_pip = True
+    loader.async_setup(hass)
+    hass.config_entries = ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    hass.auth = await auth.auth_manager_from_config(hass, [], [])
+    # Set up without starting, so the HTTP server does not listen
+    await async_setup_component(hass, "http", {})
+
+    registry = er.async_get(hass)
+    for name, value in SOURCES.items():
+        registry.async_get_or_create(
+            "sensor", "huawei_solar", name, suggested_object_id=name
+        )
+        hass.states.async_set(f"sensor.{name}", value)
+    hass.states.async_set(LIMIT_ENTITY, 5000, {"min": 0, "max": 10000})
+
+    async def set_value(call):
+        hass.states.async_set(
+            call.data["entity_id"], call.data["value"], {"min": 0, "max": 10000}
+        )
+
+    hass.services.async_register("number", "set_value", set_value)
+    return hass
+
+
+def _sample(hass):
+    """Return the resource counts watched for growth."""
+    gc.collect()
+    for thread in threading.enumerate():
+        if isinstance(thread, threading.Timer) and thread.finished.is_set():
+            # A cancelled timer is about to exit
+            thread.join(1)
+    threads = [
+        thread
+        for thread in threading.enumerate()
+        if not thread.name.startswith(
+            ("asyncio_", "ThreadPoolExecutor", "SyncWorker", "soak-broker")
+        )
+    ]
+    return {
+        "memory": tracemalloc.get_traced_memory()[0],
+        "tasks": len(asyncio.all_tasks()),
+        "threads": len(threads),
+        "bus_listeners": sum(hass.bus.async_listeners().values()),
+        "dispatcher": sum(
+            len(targets) for targets in hass.data.get(DATA_DISPATCHER, {}).values()
+        ),
+    }
+
+
+async def _wiggle(hass, rnd, flap_rate):
+    """Move the grid power and occasionally flap a source entity."""
+    for phase in "abc":
+        name = f"power_meter_phase_{phase}_active_power"
+        hass.states.async_set(f"sensor.{name}", round(rnd.gauss(300, 400), 1))
+    if rnd.random() < flap_rate:
+        name = rnd.choice(list(SOURCES))
+        hass.states.async_set(f"sensor.{name}", "unavailable")
+        await asyncio.sleep(rnd.uniform(1, 30))
+        hass.states.async_set(f"sensor.{name}", SOURCES[name])
+
+
+async def run(args):
+    """Run the soak test and return the process exit code."""
+    clock = VirtualClock()
+    broker = StubBroker()
+    broker.start()
+    # The real client, pointed at the stub broker
+    client_class = partial(
+        QilowattMQTTClient, host="127.0.0.1", port=broker.port, tls=False
+    )
+    clock.install(asyncio.get_running_loop())
+    # One frame per allocation; deeper tracebacks slow the run down many times
+    tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory() as config_dir, patch.object(
+            mqtt_client, "QilowattMQTTClient", client_class
+        ):
+            return await _soak(args, clock, broker, config_dir)
+    finally:
+        tracemalloc.stop()
+        clock.uninstall()
+        broker.stop()
+
+
+async def _soak(args, clock, broker, config_dir):
+    rnd = random.Random(args.seed)
+    hass = await _setup_hass(config_dir)
+    entry = _make_entry()
+    number = 0
+    samples = []
+    baseline_snapshot = None
+    failures = []
+    try:
+        for _ in range(int(args.days * DAY / args.reload_every)):
+            number += 1
+            seen = broker.subscriptions
+            with clock.frozen():
+                if number == 1:
+                    await hass.config_entries.async_add(entry)
+                else:
+                    await hass.config_entries.async_setup(entry.entry_id)
+                connected = await hass.async_add_executor_job(
+                    broker.wait_for_subscription, seen, CONNECT_TIMEOUT
+                )
+            if entry.state is not ConfigEntryState.LOADED or not connected:
+                failures.append(
+                    f"reload {number}: entry {entry.state.value}, not connected"
+                )
+                break
+            client = hass.data[DOMAIN][entry.entry_id][DATA_CLIENT]
+            command_topic = client.qw_device.command_topic
+
+            end = clock.now + args.reload_every
+            while clock.now < end:
+                await _wiggle(hass, rnd, args.flap_rate)
+                roll = rnd.random()
+                if roll < args.reconnect_rate:
+                    broker.set_online(False)
+                    await asyncio.sleep(rnd.uniform(5, 120))
+                    seen = broker.subscriptions
+                    broker.set_online(True)
+                    if not await hass.async_add_executor_job(
+                        broker.wait_for_subscription, seen, CONNECT_TIMEOUT
+                    ):
+                        failures.append(f"reload {number}: client did not reconnect")
+                elif roll < args.reconnect_rate + args.burst_rate:
+                    for _ in range(rnd.randint(5, 50)):
+                        command = {
+                            "Mode": rnd.choice(MODES),
+                            "PowerLimit": rnd.randint(0, 10000),
+                            "PeakShaving": rnd.choice((None, 2000, 4000)),
+                        }
+                        broker.publish(
+                            command_topic, ("WORKMODE " + json.dumps(command)).encode()
+                        )
+                await asyncio.sleep(rnd.uniform(1, 10))
+
+            loaded = _sample(hass)
+            await hass.config_entries.async_unload(entry.entry_id)
+            if client.supervisor.task_count or client.supervisor.listener_count:
+                failures.append(
+                    f"reload {number}: {client.supervisor.task_count} tasks, "
+                    f"{client.supervisor.listener_count} listeners after unload"
+                )
+            client = None
+            await asyncio.sleep(1)
+
+            sample = _sample(hass)
+            for key in ("threads", "dispatcher"):
+                # The paho network thread and the entities' signal connections
+                if loaded[key] <= sample[key]:
+                    failures.append(
+                        f"reload {number}: {key} {loaded[key]} loaded, "
+                        f"{sample[key]} unloaded"
+                    )
+            sample["day"] = round(clock.now / DAY, 2)
+            samples.append(sample)
+            print(json.dumps(sample), file=sys.stderr)
+            if baseline_snapshot is None and clock.now >= args.warm_up * DAY:
+                baseline = sample
+                baseline_snapshot = tracemalloc.take_snapshot()
+    finally:
+        if entry.state is ConfigEntryState.LOADED:
+            await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_stop(force=True)
+
+    if baseline_snapshot is None:
+        print("Run shorter than the warm-up, nothing to compare")
+        return 2
+
+    final = samples[-1]
+    failures += [
+        f"{key}: {baseline[key]} -> {final[key]}"
+        for key in ("tasks", "threads", "bus_listeners", "dispatcher")
+        if final[key] > baseline[key]
+    ]
+    growth = final["memory"] - baseline["memory"]
+    if growth > args.max_growth * 1024:
+        failures.append(f"memory: grew {growth / 1024:.0f} KiB")
+        for stat in tracemalloc.take_snapshot().compare_to(baseline_snapshot, "lineno")[:10]:
+            failures.append(f"  {stat}")
+
+    print(
+        f"{number} reloads over {clock.now / DAY:.1f} simulated days, "
+        f"{broker.published} messages published, "
+        f"memory {growth / 1024:+.0f} KiB since warm-up"
+    )
+    if failures:
+        print("Soak failed:\n" + "\n".join(failures))
+        return 1
+    print("No growth detected")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=float, default=7.0, help="simulated days")
+    parser.add_argument(
+        "--reload-every", type=float, default=6 * 3600, help="simulated seconds"
+    )
+    parser.add_argument(
+        "--warm-up", type=float, default=1.0, help="simulated days before the baseline"
+    )
+    parser.add_argument("--flap-rate", type=float, default=0.05, help="per step")
+    parser.add_argument("--reconnect-rate", type=float, default=0.002, help="per step")
+    parser.add_argument("--burst-rate", type=float, default=0.005, help="per step")
+    parser.add_argument(
+        "--max-growth", type=float, default=512, help="allowed memory growth in KiB"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    logging.basicConfig(level=logging.DEBUG if arguments.verbose else logging.WARNING)
+    sys.exit(asyncio.run(run(arguments)))
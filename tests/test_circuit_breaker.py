@@ -0,0 +1,93 @@
+"""Tests for the inverter read circuit breaker."""
+
+from custom_components.qilowatt.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+)
+
+
+class Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(**kwargs):
+    clock = Clock()
+    return CircuitBreaker("test", clock=clock, **kwargs), clock
+
+
+def fail(breaker, times=1):
+    for _ in range(times):
+        breaker.record_failure(KeyError("sensor.grid_l1_power"))
+
+
+def test_opens_after_consecutive_failures():
+    breaker, _ = make_breaker(failure_threshold=3)
+    fail(breaker, 2)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request()
+    fail(breaker)
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+    assert breaker.retry_in == 10.0
+
+
+def test_success_resets_the_consecutive_count():
+    breaker, _ = make_breaker(failure_threshold=3)
+    fail(breaker, 2)
+    breaker.record_success()
+    fail(breaker, 2)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.total_failures == 4
+
+
+def test_opens_on_intermittent_failures_within_the_window():
+    breaker, clock = make_breaker(failure_threshold=3, window=600, window_threshold=4)
+    for _ in range(3):
+        fail(breaker)
+        breaker.record_success()
+        clock.now += 60
+    assert breaker.state == STATE_CLOSED
+    fail(breaker)
+    assert breaker.state == STATE_OPEN
+
+
+def test_failures_leave_the_window():
+    breaker, clock = make_breaker(failure_threshold=3, window=600, window_threshold=4)
+    for _ in range(3):
+        fail(breaker)
+        breaker.record_success()
+        clock.now += 300
+    assert breaker.windowed_failures == 2
+    fail(breaker)
+    assert breaker.state == STATE_CLOSED
+
+
+def test_half_open_probe_closes_or_reopens_with_backoff():
+    breaker, clock = make_breaker(failure_threshold=1, base_delay=10, max_delay=25)
+    fail(breaker)
+    clock.now += 10
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+
+    fail(breaker)
+    assert breaker.state == STATE_OPEN
+    assert breaker.retry_in == 20.0
+    clock.now += 20
+    assert breaker.allow_request()
+    fail(breaker)
+    assert breaker.retry_in == 25.0  # Capped at max_delay
+
+    clock.now += 25
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.trips == 0
+    assert breaker.windowed_failures == 0
@@ -0,0 +1,67 @@
+"""Tests for the WORKMODE command history."""
+
+import pytest
+from homeassistant.core import HomeAssistant
+from qilowatt import WorkModeCommand
+
+from custom_components.qilowatt.command_history import (
+    OUTCOME_DISPATCHED,
+    OUTCOME_PEAK_SHAVING,
+    CommandHistory,
+)
+
+
+def add(history, latencies):
+    for index, latency in enumerate(latencies):
+        history.async_add(
+            WorkModeCommand(Mode="buy", PowerLimit=index),
+            1000.0 + index,
+            latency,
+            OUTCOME_DISPATCHED,
+        )
+
+
+@pytest.mark.asyncio
+async def test_nearest_rank_percentiles(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    history = CommandHistory(hass, "test")
+    add(history, [(i + 1) / 1000 for i in reversed(range(100))])
+    assert history.latency_percentiles() == {"p50": 0.05, "p90": 0.09, "p99": 0.099}
+    assert history.latency_percentiles((0, 100)) == {"p0": 0.001, "p100": 0.1}
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_percentiles_of_few_and_no_records(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    history = CommandHistory(hass, "test")
+    assert history.latency_percentiles() == {"p50": None, "p90": None, "p99": None}
+    add(history, [0.2, 0.1])
+    assert history.latency_percentiles() == {"p50": 0.1, "p90": 0.2, "p99": 0.2}
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_keeps_the_newest_records_newest_first(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    history = CommandHistory(hass, "test", size=3)
+    add(history, [0.01] * 5)
+    history.async_add(WorkModeCommand(PeakShaving=3000), 2000.0, 0.02, OUTCOME_PEAK_SHAVING)
+    recent = history.recent()
+    assert [record["received"] for record in recent] == [2000.0, 1004.0, 1003.0]
+    assert recent[0]["command"] == {"Mode": "normal", "PeakShaving": 3000}
+    assert recent[0]["outcome"] == OUTCOME_PEAK_SHAVING
+    assert len(history.recent(limit=1)) == 1
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_survives_a_restart(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    history = CommandHistory(hass, "test")
+    add(history, [0.01, 0.02])
+    await history.async_save()
+    restored = CommandHistory(hass, "test")
+    await restored.async_load()
+    assert restored.recent() == history.recent()
+    await hass.async_stop(force=True)
@@ -0,0 +1,60 @@
+"""Tests for the local grid import energy counters."""
+
+from datetime import timedelta
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.qilowatt.energy_integrator import EnergyIntegrator
+
+
+@pytest.fixture
+def time_zone():
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Europe/Tallinn"))
+    yield
+    dt_util.set_default_time_zone(dt_util.UTC)
+
+
+def next_midnight():
+    return dt_util.start_of_local_day(dt_util.now().date() + timedelta(days=1)).timestamp()
+
+
+async def run(tmp_path, samples):
+    hass = HomeAssistant(str(tmp_path))
+    try:
+        integrator = EnergyIntegrator(hass, "test")
+        for now, power in samples:
+            integrator.async_add_sample(power, now)
+        return integrator
+    finally:
+        await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_trapezoid_counts_import_only(tmp_path):
+    start = next_midnight() - 7200
+    integrator = await run(
+        tmp_path, [(start, 3600), (start + 60, 3600), (start + 120, -3600), (start + 180, 0)]
+    )
+    # 60 s at 3.6 kW, then a ramp to export counting its import half only
+    assert integrator.total == pytest.approx(0.06 + 0.03)
+    assert integrator.today == pytest.approx(integrator.total)
+
+
+@pytest.mark.asyncio
+async def test_gaps_are_not_integrated(tmp_path):
+    start = next_midnight() - 7200
+    integrator = await run(tmp_path, [(start, 3600), (start + 3000, 3600), (start + 3060, 3600)])
+    assert integrator.total == pytest.approx(0.06)
+
+
+@pytest.mark.asyncio
+async def test_today_keeps_the_part_after_local_midnight(tmp_path, time_zone):
+    midnight = next_midnight()
+    integrator = await run(
+        tmp_path, [(midnight - 90, 3600), (midnight + 30, 3600), (midnight + 90, 3600)]
+    )
+    assert integrator.total == pytest.approx(0.18)
+    assert integrator.today == pytest.approx(0.09)
+    assert dt_util.as_local(dt_util.utc_from_timestamp(midnight)).hour == 0
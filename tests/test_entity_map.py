@@ -0,0 +1,83 @@
+"""Tests for the entity maps pinned in the config entry."""
+
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.qilowatt.const import CONF_ENTITY_MAP
+from custom_components.qilowatt.inverter import (
+    InverterStack,
+    create_inverter,
+    get_entity_maps,
+    resolve_entity_maps,
+)
+
+DATA = {"inverter_model": "Solarman", "inverter_id": "HA0001", "device_ids": ["deye1", "deye2"]}
+
+
+async def setup_hass(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    registry = er.async_get(hass)
+    for device_id, grid_power in (("deye1", 1000), ("deye2", 2000)):
+        for suffix, value in (("grid_l1_power", grid_power), ("battery", 50)):
+            entry = registry.async_get_or_create(
+                "sensor",
+                "solarman",
+                f"{device_id}_{suffix}",
+                suggested_object_id=f"{device_id}_{suffix}",
+                device_id=device_id,
+            )
+            hass.states.async_set(entry.entity_id, value)
+    return hass
+
+
+@pytest.mark.asyncio
+async def test_resolved_maps_are_read_without_lookup(tmp_path):
+    hass = await setup_hass(tmp_path)
+    entity_maps = resolve_entity_maps(hass, DATA)
+    assert entity_maps["deye1"]["grid_l1_power"] == "sensor.deye1_grid_l1_power"
+    assert entity_maps["deye2"]["_battery"] == "sensor.deye2_battery"
+    assert entity_maps["deye1"]["grid_l2_power"] is None
+
+    # A new entity with a matching suffix is not picked up while pinned
+    er.async_get(hass).async_get_or_create(
+        "sensor",
+        "solarman",
+        "deye1_other",
+        suggested_object_id="other_grid_l2_power",
+        device_id="deye1",
+    )
+    hass.states.async_set("sensor.other_grid_l2_power", 300)
+    config_entry = SimpleNamespace(data={**DATA, CONF_ENTITY_MAP: entity_maps}, options={})
+    stack = create_inverter(hass, config_entry)
+    assert isinstance(stack, InverterStack)
+    assert stack.get_energy_data().Power == [3000, 0.0, 0.0]
+
+    unpinned = create_inverter(hass, config_entry, pinned=False)
+    assert unpinned.get_energy_data().Power == [3000, 300, 0.0]
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_backends_without_entities_are_not_pinned(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    data = {"inverter_model": "Simulator", "device_id": "simulator"}
+    assert resolve_entity_maps(hass, data) is None
+    await hass.async_stop(force=True)
+
+
+def test_options_replace_the_maps_of_the_entry():
+    config_entry = SimpleNamespace(
+        data={CONF_ENTITY_MAP: {"deye1": {"a": "sensor.a"}, "deye2": {"a": "sensor.b"}}},
+        options={CONF_ENTITY_MAP: {"deye1": {"a": "sensor.c"}}},
+    )
+    assert get_entity_maps(config_entry) == {
+        "deye1": {"a": "sensor.c"},
+        "deye2": {"a": "sensor.b"},
+    }
+    assert get_entity_maps(SimpleNamespace(data={}, options={})) == {}
@@ -0,0 +1,95 @@
+"""Tests for the ESPHome native API backend's state table."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.qilowatt.const import CONF_ESPHOME_HOST
+from custom_components.qilowatt.inverter.esphome_api import EspHomeApiInverter
+
+ENTITIES = [
+    # key, object id, decimals, unit
+    (1, "deye-external_ct_l1_power", 0, "W"),
+    (2, "deye-external_ct_l2_power", 0, "W"),
+    (3, "deye-external_ct_l3_power", 0, "W"),
+    (4, "deye-battery_capacity", 0, "%"),
+    (5, "deye-battery_rated_capacity", 0, "Ah"),
+    (6, "deye-grid_voltage_l1", 1, "V"),
+    (7, "deye-pv1_power", None, "W"),
+]
+
+
+def make_inverter():
+    config_entry = SimpleNamespace(
+        data={"device_id": "deye", CONF_ESPHOME_HOST: "192.0.2.10"}, options={}
+    )
+    inverter = EspHomeApiInverter(SimpleNamespace(states={}), config_entry)
+    inverter._use_entities(
+        [
+            SimpleNamespace(
+                key=key,
+                object_id=object_id,
+                name="",
+                accuracy_decimals=decimals,
+                unit_of_measurement=unit,
+            )
+            for key, object_id, decimals, unit in ENTITIES
+        ]
+    )
+    return inverter
+
+
+def send(inverter, key, state, missing_state=False):
+    inverter._on_state(SimpleNamespace(key=key, state=state, missing_state=missing_state))
+
+
+def test_states_are_keyed_like_entity_ids_and_rounded():
+    inverter = make_inverter()
+    assert inverter.entity_for("_external_ct_l2_power") == "_deye_external_ct_l2_power"
+    send(inverter, 1, 420.00001)
+    send(inverter, 6, 231.04999)
+    send(inverter, 7, 1234.56)
+    send(inverter, 99, 1)  # Not listed, ignored
+    assert inverter.values["_deye_external_ct_l1_power"].state == 420
+    assert inverter.values["_deye_grid_voltage_l1"].state == 231.0
+    assert inverter.values["_deye_pv1_power"].state == 1234.56
+    assert len(inverter.values) == 3
+
+
+def test_missing_state_reads_as_unavailable():
+    inverter = make_inverter()
+    send(inverter, 4, 0, missing_state=True)
+    assert inverter.values["_deye_battery_capacity"].state == "unavailable"
+    assert not inverter.is_ready()
+    send(inverter, 1, 100)
+    send(inverter, 4, 63)
+    assert inverter.is_ready()
+
+
+def test_capacity_unit_comes_from_the_entity():
+    inverter = make_inverter()
+    assert inverter.get_battery_capacity() is None
+    send(inverter, 5, 100)
+    assert inverter.get_battery_capacity() == 100
+    # A percentage is not a capacity
+    inverter.attributes[5] = {"unit_of_measurement": "%"}
+    send(inverter, 5, 100)
+    assert inverter.get_battery_capacity() is None
+
+
+def test_only_grid_power_states_notify():
+    inverter = make_inverter()
+    calls = []
+    inverter.async_track_grid_power(calls.append)
+    send(inverter, 3, 1)
+    send(inverter, 6, 230)
+    assert len(calls) == 1
+
+
+def test_reads_fail_while_disconnected():
+    inverter = make_inverter()
+    with pytest.raises(ConnectionError):
+        inverter.get_energy_data()
+    inverter.connected = True
+    send(inverter, 1, 420)
+    assert inverter.get_energy_data().Power == [420, 0.0, 0.0]
@@ -0,0 +1,85 @@
+"""Tests for the outlier and glitch filter."""
+
+from qilowatt import EnergyData
+
+from custom_components.qilowatt.filters import (
+    ENERGY_COUNTERS,
+    ENERGY_DERIVED,
+    ENERGY_RANGES,
+    SampleFilter,
+)
+
+
+def energy(
+    voltage=230.0, current=1.0, frequency=50.0, power=230.0, today=1.0, total=100.0
+):
+    return EnergyData(
+        Power=[power],
+        Today=today,
+        Total=total,
+        Current=[current],
+        Voltage=[voltage],
+        Frequency=frequency,
+    )
+
+
+def test_out_of_range_value_holds_last_good():
+    sample_filter = SampleFilter(ENERGY_RANGES, window=1)
+    sample_filter.apply(energy(frequency=50.0))
+    assert sample_filter.apply(energy(frequency=6553.5)).Frequency == 50.0
+    assert sample_filter.rejected == 1
+    assert sample_filter.rejected_fields == {"Frequency": 1}
+
+
+def test_passes_through_until_a_value_is_plausible():
+    sample_filter = SampleFilter(ENERGY_RANGES, window=1)
+    assert sample_filter.apply(energy(voltage=0.0)).Voltage == [0.0]
+    assert sample_filter.rejected == 0
+
+
+def test_rolling_median_removes_a_spike_in_range():
+    sample_filter = SampleFilter(ENERGY_RANGES, window=3)
+    for power in (500.0, 510.0):
+        sample_filter.apply(energy(power=power))
+    assert sample_filter.apply(energy(power=40000.0)).Power == [510.0]
+    assert sample_filter.apply(energy(power=505.0)).Power == [510.0]
+
+
+def test_derived_field_is_held_with_its_source():
+    sample_filter = SampleFilter(ENERGY_RANGES, window=1, derived=ENERGY_DERIVED)
+    sample_filter.apply(energy(voltage=230.0, current=2.0))
+    # A voltage glitch makes the current computed from it implausible too
+    data = sample_filter.apply(energy(voltage=0.4, current=150.0))
+    assert data.Voltage == [230.0]
+    assert data.Current == [2.0]
+
+
+def test_outage_passes_after_max_hold():
+    sample_filter = SampleFilter(ENERGY_RANGES, window=1, derived=ENERGY_DERIVED, max_hold=3)
+    sample_filter.apply(energy())
+    held = [sample_filter.apply(energy(voltage=0.0, current=0.0, frequency=0.0)) for _ in range(3)]
+    assert all(data.Voltage == [230.0] and data.Frequency == 50.0 for data in held)
+    assert sample_filter.expired == 0
+
+    data = sample_filter.apply(energy(voltage=0.0, current=0.0, frequency=0.0))
+    assert data.Voltage == [0.0]
+    assert data.Current == [0.0]
+    assert data.Frequency == 0.0
+    assert sample_filter.expired_fields == {"Voltage": 1, "Frequency": 1}
+
+    # Once plausible again, glitches are held again
+    sample_filter.apply(energy(voltage=231.0))
+    assert sample_filter.apply(energy(voltage=0.0)).Voltage == [231.0]
+
+
+def test_counters_are_not_delayed_by_the_median():
+    sample_filter = SampleFilter(ENERGY_RANGES, window=3, counters=ENERGY_COUNTERS)
+    for today, total in ((23.8, 1000.0), (23.9, 1000.1), (24.0, 1000.2)):
+        data = sample_filter.apply(energy(today=today, total=total))
+        assert (data.Today, data.Total) == (today, total)
+    # The midnight reset shows at once
+    assert sample_filter.apply(energy(today=0.0, total=1000.3)).Today == 0.0
+    assert sample_filter.apply(energy(today=0.1, total=1000.4)).Today == 0.1
+    # A glitch is still held
+    data = sample_filter.apply(energy(today=-5.0, total=1e12))
+    assert (data.Today, data.Total) == (0.1, 1000.4)
@@ -0,0 +1,132 @@
+"""Tests for the headless collector."""
+
+import logging
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.qilowatt.const import CONF_ENTITY_MAP, CONF_PEAK_SHAVING_ENTITY
+from custom_components.qilowatt.headless import (
+    SOURCE_DIRECT,
+    SOURCE_HOME_ASSISTANT,
+    SOURCE_MQTT,
+    HeadlessEntry,
+    HeadlessSite,
+    HomeAssistantSource,
+    Message,
+    MqttBrokerSource,
+    get_time_zone,
+    source_type,
+)
+
+SITE = {
+    "title": "Home",
+    "data": {
+        "inverter_model": "Solarman",
+        "inverter_id": "HA0001",
+        "device_id": "deye",
+        CONF_ENTITY_MAP: {
+            "deye": {
+                "grid_l1_power": "sensor.deye_grid_l1_power",
+                "_battery": "sensor.deye_battery",
+                "grid_l2_power": None,
+            }
+        },
+    },
+    "options": {CONF_PEAK_SHAVING_ENTITY: "number.deye_max_discharge"},
+    "source": {"type": "home_assistant", "url": "ws://ha/api/websocket", "token": "x"},
+}
+
+
+def test_source_type_follows_the_backend():
+    assert source_type({"inverter_model": "Solarman"}) == SOURCE_HOME_ASSISTANT
+    assert source_type({"inverter_model": "VenusMqtt"}) == SOURCE_MQTT
+    assert source_type({"inverter_model": "Modbus"}) == SOURCE_DIRECT
+
+
+def test_site_needs_the_source_of_its_backend(tmp_path):
+    assert HeadlessSite("home", SITE, tmp_path).source_type == SOURCE_HOME_ASSISTANT
+    with pytest.raises(ValueError, match="needs a home_assistant source"):
+        HeadlessSite("home", {**SITE, "source": {"type": "mqtt"}}, tmp_path)
+
+
+def test_unknown_time_zone():
+    assert str(get_time_zone("Europe/Tallinn")) == "Europe/Tallinn"
+    with pytest.raises(ValueError):
+        get_time_zone("Europe/Atlantis")
+
+
+@pytest.mark.asyncio
+async def test_pinned_entities_are_mirrored(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    source = HomeAssistantSource(hass, HeadlessEntry("home", SITE), SITE["source"])
+    assert source.entity_ids == [
+        "number.deye_max_discharge",
+        "sensor.deye_battery",
+        "sensor.deye_grid_l1_power",
+    ]
+    source._handle(
+        1,
+        {
+            "id": 1,
+            "type": "event",
+            "event": {
+                "a": {
+                    "sensor.deye_grid_l1_power": {"s": "420", "a": {"unit_of_measurement": "W"}},
+                    "sensor.deye_battery": {"s": "63"},
+                }
+            },
+        },
+    )
+    source._handle(
+        1,
+        {
+            "id": 1,
+            "type": "event",
+            "event": {
+                "c": {
+                    "sensor.deye_grid_l1_power": {
+                        "+": {"s": "500", "a": {"friendly_name": "Grid L1"}},
+                        "-": {"a": ["unit_of_measurement"]},
+                    }
+                },
+                "r": ["sensor.deye_battery"],
+            },
+        },
+    )
+    source._handle(1, {"id": 2, "type": "event", "event": {"a": {"sensor.other": {"s": "1"}}}})
+    state = hass.states.get("sensor.deye_grid_l1_power")
+    assert state.state == "500"
+    assert dict(state.attributes) == {"friendly_name": "Grid L1"}
+    assert hass.states.get("sensor.deye_battery").state == "unavailable"
+    assert hass.states.get("sensor.other") is None
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_loaded_remote_entry_is_reported(tmp_path, caplog):
+    hass = HomeAssistant(str(tmp_path))
+    source = HomeAssistantSource(hass, HeadlessEntry("home", SITE), SITE["source"])
+    source._entries_request = 1
+    result = [{"title": "Home", "state": "loaded"}, {"title": "Old", "state": "not_loaded"}]
+    with caplog.at_level(logging.ERROR):
+        source._handle(2, {"id": 1, "type": "result", "success": True, "result": result})
+    assert "Qilowatt entry Home is still loaded" in caplog.text
+    assert "Old" not in caplog.text
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_broker_delivers_to_matching_subscriptions(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    broker = MqttBrokerSource(hass, {"host": "localhost"})
+    received = []
+    unsubscribe = await broker.async_subscribe("N/+/system/0/#", received.append)
+    await broker.async_subscribe("solar_assistant/+/+/state", received.append)
+    broker._async_deliver(Message("N/abc/system/0/Dc/Battery/Soc", '{"value": 50}'))
+    broker._async_deliver(Message("N/abc/grid/30/Ac/L1/Voltage", '{"value": 230}'))
+    assert received == [Message("N/abc/system/0/Dc/Battery/Soc", '{"value": 50}')]
+    unsubscribe()
+    broker._async_deliver(Message("N/abc/system/0/Dc/Battery/Soc", '{"value": 51}'))
+    assert len(received) == 1
+    await hass.async_stop(force=True)
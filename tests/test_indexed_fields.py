@@ -0,0 +1,141 @@
+"""Tests for the discovery of indexed fields such as PV strings and battery modules."""
+
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.qilowatt.inverter.base_inverter import BaseInverter
+from custom_components.qilowatt.inverter.victron import VictronInverter
+
+
+class FakeInverter(BaseInverter):
+    """Entity based backend reading from a dict of entity id -> state."""
+
+    def __init__(self, states):
+        super().__init__(
+            SimpleNamespace(states={k: SimpleNamespace(state=v) for k, v in states.items()}),
+            None,
+        )
+        self.inverter_entities = {entity_id: None for entity_id in states}
+
+    def get_state_float(self, entity_id, default=0.0):
+        state = self.find_entity_state(entity_id)
+        if state is None:
+            self.missing_fields[entity_id] += 1
+            return default
+        return float(state.state)
+
+    def get_state_int(self, entity_id, default=0):
+        return int(self.get_state_float(entity_id, default))
+
+    def get_energy_data(self):
+        return self.get_state_floats("grid_l{}_power", minimum=3)
+
+    def get_metrics_data(self):
+        return (
+            self.get_state_floats("pv{}_power", minimum=2),
+            self.get_module_floats("battery_{}_power", "battery_power", scale=-1),
+            self.get_module_average("battery_{}_soc", "_battery"),
+        )
+
+
+def test_every_index_found_is_read_in_order():
+    inverter = FakeInverter(
+        {
+            "sensor.deye_pv3_power": 800,
+            "sensor.deye_pv1_power": 1000,
+            "sensor.deye_pv10_power": 50,
+            "sensor.deye_pv2_power": 900,
+        }
+    )
+    assert inverter.discover_indexed("pv{}_power") == [
+        "pv1_power",
+        "pv2_power",
+        "pv3_power",
+        "pv10_power",
+    ]
+    assert inverter.get_state_floats("pv{}_power") == [1000, 900, 800, 50]
+
+
+def test_minimum_keeps_the_payload_shape():
+    inverter = FakeInverter({"sensor.deye_grid_l1_power": 100})
+    assert inverter.get_energy_data() == [100, 0.0, 0.0]
+    assert inverter.missing_fields == {"grid_l2_power": 1, "grid_l3_power": 1}
+
+
+def test_battery_modules_are_listed_and_averaged():
+    inverter = FakeInverter(
+        {
+            "sensor.deye_battery": 10,
+            "sensor.deye_battery_power": 999,
+            "sensor.deye_battery_1_power": 500,
+            "sensor.deye_battery_2_power": -400,
+            "sensor.deye_battery_1_soc": 60,
+            "sensor.deye_battery_2_soc": 71,
+        }
+    )
+    _, battery_power, battery_soc = inverter.get_metrics_data()
+    assert battery_power == [-500, 400]
+    assert battery_soc == 65
+
+
+def test_single_battery_falls_back_to_the_plain_entity():
+    inverter = FakeInverter({"sensor.deye_battery": 42, "sensor.deye_battery_power": 250})
+    pv_power, battery_power, battery_soc = inverter.get_metrics_data()
+    assert pv_power == [0.0, 0.0]
+    assert battery_power == [-250]
+    assert battery_soc == 42
+
+
+def test_pinned_map_is_discovered_from_instead_of_the_entities():
+    inverter = FakeInverter({"sensor.deye_pv1_power": 1000, "sensor.deye_pv3_power": 800})
+    entity_map = inverter.resolve_entity_map()
+    assert entity_map["pv3_power"] == "sensor.deye_pv3_power"
+    assert entity_map["pv2_power"] is None
+
+    # A new entity appearing later does not change the pinned shape
+    inverter.hass.states["sensor.deye_pv4_power"] = SimpleNamespace(state=500)
+    inverter.inverter_entities["sensor.deye_pv4_power"] = None
+    inverter.use_entity_map(entity_map)
+    assert inverter.get_state_floats("pv{}_power", minimum=2) == [1000, 0.0, 800]
+
+
+async def victron(tmp_path, states):
+    hass = HomeAssistant(str(tmp_path))
+    await er.async_load(hass)
+    registry = er.async_get(hass)
+    for suffix, value in states.items():
+        entry = registry.async_get_or_create(
+            "sensor", "victron", suffix, suggested_object_id=f"victron_{suffix}", device_id="gx"
+        )
+        hass.states.async_set(entry.entity_id, value)
+    config_entry = SimpleNamespace(data={"device_id": "gx"}, options={})
+    return hass, VictronInverter(hass, config_entry)
+
+
+@pytest.mark.asyncio
+async def test_victron_strings_line_up(tmp_path):
+    states = {"total_pv_power": 4500}
+    for string, (power, voltage) in enumerate(((2000, 400), (1500, 380), (1000, 360)), 1):
+        states.update(
+            {f"pv{string}_power": power, f"pv{string}_voltage": voltage, f"pv{string}_current": 5}
+        )
+    hass, inverter = await victron(tmp_path, states)
+    metrics = inverter.get_metrics_data()
+    assert metrics.PvPower == [2000, 1500, 1000]
+    assert metrics.PvVoltage == [400, 380, 360]
+    assert metrics.PvCurrent == [5, 5, 5]
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_victron_single_mppt_reports_its_total(tmp_path):
+    hass, inverter = await victron(
+        tmp_path, {"total_pv_power": 4500, "pv1_voltage": 400, "pv1_current": 11}
+    )
+    metrics = inverter.get_metrics_data()
+    assert metrics.PvPower == [4500, 0.0]
+    assert metrics.PvVoltage == [400, 0.0]
+    await hass.async_stop(force=True)
@@ -0,0 +1,74 @@
+"""Tests for the event loop lag load shedding."""
+
+from custom_components.qilowatt.load_shedder import (
+    LEVEL_FULL,
+    LEVEL_MINIMAL,
+    LEVEL_REDUCED_METRICS,
+    LoadShedder,
+)
+
+
+class Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_shedder():
+    clock = Clock()
+    shedder = LoadShedder(
+        None, "test", thresholds=(0.1, 0.5), smoothing=1.0, recover_after=60, clock=clock
+    )
+    return shedder, clock
+
+
+def test_rises_immediately_to_the_level_crossed():
+    shedder, _ = make_shedder()
+    shedder.add_sample(0.05)
+    assert shedder.state == LEVEL_FULL
+    shedder.add_sample(0.7)
+    assert shedder.state == LEVEL_MINIMAL
+    assert shedder.minimal and shedder.reduce_metrics
+
+
+def test_steps_down_one_level_per_calm_period():
+    shedder, clock = make_shedder()
+    shedder.add_sample(0.7)
+    shedder.add_sample(0.0)
+    clock.now = 59
+    shedder.add_sample(0.0)
+    assert shedder.state == LEVEL_MINIMAL
+    clock.now = 60
+    shedder.add_sample(0.0)
+    assert shedder.state == LEVEL_REDUCED_METRICS
+    assert shedder.reduce_metrics and not shedder.minimal
+    clock.now = 120
+    shedder.add_sample(0.0)
+    assert shedder.state == LEVEL_FULL
+
+
+def test_lag_at_the_current_level_restarts_the_calm_period():
+    shedder, clock = make_shedder()
+    shedder.add_sample(0.2)
+    shedder.add_sample(0.0)
+    clock.now = 50
+    shedder.add_sample(0.2)  # Hysteresis: back at the level's threshold
+    clock.now = 70
+    shedder.add_sample(0.0)
+    clock.now = 100
+    shedder.add_sample(0.0)
+    assert shedder.state == LEVEL_REDUCED_METRICS
+    clock.now = 130
+    shedder.add_sample(0.0)
+    assert shedder.state == LEVEL_FULL
+
+
+def test_single_spike_is_smoothed():
+    shedder = LoadShedder(None, "test", smoothing=0.3)
+    shedder.add_sample(0.2)
+    assert shedder.lag == 0.06
+    assert shedder.state == LEVEL_FULL
@@ -0,0 +1,47 @@
+"""Tests for the Prometheus metrics rendering."""
+
+from custom_components.qilowatt.metrics import Histogram, MetricFamily, render
+
+
+def test_histogram_buckets_by_upper_bound():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == 3.65
+
+
+def test_render_counter_with_labels():
+    family = MetricFamily("qilowatt_publishes_total", "counter", "Messages published.")
+    family.add({"inverter_id": "HA0001", "topic": "SENSOR"}, 12)
+    family.add({"inverter_id": 'a"b\\c\nd', "topic": "STATE"}, True)
+    assert render([family]) == (
+        "# HELP qilowatt_publishes_total Messages published.\n"
+        "# TYPE qilowatt_publishes_total counter\n"
+        'qilowatt_publishes_total{inverter_id="HA0001",topic="SENSOR"} 12\n'
+        'qilowatt_publishes_total{inverter_id="a\\"b\\\\c\\nd",topic="STATE"} 1\n'
+    )
+
+
+def test_render_histogram_is_cumulative():
+    histogram = Histogram(buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 0.05, 2.0):
+        histogram.observe(value)
+    family = MetricFamily("qilowatt_cycle_seconds", "histogram", "Cycle duration.")
+    family.add_histogram({"inverter_id": "HA0001"}, histogram)
+    lines = render([family]).splitlines()
+    assert lines[2:] == [
+        'qilowatt_cycle_seconds_bucket{inverter_id="HA0001",le="0.01"} 1',
+        'qilowatt_cycle_seconds_bucket{inverter_id="HA0001",le="0.1"} 3',
+        'qilowatt_cycle_seconds_bucket{inverter_id="HA0001",le="+Inf"} 4',
+        'qilowatt_cycle_seconds_sum{inverter_id="HA0001"} 2.105',
+        'qilowatt_cycle_seconds_count{inverter_id="HA0001"} 4',
+    ]
+
+
+def test_render_without_labels_or_families():
+    family = MetricFamily("qilowatt_up", "gauge", "Up.")
+    family.add({}, 1.5)
+    assert render([family]).splitlines()[-1] == "qilowatt_up 1.5"
+    assert render([]) == ""
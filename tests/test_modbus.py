@@ -0,0 +1,123 @@
+"""Tests for the Modbus TCP client and register maps."""
+
+import asyncio
+import struct
+
+import pytest
+
+from custom_components.qilowatt.modbus import (
+    REGISTER_MAPS,
+    ModbusError,
+    ModbusTcpClient,
+    Register,
+    decode_blocks,
+    plan_blocks,
+)
+
+
+def test_register_decoding():
+    assert Register(0, signed=True).decode([0xFFFE]) == -2
+    assert Register(0).decode([0xFFFE]) == 0xFFFE
+    assert Register(0, count=2).decode([0x0001, 0x0002]) == 0x00010002
+    assert Register(0, count=2, word_swap=True).decode([0x0002, 0x0001]) == 0x00010002
+    assert Register(0, scale=0.1, offset=-1000).decode([1253]) == pytest.approx(25.3)
+    assert Register(0, signed=True, scale=-10).decode([0xFFF6]) == 100
+
+
+@pytest.mark.parametrize(
+    "register, value",
+    [
+        (Register(0, signed=True, scale=-0.01), 12.5),
+        (Register(0, count=2, scale=0.1, word_swap=True), 123456.7),
+        (Register(0, scale=0.1, offset=-1000), -5.5),
+        (Register(0, signed=True, scale=10), -4500),
+    ],
+)
+def test_encode_round_trips(register, value):
+    assert register.decode(register.encode(value)) == pytest.approx(value)
+
+
+def test_plan_blocks_merges_close_registers():
+    registers = [Register(10), Register(12, count=2), Register(40), Register(20)]
+    assert plan_blocks(registers) == [(10, 11), (40, 1)]
+    assert plan_blocks(registers, max_gap=2) == [(10, 4), (20, 1), (40, 1)]
+    assert plan_blocks(registers, max_count=8) == [(10, 4), (20, 1), (40, 1)]
+
+
+@pytest.mark.parametrize("name", list(REGISTER_MAPS))
+def test_register_maps_fit_the_read_limit(name):
+    registers = REGISTER_MAPS[name]
+    blocks = plan_blocks(registers.values())
+    assert all(count <= 125 for _, count in blocks)
+    results = [[0] * count for _, count in blocks]
+    assert set(decode_blocks(registers, blocks, results)) == set(registers)
+
+
+def test_decode_blocks_maps_words_back_to_names():
+    registers = {"a": Register(100), "b": Register(103, count=2), "c": Register(200)}
+    blocks = plan_blocks(registers.values())
+    values = decode_blocks(registers, blocks, [[1, 0, 0, 0, 2], [3]])
+    assert values == {"a": 1, "b": 2, "c": 3}
+
+
+class Server:
+    """Modbus TCP server answering reads with the register addresses."""
+
+    def __init__(self, exception=None) -> None:
+        self.exception = exception
+        self.requests = []
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                transaction, _, _, unit, function, address, count = struct.unpack(
+                    ">HHHBBHH", await reader.readexactly(12)
+                )
+                self.requests.append((unit, function, address, count))
+                if self.exception is not None:
+                    pdu = struct.pack(">BB", function | 0x80, self.exception)
+                else:
+                    words = [(address + i) & 0xFFFF for i in range(count)]
+                    pdu = struct.pack(f">BB{count}H", function, 2 * count, *words)
+                writer.write(struct.pack(">HHHB", transaction, 0, len(pdu) + 1, unit) + pdu)
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_client_reads_over_one_connection():
+    server = Server()
+    async with server as port:
+        client = ModbusTcpClient("127.0.0.1", port, unit=7)
+        assert await client.read_holding_registers(600, 3) == [600, 601, 602]
+        assert await client.read_holding_registers(10, 1) == [10]
+        assert client.connected
+        await client.close()
+    assert server.requests == [(7, 3, 600, 3), (7, 3, 10, 1)]
+
+
+@pytest.mark.asyncio
+async def test_client_raises_device_exceptions():
+    async with Server(exception=2) as port:
+        client = ModbusTcpClient("127.0.0.1", port)
+        with pytest.raises(ModbusError, match="exception 2"):
+            await client.read_holding_registers(600, 3)
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_client_connection_failure():
+    async with Server() as port:
+        pass
+    client = ModbusTcpClient("127.0.0.1", port, timeout=1)
+    with pytest.raises(ModbusError, match="Cannot connect"):
+        await client.read_holding_registers(0, 1)
@@ -0,0 +1,74 @@
+"""Tests for the Qilowatt MQTT client wrapper."""
+
+import asyncio
+import socket
+import threading
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.qilowatt.const import DOMAIN
+from custom_components.qilowatt.mqtt_client import MQTTClient
+
+CONFIG_ENTRY = SimpleNamespace(
+    entry_id="entry",
+    title="Home",
+    data={
+        "mqtt_username": "user",
+        "mqtt_password": "password",
+        "inverter_id": "HA0001",
+        "inverter_model": "Simulator",
+        "device_id": "simulator",
+    },
+    options={},
+)
+COMMAND = b'WORKMODE {"Mode": "buy", "PowerLimit": 3000}'
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def paho_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("paho-mqtt")]
+
+
+@pytest.mark.asyncio
+async def test_stop_while_reconnecting_leaves_no_thread(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    hass.data["integrations"] = {
+        DOMAIN: SimpleNamespace(version="1.0.0", requirements=["qilowatt==2025.9.3"])
+    }
+    client = MQTTClient(hass, CONFIG_ENTRY)
+    client.initialize_client()
+    # The broker is down: paho keeps retrying in its network thread
+    paho = client.qilowatt_client._client
+    paho.reconnect_delay_set(min_delay=1, max_delay=1)
+    paho.connect_async("127.0.0.1", closed_port())
+    paho.loop_start()
+    await asyncio.sleep(0.2)
+    assert paho_threads()
+    assert not client.qilowatt_client.connected
+
+    dispatched = []
+    client._async_dispatch_command = lambda command, *times: dispatched.append(command)
+    client.qw_device.handle_command(COMMAND)
+    client.qw_device.publish_state_data()
+    await asyncio.sleep(0)
+    assert len(dispatched) == 1
+    assert client.publish_queue.depth == 1
+
+    await hass.async_add_executor_job(client.stop)
+    assert not paho_threads()
+
+    # Messages arriving late no longer reach the unloaded entry
+    client.publish_queue.clear()
+    client.qw_device.handle_command(COMMAND)
+    client.qw_device.publish_state_data()
+    await asyncio.sleep(0)
+    assert len(dispatched) == 1
+    assert client.publish_queue.depth == 0
+    await hass.async_stop(force=True)
@@ -0,0 +1,132 @@
+"""Tests for the backends reading inverter values directly from MQTT topics."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.qilowatt.inverter.mqtt_topics import (
+    SolarAssistantMqttInverter,
+    VenusMqttInverter,
+    _wildcards,
+)
+
+CONFIG_ENTRY = SimpleNamespace(data={"device_id": "device"}, options={})
+
+
+def deliver(inverter, topic, payload):
+    """Pass a message to the callback of the first filter matching its topic."""
+    segments = topic.split("/")
+    for topic_filter, template in inverter.topic_filters():
+        patterns = topic_filter.split("/")
+        if len(patterns) == len(segments) and all(
+            pattern in ("+", segment) for segment, pattern in zip(segments, patterns)
+        ):
+            message = SimpleNamespace(topic=topic, payload=payload)
+            inverter._on_message(topic_filter, template, message)
+            return
+    raise AssertionError(f"No filter matches {topic}")
+
+
+def venus(messages):
+    inverter = VenusMqttInverter(SimpleNamespace(states={}), CONFIG_ENTRY)
+    for path, value in messages.items():
+        deliver(inverter, f"N/c0619ab1/{path}", json.dumps({"value": value}))
+    return inverter
+
+
+def test_wildcards():
+    assert _wildcards("N/abc/grid/30/Ac/L1/Voltage", "N/+/grid/+/Ac/L1/Voltage") == ["abc", "30"]
+    assert _wildcards("a/b", "a/b") == []
+
+
+def test_venus_table_and_portal_id():
+    inverter = venus(
+        {
+            "system/0/Ac/Grid/L1/Power": 1200,
+            "system/0/Ac/Grid/L2/Power": -300,
+            "grid/30/Ac/L1/Voltage": 231.5,
+            "solarcharger/279/Yield/Power": 800,
+            "solarcharger/288/Yield/Power": 650,
+            "system/0/Ac/PvOnGrid/L1/Power": 400,
+            "system/0/Dc/Battery/Soc": 57.6,
+            "system/0/Dc/Battery/Power": -150,
+            "system/0/Dc/Battery/Temperature": 24.5,
+        }
+    )
+    assert inverter.portal_id == "c0619ab1"
+    assert inverter.values["grid_l1_voltage"].state == 231.5
+    energy = inverter.get_energy_data()
+    assert energy.Power == [1200, -300, 0.0]
+    assert energy.Voltage == [231.5, 0.0, 0.0]
+    metrics = inverter.get_metrics_data()
+    # MPPT chargers by device instance, then the AC coupled PV
+    assert metrics.PvPower == [800, 650, 400]
+    assert metrics.BatterySOC == 57
+    assert metrics.BatteryPower == [-150]
+    assert metrics.BatteryTemperature == [24.5]
+    assert metrics.InverterTemperature == 0.0
+    assert inverter.is_ready()
+
+
+def test_venus_invalid_payload_reads_as_missing():
+    inverter = VenusMqttInverter(SimpleNamespace(states={}), CONFIG_ENTRY)
+    deliver(inverter, "N/c0619ab1/system/0/Dc/Battery/Soc", "not json")
+    assert inverter.get_state_float("battery_soc", default=-1) == -1
+    assert inverter.missing_fields["battery_soc"] == 1
+
+
+def test_new_index_triggers_rediscovery():
+    inverter = venus({"solarcharger/279/Yield/Power": 800})
+    assert inverter.get_state_floats("pv{}_power", minimum=0) == [800]
+    deliver(inverter, "N/c0619ab1/solarcharger/280/Yield/Power", json.dumps({"value": 300}))
+    assert inverter.get_state_floats("pv{}_power", minimum=0) == [800, 300]
+
+
+def test_stale_table_fails_the_read():
+    inverter = VenusMqttInverter(SimpleNamespace(states={}), CONFIG_ENTRY)
+    with pytest.raises(TimeoutError):
+        inverter.get_energy_data()
+    inverter = venus({"system/0/Ac/Grid/L1/Power": 1200})
+    inverter.updated_at -= 3600
+    with pytest.raises(TimeoutError):
+        inverter.get_metrics_data()
+
+
+def test_grid_power_messages_notify_listeners():
+    inverter = VenusMqttInverter(SimpleNamespace(states={}), CONFIG_ENTRY)
+    calls = []
+    unsubscribe = inverter.async_track_grid_power(calls.append)
+    deliver(inverter, "N/c0619ab1/system/0/Ac/Grid/L1/Power", json.dumps({"value": 1}))
+    deliver(inverter, "N/c0619ab1/system/0/Dc/Battery/Soc", json.dumps({"value": 50}))
+    assert len(calls) == 1
+    unsubscribe()
+    deliver(inverter, "N/c0619ab1/system/0/Ac/Grid/L1/Power", json.dumps({"value": 2}))
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_solar_assistant_topic_keys(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    await er.async_load(hass)
+    inverter = SolarAssistantMqttInverter(hass, CONFIG_ENTRY)
+    for topic, payload in (
+        ("inverter_1/grid_power_1", "1500"),
+        ("inverter_1/load_power", "700"),
+        ("total/load_power", "900"),
+        ("total/battery_state_of_charge", "81"),
+        ("battery_2/power", "-200"),
+        ("inverter_2/grid_power_1", "99"),
+    ):
+        deliver(inverter, f"solar_assistant/{topic}/state", payload)
+    # A total does not replace the value of the first inverter
+    assert {key: state.state for key, state in inverter.values.items()} == {
+        "grid_power_1": "1500",
+        "load_power": "700",
+        "battery_state_of_charge": "81",
+        "battery_2_power": "-200",
+    }
+    assert inverter.is_ready()
+    await hass.async_stop(force=True)
@@ -0,0 +1,154 @@
+"""Tests for the local peak shaving controller."""
+
+from types import SimpleNamespace
+
+import pytest
+from qilowatt import WorkModeCommand
+
+from custom_components.qilowatt import peak_shaving
+from custom_components.qilowatt.const import (
+    CONF_PEAK_SHAVING_ENTITY,
+    CONF_PEAK_SHAVING_FALLBACK,
+    CONF_PEAK_SHAVING_STALE_AFTER,
+)
+from custom_components.qilowatt.peak_shaving import PeakShavingController
+
+ENTITY = "number.deye_battery_max_discharge_power"
+
+
+class Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Services:
+    """Records the number values set instead of calling services."""
+
+    def __init__(self) -> None:
+        self.values = []
+
+    async def async_call(self, domain, service, data):
+        self.values.append(data["value"])
+
+
+class Supervisor:
+    """Runs created tasks immediately, as they only call a service."""
+
+    def create_task(self, coro, name):
+        try:
+            coro.send(None)
+        except StopIteration:
+            pass
+
+
+class Inverter:
+    """Backend reporting a fixed grid power."""
+
+    def __init__(self) -> None:
+        self.grid_power = 0.0
+        self.grid_power_age = None
+
+    def get_grid_power(self):
+        return self.grid_power
+
+    def get_grid_power_age(self):
+        return self.grid_power_age
+
+
+class StopWatchdog(Exception):
+    """Ends the watchdog loop of a test."""
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(peak_shaving, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def make_controller(value=5000, **options):
+    state = SimpleNamespace(state=str(value), attributes={"min": 0, "max": 6000})
+    hass = SimpleNamespace(states={ENTITY: state}, services=Services())
+    config_entry = SimpleNamespace(
+        data={"inverter_id": "HA0001"}, options={CONF_PEAK_SHAVING_ENTITY: ENTITY, **options}
+    )
+    controller = PeakShavingController(hass, Inverter(), config_entry)
+    controller._supervisor = Supervisor()
+    return controller
+
+
+def test_limit_follows_the_import_above_the_threshold(clock):
+    controller = make_controller(value=2000)
+    controller._handle_workmode_update(WorkModeCommand(PeakShaving=3000))
+    assert controller.active
+    controller.inverter.grid_power = 3600
+    controller._handle_grid_power()
+    # Import above the threshold raises the limit by gain times the error
+    assert controller.hass.services.values == [2300]
+
+    clock.now += 1
+    controller.inverter.grid_power = 3040
+    controller._handle_grid_power()
+    assert controller.hass.services.values == [2300]  # Within the deadband
+
+
+def test_limit_moves_at_most_rate_and_stays_in_range(clock):
+    controller = make_controller(value=5500)
+    controller._handle_workmode_update(WorkModeCommand(PeakShaving=3000))
+    controller.inverter.grid_power = 20000
+    controller._handle_grid_power()
+    assert controller.hass.services.values == [6000]  # Capped at the entity max
+
+    controller.inverter.grid_power = -5000
+    clock.now += 0.5
+    controller._handle_grid_power()
+    assert controller.hass.services.values == [6000, 5500]
+
+
+def test_clearing_the_threshold_restores_the_limit(clock):
+    controller = make_controller(value=4000)
+    controller._handle_workmode_update(WorkModeCommand(PeakShaving=3000))
+    controller.inverter.grid_power = 3600
+    controller._handle_grid_power()
+    controller._handle_workmode_update(WorkModeCommand(Mode="normal"))
+    assert not controller.active
+    assert controller.hass.services.values == [4300, 4000]
+
+    controller = make_controller(value=4000, **{CONF_PEAK_SHAVING_FALLBACK: 2500})
+    controller._handle_workmode_update(WorkModeCommand(PeakShaving=3000))
+    controller._handle_workmode_update(WorkModeCommand(Mode="normal"))
+    assert controller.hass.services.values == [2500]
+
+
+@pytest.mark.asyncio
+async def test_watchdog_falls_back_on_stale_grid_power(clock, monkeypatch):
+    controller = make_controller(value=4000, **{CONF_PEAK_SHAVING_STALE_AFTER: 30})
+    controller._handle_workmode_update(WorkModeCommand(PeakShaving=3000))
+    controller.inverter.grid_power = 3600
+    controller._handle_grid_power()
+    ticks = []
+
+    async def sleep(seconds):
+        if len(ticks) == 90:
+            raise StopWatchdog
+        ticks.append(seconds)
+        # Stale only once the source stopped reporting for 30 s as well
+        assert controller.stale == (clock.now > 70)
+        clock.now += seconds
+        # The source still reports unchanged values for the first 40 seconds
+        controller.inverter.grid_power_age = 0 if clock.now < 40 else clock.now - 40
+
+    monkeypatch.setattr(peak_shaving, "asyncio", SimpleNamespace(sleep=sleep))
+    with pytest.raises(StopWatchdog):
+        await controller._watchdog()
+    assert controller.stale
+    assert controller.hass.services.values == [4300, 4000]
+
+    clock.now += 1
+    controller._handle_grid_power()
+    assert not controller.stale
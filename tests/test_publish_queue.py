@@ -0,0 +1,118 @@
+"""Tests for the outbound publish queue."""
+
+import paho.mqtt.client as mqtt
+
+from custom_components.qilowatt.publish_queue import PublishQueue
+
+
+class FakeLink:
+    """Send callback that hands out real paho message infos."""
+
+    def __init__(self) -> None:
+        self.sent = []
+        self.infos = []
+        self.connected = True
+
+    def __call__(self, topic, data):
+        if not self.connected:
+            return None
+        info = mqtt.MQTTMessageInfo(len(self.infos) + 1)
+        self.sent.append((topic, data))
+        self.infos.append(info)
+        return info
+
+
+def published(info):
+    info._set_as_published()  # pylint: disable=protected-access
+
+
+def test_publishes_when_link_is_free():
+    link = FakeLink()
+    queue = PublishQueue(link)
+    queue.put("sensor", 1)
+    assert link.sent == [("sensor", 1)]
+    assert queue.depth == 0
+
+
+def test_latest_wins_while_in_flight():
+    link = FakeLink()
+    queue = PublishQueue(link)
+    queue.put("sensor", 1)
+    queue.put("sensor", 2)
+    queue.put("sensor", 3)
+    assert link.sent == [("sensor", 1)]
+    assert queue.depth == 1
+    assert queue.coalesced == 1
+    assert queue.congested
+
+    published(link.infos[0])
+    queue.flush()
+    assert link.sent[-1] == ("sensor", 3)
+    assert not queue.congested
+
+
+def test_overflow_drops_oldest_topic():
+    link = FakeLink()
+    link.connected = False
+    queue = PublishQueue(link, max_topics=2)
+    queue.put("a", 1)
+    queue.put("b", 2)
+    queue.put("c", 3)
+    assert queue.dropped_overflow == 1
+    link.connected = True
+    queue.flush()
+    assert sorted(topic for topic, _ in link.sent) == ["b", "c"]
+
+
+def test_stale_payloads_are_dropped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("custom_components.qilowatt.publish_queue.time.monotonic", lambda: now[0])
+    link = FakeLink()
+    link.connected = False
+    queue = PublishQueue(link, max_age=60)
+    queue.put("sensor", 1)
+    now[0] += 61
+    link.connected = True
+    queue.flush()
+    assert link.sent == []
+    assert queue.dropped_stale == 1
+
+
+def test_lost_message_does_not_block_the_topic():
+    """paho marks an unsent QoS 0 message lost on disconnect and then raises."""
+    link = FakeLink()
+    queue = PublishQueue(link)
+    queue.put("sensor", 1)
+    link.infos[0].rc = mqtt.MQTT_ERR_CONN_LOST
+    try:
+        link.infos[0].is_published()
+    except RuntimeError:
+        pass
+    else:  # pragma: no cover
+        raise AssertionError("paho no longer raises for lost messages")
+
+    queue.put("sensor", 2)
+    queue.flush()
+    assert link.sent == [("sensor", 1), ("sensor", 2)]
+
+
+def test_queued_message_still_blocks_the_topic():
+    link = FakeLink()
+    queue = PublishQueue(link)
+    queue.put("sensor", 1)
+    link.infos[0].rc = mqtt.MQTT_ERR_AGAIN
+    queue.put("sensor", 2)
+    assert link.sent == [("sensor", 1)]
+
+
+def test_reset_in_flight_frees_every_topic():
+    link = FakeLink()
+    queue = PublishQueue(link)
+    queue.put("sensor", 1)
+    queue.put("sensor", 2)
+    assert queue.congested
+
+    queue.reset_in_flight()
+    assert not queue.congested
+    queue.flush()
+    assert link.sent == [("sensor", 1), ("sensor", 2)]
@@ -0,0 +1,52 @@
+"""Tests for the payload serializer."""
+
+import json
+
+import pytest
+
+from custom_components.qilowatt.serializer import PayloadSerializer
+
+PAYLOAD = {
+    "ENERGY": {"Power": [120.5, -33.25, 0], "Today": 12.345678, "Frequency": 50.01},
+    "METRICS": {"BatterySOC": 63, "PvPower": [2600.0, 2400.0], "AlarmCodes": [0, 0]},
+    "VERSION": {"API": "1.0", "qilowatt_ha": "2025.9.3"},
+    "Tele": "Ölmiste 100%",
+    "Uptime": 12.5,
+}
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [PAYLOAD, {}, {"only": None}, ["not", "a", "dict"], {"nested": {"x": {"y": [1]}}}],
+)
+def test_identical_to_json_dumps(payload):
+    assert PayloadSerializer().dumps(payload) == json.dumps(payload)
+
+
+def test_unchanged_sections_are_reused():
+    serializer = PayloadSerializer()
+    first = serializer.dumps(PAYLOAD)
+    energy = dict(PAYLOAD["ENERGY"], Power=[1.0, 2.0, 3.0])
+    second = serializer.dumps({**PAYLOAD, "ENERGY": energy})
+    assert json.loads(first)["METRICS"] == json.loads(second)["METRICS"]
+    assert json.loads(second)["ENERGY"]["Power"] == [1.0, 2.0, 3.0]
+
+
+def test_section_mutated_in_place_needs_clear():
+    serializer = PayloadSerializer()
+    energy = {"Power": [1.0]}
+    serializer.dumps({"ENERGY": energy})
+    energy["Power"] = [2.0]
+    # The device hands over new objects; in-place changes need clear()
+    assert serializer.dumps({"ENERGY": energy}) == '{"ENERGY": {"Power": [1.0]}}'
+    serializer.clear()
+    assert serializer.dumps({"ENERGY": energy}) == '{"ENERGY": {"Power": [2.0]}}'
+
+
+def test_precision_rounds_floats_only():
+    serializer = PayloadSerializer(precision=1)
+    data = json.loads(serializer.dumps(PAYLOAD))
+    assert data["ENERGY"] == {"Power": [120.5, -33.2, 0], "Today": 12.3, "Frequency": 50.0}
+    assert data["METRICS"]["BatterySOC"] == 63
+    assert data["Uptime"] == 12.5
+    assert data["Tele"] == PAYLOAD["Tele"]
@@ -0,0 +1,99 @@
+"""Tests for the shadow mode comparison."""
+
+from dataclasses import dataclass
+
+import pytest
+
+from custom_components.qilowatt.shadow import ShadowCollector, StateSnapshot, _equal
+
+
+@dataclass
+class Data:
+    Power: list
+    Status: str
+
+
+class FakeCollector:
+    """Collector returning a fixed result and recording the order it ran in."""
+
+    def __init__(self, name, order, result=None, error=None) -> None:
+        self.name = name
+        self.order = order
+        self.result = result
+        self.error = error
+        self.live = self.states = {}
+
+    def use_states(self, states):
+        self.states = self.live if states is None else states
+
+    def get_energy_data(self):
+        self.order.append(self.name)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_equal_within_tolerance():
+    assert _equal(1000.0, 1000.0005)
+    assert _equal([1, 2.0], [1.0, 2])
+    assert _equal(1000.0, 1001.0)
+    assert not _equal(1000.0, 1002.0)
+    assert not _equal(0.0, 0.02)
+    assert not _equal([1, 2], [1, 2, 3])
+    assert _equal("Normal", "Normal")
+    assert not _equal(None, 0)
+
+
+def test_snapshot_keeps_the_first_state_read():
+    states = {"sensor.power": 1}
+    snapshot = StateSnapshot(states)
+    assert snapshot.get("sensor.power") == 1
+    states["sensor.power"] = 2
+    assert snapshot.get("sensor.power") == 1
+    snapshot.clear()
+    assert snapshot.get("sensor.power") == 2
+
+
+def test_order_alternates_and_primary_result_is_returned():
+    order = []
+    primary = FakeCollector("primary", order, Data([1.0], "Normal"))
+    shadow = FakeCollector("shadow", order, Data([1.0], "Normal"))
+    collector = ShadowCollector(primary, shadow)
+    for _ in range(4):
+        assert collector.get_energy_data() is primary.result
+    assert order == ["primary", "shadow", "shadow", "primary"] * 2
+    assert collector.comparisons == 4
+    assert not collector.mismatches
+
+
+def test_mismatches_are_counted_per_field():
+    order = []
+    primary = FakeCollector("primary", order, Data([1.0, 2.0], "Normal"))
+    shadow = FakeCollector("shadow", order, Data([1.0, 3.0], "Normal"))
+    collector = ShadowCollector(primary, shadow)
+    collector.get_energy_data()
+    collector.get_energy_data()
+    assert collector.mismatches == {"ENERGY.Power": 2}
+
+
+@pytest.mark.parametrize("cycles", [1, 2])
+def test_shadow_errors_never_reach_the_caller(cycles):
+    order = []
+    primary = FakeCollector("primary", order, Data([1.0], "Normal"))
+    shadow = FakeCollector("shadow", order, error=KeyError("sensor.power"))
+    collector = ShadowCollector(primary, shadow)
+    for _ in range(cycles):
+        assert collector.get_energy_data() is primary.result
+    assert collector.shadow_errors == cycles
+    assert collector.comparisons == 0
+
+
+def test_live_states_are_restored_after_a_primary_error():
+    order = []
+    primary = FakeCollector("primary", order, error=ValueError("broken"))
+    shadow = FakeCollector("shadow", order, Data([1.0], "Normal"))
+    collector = ShadowCollector(primary, shadow)
+    with pytest.raises(ValueError):
+        collector.get_energy_data()
+    assert primary.states is primary.live
+    assert shadow.states is shadow.live
@@ -0,0 +1,118 @@
+"""Tests for the synthetic inverter backend."""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from qilowatt import WorkModeCommand
+
+from custom_components.qilowatt.const import (
+    CONF_SIMULATOR_PHASES,
+    CONF_SIMULATOR_SEED,
+    CONF_SIMULATOR_STRINGS,
+    SIMULATOR_BATTERY_POWER,
+    SIMULATOR_MIN_SOC,
+)
+from custom_components.qilowatt.inverter import simulator
+from custom_components.qilowatt.inverter.simulator import SimulatorInverter
+
+
+class Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(simulator, "time", SimpleNamespace(monotonic=clock))
+    monkeypatch.setattr(
+        simulator, "dt_util", SimpleNamespace(now=lambda: datetime(2024, 6, 21, 13, 0))
+    )
+    return clock
+
+
+def make_simulator(**data):
+    config_entry = SimpleNamespace(data={"device_id": "simulator", **data}, options={})
+    return SimulatorInverter(SimpleNamespace(states={}), config_entry)
+
+
+def run(inverter, clock, steps):
+    for _ in range(steps):
+        clock.now += 1
+        inverter.step()
+
+
+def test_same_seed_gives_the_same_run(clock):
+    first, second = make_simulator(), make_simulator()
+    run(first, clock, 30)
+    clock.now = 0
+    run(second, clock, 30)
+    assert first.values == second.values
+    third = make_simulator(**{CONF_SIMULATOR_SEED: 1})
+    run(third, clock, 30)
+    assert third.values != first.values
+
+
+def test_payload_follows_the_configured_shape(clock):
+    inverter = make_simulator(**{CONF_SIMULATOR_PHASES: 1, CONF_SIMULATOR_STRINGS: 4})
+    assert not inverter.is_ready()
+    run(inverter, clock, 1)
+    assert inverter.is_ready()
+    energy = inverter.get_energy_data()
+    metrics = inverter.get_metrics_data()
+    assert len(energy.Power) == len(energy.Voltage) == 1
+    assert len(metrics.PvPower) == 4
+    assert all(power > 0 for power in metrics.PvPower)  # Midday
+    assert not inverter.missing_fields
+
+
+def test_grid_balances_pv_load_and_battery(clock):
+    inverter = make_simulator()
+    run(inverter, clock, 10)
+    values = inverter.values
+    pv = sum(values[f"pv{n}_power"] for n in (1, 2))
+    load = sum(values[f"load_l{n}_power"] for n in (1, 2, 3))
+    grid = sum(values[f"grid_l{n}_power"] for n in (1, 2, 3))
+    assert grid == pytest.approx(load - pv + values["battery_power"], abs=3)
+
+
+def test_battery_follows_the_command(clock):
+    inverter = make_simulator()
+    inverter.soc = 50
+    assert inverter.handle_command(WorkModeCommand(Mode="buy", PowerLimit=1500))
+    assert inverter._battery_power(0, 500) == 1500
+    inverter.handle_command(WorkModeCommand(Mode="sell"))
+    assert inverter._battery_power(0, 500) == -SIMULATOR_BATTERY_POWER
+    inverter.handle_command(WorkModeCommand(Mode="sell", DischargeCurrent=10))
+    assert inverter._battery_power(0, 500) == -10 * 51
+    inverter.handle_command(WorkModeCommand(Mode="nobattery"))
+    assert inverter._battery_power(3000, 500) == 0
+    inverter.soc = SIMULATOR_MIN_SOC
+    inverter.handle_command(WorkModeCommand(Mode="normal"))
+    assert inverter._battery_power(0, 500) == 0
+
+
+def test_peak_shaving_discharges_only_above_the_threshold(clock):
+    inverter = make_simulator()
+    inverter.soc = 50
+    inverter.handle_command(WorkModeCommand(PeakShaving=3000))
+    assert inverter._battery_power(0, 2000) == 0
+    assert inverter._battery_power(0, 4500) == -1500
+    assert inverter._battery_power(1000, 500) == 500
+
+
+def test_export_limit_curtails_pv(clock):
+    inverter = make_simulator()
+    inverter.soc = 100
+    inverter.handle_command(WorkModeCommand(Mode="limitexport", PowerLimit=0))
+    run(inverter, clock, 5)
+    values = inverter.values
+    assert values["grid_export_limit"] == 0
+    grid = sum(values[f"grid_l{n}_power"] for n in (1, 2, 3))
+    assert grid >= -3
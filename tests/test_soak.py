@@ -0,0 +1,33 @@
+"""Tests for the accelerated soak test script."""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SOAK = Path(__file__).resolve().parent.parent / "scripts" / "soak.py"
+
+
+def load_soak():
+    spec = importlib.util.spec_from_file_location("soak", SOAK)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.asyncio
+async def test_short_soak_finds_no_growth(capsys):
+    soak = load_soak()
+    args = soak.parse_args(
+        [
+            "--days", "0.1",
+            "--warm-up", "0.05",
+            "--reload-every", "900",
+            "--reconnect-rate", "0.005",
+            "--burst-rate", "0.02",
+        ]
+    )
+    assert await soak.run(args) == 0
+    output = capsys.readouterr().out
+    assert "9 reloads" in output
+    assert "No growth detected" in output
@@ -0,0 +1,79 @@
+"""Tests for merging a parallel inverter stack."""
+
+import threading
+from types import SimpleNamespace
+
+from homeassistant.core import State
+
+from custom_components.qilowatt.inverter.base_inverter import BaseInverter
+from custom_components.qilowatt.inverter.stack import _merge_field
+
+
+class FakeInverter(BaseInverter):
+    """Backend reading its fields from a plain dict of states."""
+
+    BATTERY_CAPACITY_ENTITY = "battery_capacity"
+
+    def __init__(self, *states) -> None:
+        super().__init__(SimpleNamespace(states={}), None)
+        for state in states:
+            self.states[state.entity_id] = state
+
+    def indexed_entity_ids(self):
+        return list(self.states)
+
+    def get_energy_data(self):
+        return None
+
+    def get_metrics_data(self):
+        return None
+
+
+def test_battery_capacity_in_ah():
+    inverter = FakeInverter(
+        State("sensor.deye_battery_capacity", "200", {"unit_of_measurement": "Ah"})
+    )
+    assert inverter.get_battery_capacity() == 200
+
+
+def test_battery_capacity_in_wh_is_scaled_to_kwh():
+    inverter = FakeInverter(
+        State("sensor.deye_battery_capacity", "10240", {"unit_of_measurement": "Wh"})
+    )
+    assert inverter.get_battery_capacity() == 10.24
+
+
+def test_battery_capacity_ignores_a_percentage():
+    inverter = FakeInverter(
+        State("sensor.deye_battery_capacity", "63", {"unit_of_measurement": "%"})
+    )
+    assert inverter.get_battery_capacity() is None
+
+
+def test_battery_capacity_unavailable_or_missing():
+    inverter = FakeInverter(
+        State("sensor.deye_battery_capacity", "unavailable", {"unit_of_measurement": "Ah"})
+    )
+    assert inverter.get_battery_capacity() is None
+    assert FakeInverter().get_battery_capacity() is None
+
+
+def test_snapshot_is_read_only_by_the_thread_using_it():
+    inverter = FakeInverter()
+    live = inverter.states
+    snapshot = {}
+    inverter.use_states(snapshot)
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(inverter.states))
+    thread.start()
+    thread.join()
+    assert inverter.states is snapshot
+    assert seen == [live]
+    inverter.use_states(None)
+    assert inverter.states is live
+
+
+def test_soc_is_weighted_by_capacity():
+    assert _merge_field("soc", [80, 20], [300, 100]) == 65
+    assert _merge_field("soc", [80, None], [300, 100]) == 80
+    assert _merge_field("soc", [None, None], [1.0, 1.0]) is None
@@ -0,0 +1,70 @@
+"""Tests for the background task supervision."""
+
+import asyncio
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.qilowatt.supervisor import TaskSupervisor
+
+
+@pytest.mark.asyncio
+async def test_shutdown_cancels_tasks_and_unsubscribes(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    supervisor = TaskSupervisor(hass, "test")
+    unsubscribed = []
+    supervisor.async_on_shutdown(lambda: unsubscribed.append("first"))
+    supervisor.async_on_shutdown(lambda: unsubscribed.append("second"))
+    task = supervisor.create_task(asyncio.sleep(3600), "sleeper")
+    assert task.get_name() == "test sleeper"
+    assert supervisor.task_count == 1
+    assert supervisor.listener_count == 2
+
+    await supervisor.async_shutdown()
+    assert task.cancelled()
+    assert unsubscribed == ["second", "first"]
+    assert supervisor.task_count == 0
+    assert supervisor.listener_count == 0
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_finished_tasks_are_forgotten(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    supervisor = TaskSupervisor(hass, "test")
+    task = supervisor.create_task(asyncio.sleep(0), "quick")
+    await task
+    await asyncio.sleep(0)
+    assert supervisor.task_count == 0
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_failed_task_does_not_stop_the_shutdown(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    supervisor = TaskSupervisor(hass, "test")
+
+    async def fail_on_cancel():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            raise RuntimeError("cleanup failed")
+
+    failing = supervisor.create_task(fail_on_cancel(), "failing")
+    sleeper = supervisor.create_task(asyncio.sleep(3600), "sleeper")
+    await asyncio.sleep(0)
+    await supervisor.async_shutdown()
+    assert isinstance(failing.exception(), RuntimeError)
+    assert sleeper.cancelled()
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_no_tasks_start_after_shutdown(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    supervisor = TaskSupervisor(hass, "test")
+    await supervisor.async_shutdown()
+    coro = asyncio.sleep(0)
+    assert supervisor.create_task(coro, "late") is None
+    assert coro.cr_frame is None  # Closed, so no "never awaited" warning
+    await hass.async_stop(force=True)
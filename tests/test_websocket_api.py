@@ -0,0 +1,56 @@
+"""Tests for the Qilowatt websocket commands."""
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.components.websocket_api.connection import ActiveConnection
+from homeassistant.core import HomeAssistant
+
+from custom_components.qilowatt import websocket_api
+from custom_components.qilowatt.command_history import CommandHistory
+from custom_components.qilowatt.const import DATA_CLIENT, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def send(hass, message, is_admin):
+    """Handle one message on a connection and return the replies."""
+    replies = []
+    connection = ActiveConnection(
+        _LOGGER,
+        hass,
+        replies.append,
+        SimpleNamespace(is_admin=is_admin, id="user", name="User"),
+        SimpleNamespace(id="token"),
+    )
+    connection.async_handle({"id": 1, **message})
+    await hass.async_block_till_done()
+    return replies
+
+
+@pytest.mark.asyncio
+async def test_subscribe_requires_admin(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    websocket_api.async_setup(hass)
+    message = {"type": "qilowatt/subscribe", "entry_id": "entry"}
+    [reply] = await send(hass, message, is_admin=False)
+    assert reply["error"]["code"] == "unauthorized"
+    [reply] = await send(hass, message, is_admin=True)
+    assert reply["error"]["code"] == "not_found"
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_command_history_requires_admin(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    websocket_api.async_setup(hass)
+    client = SimpleNamespace(command_history=CommandHistory(hass, "entry"))
+    hass.data[DOMAIN] = {"entry": {DATA_CLIENT: client}}
+    message = {"type": "qilowatt/command_history", "entry_id": "entry"}
+    [reply] = await send(hass, message, is_admin=False)
+    assert reply["error"]["code"] == "unauthorized"
+    [reply] = await send(hass, message, is_admin=True)
+    assert reply["success"]
+    assert reply["result"]["commands"] == []
+    await hass.async_stop(force=True)